@@ -1,5 +1,50 @@
 from shopcore.models import *
-from django.db.models import Sum
+from payments.models import Payment
+from products.models import Inventory
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from datetime import timedelta
+
+EXPORT_CHUNK_SIZE = 2000
+
+LOW_STOCK_THRESHOLD = 5
+
+# stock totals scan all of Inventory, the dashboard can be a few minutes behind
+STOCK_SUMMARY_KEY = "dashboard:stock-summary"
+STOCK_SUMMARY_TIMEOUT = 300
+
+EXPORT_HEADER = [
+    "Order ID", "Order Date", "Order Status", "Payment Status",
+    "Customer", "Email", "Phone",
+    "Address", "City", "State", "Pincode",
+    "Product", "SKU", "Quantity", "Unit Price", "Line Total",
+    "Order Total", "Discount", "Final Amount",
+    "Payment Method", "Transaction ID", "Paid At",
+]
+
+class Echo:
+    """
+    File-like object for csv.writer that hands each written line back
+    instead of buffering it, so rows can be streamed.
+    """
+    def write(self, value):
+        return value
+
+def stock_summary():
+    """
+    {"total_stock", "low_stock_count"} for the admin dashboard: one
+    aggregate over Inventory, cached for STOCK_SUMMARY_TIMEOUT.
+    """
+    def compute():
+        totals = Inventory.objects.aggregate(
+            total_stock=Sum("quantity_available"),
+            low_stock_count=Count("id", filter=Q(quantity_available__lte=LOW_STOCK_THRESHOLD)),
+        )
+        return {"total_stock": totals["total_stock"] or 0, "low_stock_count": totals["low_stock_count"]}
+
+    return cache.get_or_set(STOCK_SUMMARY_KEY, compute, STOCK_SUMMARY_TIMEOUT)
 
 def sales_report(start, end):
     return Order.objects.filter(
@@ -9,3 +54,79 @@ def sales_report(start, end):
         total_orders=Sum("id"),
         total_revenue=Sum("final_amount")
     )
+
+def sales_report_orders(report_type=None, start_date=None, end_date=None):
+    """
+    Orders for the sales report / export, filtered by the report type
+    (daily, weekly, yearly) and an optional custom date range.
+    """
+    orders = Order.objects.all()
+    if report_type == "daily":
+        orders = orders.filter(order_date__date=timezone.now().date())
+    elif report_type == "weekly":
+        orders = orders.filter(order_date__gte=timezone.now() - timedelta(days=7))
+    elif report_type == "yearly":
+        orders = orders.filter(order_date__gte=timezone.now() - timedelta(days=365))
+
+    if start_date and end_date:
+        orders = orders.filter(order_date__date__gte=start_date,
+                               order_date__date__lte=end_date)
+    return orders
+
+def revenue_by_day(orders):
+    return (
+        orders.annotate(day=TruncDate("order_date"))
+        .values("day")
+        .annotate(revenue=Sum("final_amount"))
+        .order_by("day")
+    )
+
+def sales_export_rows(orders, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Header + one row per order item, with the customer, address and
+    latest payment joined in.
+    Rows are read through a server-side cursor in chunks, so memory use
+    doesn't grow with the size of the report.
+    """
+    latest_payment = Payment.objects.filter(order=OuterRef("order_id")).order_by("-id")
+    items = (
+        OrderItem.objects
+        .filter(order__in=orders.order_by().values("id"))
+        .select_related("order__user", "order__address", "variant__product")
+        .annotate(
+            payment_method=Subquery(latest_payment.values("payment_method")[:1]),
+            transaction_id=Subquery(latest_payment.values("transaction_id")[:1]),
+            paid_at=Subquery(latest_payment.values("paid_at")[:1]),
+        )
+        .order_by("order__order_date", "order_id", "id")
+    )
+
+    yield EXPORT_HEADER
+    for item in items.iterator(chunk_size=chunk_size):
+        order = item.order
+        user = order.user
+        address = order.address
+        yield [
+            order.order_id,
+            timezone.localtime(order.order_date).strftime("%Y-%m-%d %H:%M"),
+            order.order_status,
+            order.payment_status,
+            user.full_name or user.username or "",
+            user.email,
+            user.phone or "",
+            address.address_line1,
+            address.city,
+            address.state,
+            address.pincode,
+            item.variant.product.product_name,
+            item.variant.sku,
+            item.quantity,
+            item.unit_price,
+            item.total_price,
+            order.total_amount,
+            order.discount_amount,
+            order.final_amount,
+            item.payment_method or "",
+            item.transaction_id or "",
+            timezone.localtime(item.paid_at).strftime("%Y-%m-%d %H:%M") if item.paid_at else "",
+        ]
@@ -1,3 +1,25 @@
+from django.core.cache import cache
 from django.test import TestCase
+from accounts.services.reports import STOCK_SUMMARY_KEY, stock_summary
+from products.models import AgeGroup, Category, Color, Inventory, Product, ProductVariant, SubCategory
 
-# Create your tests here.
+
+class StockSummaryTests(TestCase):
+    def setUp(self):
+        cache.delete(STOCK_SUMMARY_KEY)
+        subcategory = SubCategory.objects.create(
+            category=Category.objects.create(category_name="Boys"), subcategory_name="Shirts",
+        )
+        product = Product.objects.create(subcategory=subcategory, product_name="Shirt", brand="Acme", base_price=100)
+        age_group = AgeGroup.objects.create(age="2-3 years")
+        for color, stock in (("Red", 3), ("Blue", 20)):
+            variant = ProductVariant.objects.create(
+                product=product, color=Color.objects.create(color=color), age_group=age_group,
+            )
+            Inventory.objects.create(variant=variant, quantity_available=stock)
+
+    def test_totals_in_one_query_then_from_cache(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(stock_summary(), {"total_stock": 23, "low_stock_count": 1})
+        with self.assertNumQueries(0):
+            stock_summary()
@@ -26,6 +26,7 @@ urlpatterns = [
     # AUTHENTICATION – ADMIN
     path("admin/admin-dashboard/", admin_views.admin_dashboard_view, name="admin_dashboard"),
     path("admin/sales-report/",admin_views.admin_sales_report,name="sales_report"),
+    path("admin/sales-report/export/",admin_views.admin_sales_report_export,name="sales_report_export"),
     
     path("admin/admin-profile/",admin_profile_views.admin_profile, name="admin_profile"),
     path("admin/admin-profile/edit/",admin_profile_views.admin_edit_profile,name="admin_edit_profile"),
@@ -1,14 +1,18 @@
+import csv
+from django.http import StreamingHttpResponse
 from django.views.decorators.cache import never_cache
 
-from django.core.paginator import Paginator
+from products.utils.pagination import paginate_listing
 from accounts.decorators import admin_login_required
+from utils.instrumentation import query_budget
+from accounts.services.reports import Echo, sales_report_orders, revenue_by_day, sales_export_rows, stock_summary
 from django.contrib.auth import get_user_model
 from django.shortcuts import render, redirect, get_object_or_404
 from shopcore.models import *
 from accounts.models import *
 from payments.models import *
 from products.models import *
-from django.db.models import Q, Sum
+from django.db.models import Q, Sum, Count
 from django.contrib import messages
 from datetime import timedelta
 from django.utils import timezone
@@ -17,6 +21,7 @@ User = get_user_model()
 
 @never_cache
 @admin_login_required
+@query_budget(15)
 def admin_dashboard_view(request):
 
     today =timezone.now().date()
@@ -29,17 +34,20 @@ def admin_dashboard_view(request):
 
     previous_30_days = today - timedelta(days=60)
 
-    total_orders = Order.objects.count()
-
-    completed_orders = Order.objects.filter(order_status="DELIVERED").count()
+    order_totals = DailyOrderRollup.objects.aggregate(
+        total_orders=Sum("orders"),
+        completed_orders=Sum("delivered"),
+        total_revenue=Sum("revenue"),
+    )
+    total_orders = order_totals["total_orders"] or 0
 
-    total_revenue = Payment.objects.filter(payment_status='PAID').aggregate(total=Sum('order__final_amount'))['total'] or 0
+    completed_orders = order_totals["completed_orders"] or 0
 
-    products_sold = OrderItem.objects.aggregate(total=Sum('quantity')).get("total") or 0
+    total_revenue = order_totals["total_revenue"] or 0
 
-    total_stock = Inventory.objects.aggregate(total=Sum("quantity_available"))["total"] or 0
+    products_sold = DailySalesRollup.objects.aggregate(total=Sum("quantity"))["total"] or 0
 
-    low_stock_count = Inventory.objects.filter(quantity_available__lte=5).count()
+    stock = stock_summary()
 
     new_customers = CustomUser.objects.filter(role=CustomUser.ROLE_CUSTOMER,date_joined__gte=last_30_days).count()
 
@@ -47,10 +55,13 @@ def admin_dashboard_view(request):
 
     previous_users = CustomUser.objects.filter(role=CustomUser.ROLE_CUSTOMER,date_joined__gte=previous_30_days,date_joined__lt=last_30_days).count()
     
-    products_sold_per_day = []
-    for d in last_7_days:
-        qty = OrderItem.objects.filter(order__created_at__date=d).aggregate(total=Sum("quantity"))["total"] or 0
-        products_sold_per_day.append(qty)
+    sold_by_day = dict(
+        DailySalesRollup.objects.filter(day__gte=last_7_days[0])
+        .values_list("day")
+        .annotate(total=Sum("quantity"))
+        .order_by()
+    )
+    products_sold_per_day = [sold_by_day.get(d, 0) for d in last_7_days]
 
     filter_type = request.GET.get("filter", "monthly")
 
@@ -59,13 +70,13 @@ def admin_dashboard_view(request):
     else:
         start_date = timezone.now() - timedelta(days=30)
 
-    orders = Order.objects.filter(created_at__gte=start_date).order_by("-created_at")
+    orders = Order.objects.filter(created_at__gte=start_date).select_related("user").order_by("-created_at")[:10]
     
-    top_products = (OrderItem.objects.values("variant__product__product_name").annotate(total=Sum("quantity")).order_by("-total")[:10])
+    top_products = (DailySalesRollup.objects.values("product__product_name").annotate(total=Sum("quantity")).order_by("-total")[:10])
     
-    top_categories = (OrderItem.objects.values("variant__product__subcategory__category__category_name").annotate(total=Sum("quantity")).order_by("-total")[:10])
+    top_categories = (DailySalesRollup.objects.values("category__category_name").annotate(total=Sum("quantity")).order_by("-total")[:10])
     
-    top_brands = (OrderItem.objects.values("variant__product__brand").annotate(total=Sum("quantity")).order_by("-total")[:10])
+    top_brands = (DailySalesRollup.objects.values("brand").annotate(total=Sum("quantity")).order_by("-total")[:10])
 
     if previous_users > 0:
         customer_growth = round(((current_users - previous_users) / previous_users) * 100, 2)
@@ -77,8 +88,8 @@ def admin_dashboard_view(request):
         "completed_orders": completed_orders,
         "total_revenue": total_revenue,
         "products_sold": products_sold,
-        "total_stock": total_stock,
-        "low_stock_count": low_stock_count,
+        "total_stock": stock["total_stock"],
+        "low_stock_count": stock["low_stock_count"],
         "new_customers": new_customers,
         "customer_growth": customer_growth,
         "orders":orders,
@@ -97,7 +108,7 @@ def admin_dashboard_view(request):
 def admin_user_list(request):
     query = request.GET.get("q", "").strip()
     status = request.GET.get("status", "")
-    users = CustomUser.objects.filter(role=CustomUser.ROLE_CUSTOMER).order_by('-date_joined')
+    users = CustomUser.objects.filter(role=CustomUser.ROLE_CUSTOMER)
     if query:
         users = users.filter(
             Q(username__icontains=query) |
@@ -110,11 +121,7 @@ def admin_user_list(request):
     elif status == "blocked":
         users = users.filter(is_active=False)
 
-    users = users.order_by("-date_joined") 
-    users = users.order_by("-date_joined")
-    paginator = Paginator(users, 15)
-    page_number = request.GET.get("page", 1)
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate_listing(request, users, ["-date_joined", "-id"], 15)
     context = {"users": page_obj,"query": query, "status": status}
     return render(request, "accounts/admin/customer_list.html",context)
 
@@ -167,36 +174,44 @@ def admin_user_detail(request, user_id):
 
 @admin_login_required
 def admin_sales_report(request):
-    orders = Order.objects.all().order_by("-order_date")
-
-    # Daily, Weekly, Yearly filters
-    report_type = request.GET.get("type") 
-    if report_type == "daily":
-        start = timezone.now().date()
-        orders = orders.filter(order_date__date=start)
-    elif report_type == "weekly":
-        start = timezone.now() - timedelta(days=7)
-        orders = orders.filter(order_date__gte=start)
-    elif report_type == "yearly":
-        start = timezone.now() - timedelta(days=365)
-        orders = orders.filter(order_date__gte=start)
-
-    # Custom date range
+    report_type = request.GET.get("type")
     start_date = request.GET.get("start_date")
     end_date = request.GET.get("end_date")
-    if start_date and end_date:
-        orders = orders.filter(order_date__date__gte=start_date,
-                                order_date__date__lte=end_date)
+    orders = sales_report_orders(report_type, start_date, end_date)
 
     # Aggregates
-    total_sales = orders.aggregate(total=Sum("final_amount"))["total"] or 0
-    total_orders = orders.count()
+    totals = orders.aggregate(total_sales=Sum("final_amount"), total_orders=Count("id"))
+
+    page_obj = paginate_listing(request, orders.select_related("user"), ["-order_date", "-id"], 20)
+
+    # filters kept on page links / export
+    params = request.GET.copy()
+    params.pop("page", None)
+    params.pop("cursor", None)
 
     return render(request, "accounts/admin/admin_sales_report.html", {
-        "orders": orders,
-        "total_sales": total_sales,
-        "total_orders": total_orders,
+        "orders": page_obj,
+        "revenue_by_day": revenue_by_day(orders),
+        "total_sales": totals["total_sales"] or 0,
+        "total_orders": totals["total_orders"],
         "report_type": report_type,
         "start_date": start_date,
         "end_date": end_date,
-    })
\ No newline at end of file
+        "query_string": params.urlencode(),
+    })
+
+@admin_login_required
+def admin_sales_report_export(request):
+    orders = sales_report_orders(
+        request.GET.get("type"),
+        request.GET.get("start_date"),
+        request.GET.get("end_date"),
+    )
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in sales_export_rows(orders)),
+        content_type="text/csv",
+    )
+    filename = f"sales_report_{timezone.localdate():%Y%m%d}.csv"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
\ No newline at end of file
@@ -3,7 +3,7 @@ from django.contrib.auth import login, logout, authenticate, get_user_model
 from accounts.decorators import user_login_required,admin_login_required
 from django.utils.crypto import get_random_string
 from django.shortcuts import render, redirect
-from django.core.mail import send_mail
+from jobs.services.email import send_email
 from accounts.models import *
 from django.contrib import messages
 from django.utils import timezone
@@ -137,7 +137,7 @@ def user_signup(request):
         user.save()
 
         try:
-            send_mail(
+            send_email(
                 subject="Verify your Kiddora account",
                 message=(
                     "Hi,\n\n"
@@ -149,8 +149,7 @@ def user_signup(request):
                     "Kiddora Team"
                 ),
                 from_email=settings.EMAIL_HOST_USER,
-                recipient_list=[user.email],
-                fail_silently=False
+                recipient_list=[user.email]
             )
         except Exception as e:
             print("EMAIL ERROR:", e)
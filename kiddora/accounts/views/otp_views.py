@@ -1,7 +1,7 @@
 from django.views.decorators.cache import never_cache
 from django.utils.crypto import get_random_string
 from django.contrib.auth import get_user_model
-from django.core .mail import send_mail
+from jobs.services.email import send_email
 from django.shortcuts import render, redirect, get_object_or_404
 from accounts.models import *
 from django.contrib import messages
@@ -63,7 +63,7 @@ def resend_signup_otp(request):
 
     user = CustomUser.objects.get(id=user_id)
     try:
-        send_mail(
+        send_email(
             "Resend OTP - Kiddora",
             message=(
                 "Hi,\n\n"
@@ -75,8 +75,7 @@ def resend_signup_otp(request):
                 "Kiddora Team"
             ),
             from_email=settings.EMAIL_HOST_USER,
-            recipient_list=[user.email],
-            fail_silently=False
+            recipient_list=[user.email]
         )
     except Exception as e:
         messages.error(request, "Failed to send OTP. Try again later.")
@@ -113,7 +112,7 @@ def forgot_password(request):
 
             # Send OTP email
             try:
-                send_mail(
+                send_email(
                     subject="Password Reset OTP - Kiddora",
                     message = (
                         "Hi,\n\n"
@@ -125,8 +124,7 @@ def forgot_password(request):
                         "Kiddora Team"
                     ),
                     from_email=settings.EMAIL_HOST_USER,
-                    recipient_list=[user.email],
-                    fail_silently=False
+                    recipient_list=[user.email]
                 )
             except Exception as e:
                 messages.error(request, "Failed to send OTP. Try again later.")
@@ -5,7 +5,7 @@ from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth import get_user_model, logout
 from shopcore.models import *
 from django.shortcuts import render, redirect
-from django.core.mail import send_mail
+from jobs.services.email import send_email
 from accounts.models import *
 from django.contrib import messages
 from django.utils import timezone
@@ -129,7 +129,7 @@ def change_email(request):
         user.save()
         # SEND OTP EMAIL (CRITICAL FIX)
         try:
-            send_mail(
+            send_email(
                 subject="Email Change OTP",
                 message=(
                     "Hi,\n\n"
@@ -141,8 +141,7 @@ def change_email(request):
                     "Kiddora Team"
                 ),
                 from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[new_email],
-                fail_silently=False,
+                recipient_list=[new_email]
             )
         except Exception as e:
             messages.error(request, "Failed to send OTP. Try again later.")
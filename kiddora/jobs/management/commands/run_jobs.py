@@ -0,0 +1,31 @@
+import time
+from django.core.management.base import BaseCommand
+from jobs.services.email import close_connection
+from jobs.services.queue import run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (emails etc). Keep one or more of these running alongside the web workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10)
+        parser.add_argument("--sleep", type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Drain the queue and exit.")
+
+    def handle(self, *args, **options):
+        processed = 0
+        try:
+            while True:
+                count = run_pending_jobs(options["batch_size"])
+                processed += count
+                if count:
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            close_connection()
+
+        self.stdout.write(self.style.SUCCESS(f"{processed} jobs run."))
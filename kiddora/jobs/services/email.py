@@ -0,0 +1,60 @@
+import threading
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from jobs.services.queue import enqueue, register
+
+# One SMTP connection per process, reused across messages instead of a
+# connect / login / quit round trip for every email.
+_connection = None
+_lock = threading.Lock()
+
+
+def _get_connection():
+    global _connection
+    if _connection is None:
+        _connection = get_connection(fail_silently=False)
+        _connection.open()
+    return _connection
+
+
+def close_connection():
+    global _connection
+    if _connection is not None:
+        try:
+            _connection.close()
+        except Exception:
+            pass
+        _connection = None
+
+
+# message bodies carry OTPs and reset links
+@register("send_email", sensitive=("message",))
+def send_email_job(subject, message, from_email, recipient_list):
+    with _lock:
+        for retry in (False, True):
+            email = EmailMessage(
+                subject, message, from_email, recipient_list,
+                connection=_get_connection(),
+            )
+            try:
+                email.send()
+                return
+            except Exception:
+                # the server may have dropped an idle connection,
+                # reconnect once before giving up
+                close_connection()
+                if retry:
+                    raise
+
+
+def send_email(subject, message, from_email=None, recipient_list=None):
+    """
+    Queue a plain-text email; same arguments as django's send_mail.
+    """
+    return enqueue(
+        "send_email",
+        subject=subject,
+        message=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipient_list=list(recipient_list or []),
+    )
@@ -0,0 +1,163 @@
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from jobs.models import Job
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 3600
+LOCK_TIMEOUT = timedelta(minutes=10)
+
+BACKENDS = ("thread", "database")
+SCRUBBED = "[scrubbed]"
+
+_handlers = {}
+_sensitive = {}
+_executor = None
+
+
+def register(name, sensitive=()):
+    """
+    Register a function as the handler for a job type. `sensitive`
+    payload fields (OTPs, links) are scrubbed from jobs kept as FAILED.
+
+    usage:
+    @register("send_email", sensitive=("message",))
+    def send_email_job(subject, message, ...): ...
+    """
+    def decorator(func):
+        _handlers[name] = func
+        _sensitive[name] = tuple(sensitive)
+        return func
+    return decorator
+
+
+def scrub_payload(name, payload):
+    return {key: SCRUBBED if key in _sensitive.get(name, ()) else value for key, value in payload.items()}
+
+
+def retry_delay(attempts):
+    """
+    Exponential backoff: 10s, 20s, 40s ... capped at an hour.
+    """
+    return min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+
+
+def enqueue(name, max_attempts=5, **payload):
+    """
+    Queue a job on the configured backend (settings.JOBS_BACKEND):
+    "thread" runs it in an in-process thread pool, "database" stores it
+    for the run_jobs worker. Either way the job only starts after the
+    current transaction commits.
+    """
+    if name not in _handlers:
+        raise ValueError(f"Unknown job type: {name}")
+
+    backend = getattr(settings, "JOBS_BACKEND", "thread")
+    if backend not in BACKENDS:
+        raise ImproperlyConfigured(f"JOBS_BACKEND must be one of {BACKENDS}, not {backend!r}")
+    if backend == "thread":
+        transaction.on_commit(lambda: _submit(name, payload, max_attempts))
+        return None
+    return Job.objects.create(name=name, payload=payload, max_attempts=max_attempts)
+
+
+# -----------------------------
+# THREAD BACKEND
+# -----------------------------
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "JOBS_THREAD_WORKERS", 4),
+            thread_name_prefix="jobs",
+        )
+    return _executor
+
+
+def _submit(name, payload, max_attempts, attempt=1):
+    _get_executor().submit(_run_in_thread, name, payload, max_attempts, attempt)
+
+
+def _run_in_thread(name, payload, max_attempts, attempt=1):
+    try:
+        _handlers[name](**payload)
+    except Exception:
+        logger.exception("Job %s failed (attempt %s/%s)", name, attempt, max_attempts)
+        if attempt < max_attempts:
+            # wait on a timer, the pool thread goes back to other jobs
+            timer = threading.Timer(retry_delay(attempt), _submit, (name, payload, max_attempts, attempt + 1))
+            timer.daemon = True
+            timer.start()
+    finally:
+        close_old_connections()
+
+
+# -----------------------------
+# DATABASE BACKEND
+# -----------------------------
+def claim_jobs(batch_size=10):
+    """
+    Mark up to batch_size due jobs as RUNNING and return them.
+    SKIP LOCKED lets several workers poll the table without blocking
+    each other. RUNNING jobs whose worker died are picked up again
+    after LOCK_TIMEOUT.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status="PENDING", run_at__lte=now)
+                | Q(status="RUNNING", locked_at__lt=now - LOCK_TIMEOUT)
+            )
+            .order_by("run_at", "id")[:batch_size]
+        )
+        Job.objects.filter(id__in=[job.id for job in jobs]).update(
+            status="RUNNING", locked_at=now, attempts=F("attempts") + 1
+        )
+    for job in jobs:
+        job.attempts += 1
+    return jobs
+
+
+def run_job(job):
+    try:
+        _handlers[job.name](**job.payload)
+    except Exception:
+        logger.exception("Job %s #%s failed (attempt %s/%s)", job.name, job.id, job.attempts, job.max_attempts)
+        if job.attempts >= job.max_attempts:
+            Job.objects.filter(id=job.id).update(
+                status="FAILED",
+                payload=scrub_payload(job.name, job.payload),
+                last_error=traceback.format_exc(),
+            )
+        else:
+            Job.objects.filter(id=job.id).update(
+                status="PENDING",
+                run_at=timezone.now() + timedelta(seconds=retry_delay(job.attempts)),
+                last_error=traceback.format_exc(),
+            )
+        return False
+
+    Job.objects.filter(id=job.id).delete()
+    return True
+
+
+def run_pending_jobs(batch_size=10):
+    """
+    Claim and run one batch. Returns how many jobs were run.
+    """
+    jobs = claim_jobs(batch_size)
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
@@ -0,0 +1,141 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+from jobs.models import Job
+from jobs.services import queue
+from jobs.services.queue import (
+    SCRUBBED, claim_jobs, enqueue, register, retry_delay, run_job, run_pending_jobs,
+)
+
+calls = []
+
+
+@register("test_ok")
+def ok_job(**payload):
+    calls.append(payload)
+
+
+@register("test_fail", sensitive=("otp",))
+def failing_job(**payload):
+    raise RuntimeError("smtp down")
+
+
+@override_settings(JOBS_BACKEND="database")
+class DatabaseBackendTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_stores_a_pending_job(self):
+        job = enqueue("test_ok", max_attempts=3, to="a@example.com")
+        self.assertEqual((job.status, job.payload, job.max_attempts), ("PENDING", {"to": "a@example.com"}, 3))
+
+    def test_unknown_job_type(self):
+        with self.assertRaises(ValueError):
+            enqueue("nope")
+
+    @override_settings(JOBS_BACKEND="celery")
+    def test_unknown_backend_fails_loudly(self):
+        with self.assertRaises(ImproperlyConfigured):
+            enqueue("test_ok")
+
+    def test_claim_marks_running_and_counts_the_attempt(self):
+        due = enqueue("test_ok")
+        Job.objects.create(name="test_ok", run_at=timezone.now() + timedelta(minutes=5))
+
+        self.assertEqual([job.id for job in claim_jobs()], [due.id])
+        due.refresh_from_db()
+        self.assertEqual((due.status, due.attempts), ("RUNNING", 1))
+        self.assertEqual(claim_jobs(), [])
+
+    def test_stale_running_job_is_claimed_again(self):
+        job = Job.objects.create(
+            name="test_ok", status="RUNNING", attempts=1,
+            locked_at=timezone.now() - queue.LOCK_TIMEOUT - timedelta(seconds=1),
+        )
+        self.assertEqual([claimed.attempts for claimed in claim_jobs()], [2])
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+
+    def test_success_deletes_the_job(self):
+        enqueue("test_ok", to="a@example.com")
+        self.assertEqual(run_pending_jobs(), 1)
+        self.assertEqual(calls, [{"to": "a@example.com"}])
+        self.assertFalse(Job.objects.exists())
+
+    def test_failure_is_retried_with_backoff(self):
+        job = enqueue("test_fail", otp="123456")
+        before = timezone.now()
+        [claimed] = claim_jobs()
+        with self.assertLogs("jobs.services.queue", "ERROR"):
+            self.assertFalse(run_job(claimed))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "PENDING")
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=retry_delay(1)))
+        self.assertEqual(job.payload, {"otp": "123456"})
+        self.assertIn("smtp down", job.last_error)
+
+    def test_final_failure_scrubs_sensitive_fields(self):
+        job = enqueue("test_fail", max_attempts=1, otp="123456", to="a@example.com")
+        [claimed] = claim_jobs()
+        with self.assertLogs("jobs.services.queue", "ERROR"):
+            run_job(claimed)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "FAILED")
+        self.assertEqual(job.payload, {"otp": SCRUBBED, "to": "a@example.com"})
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        self.assertEqual([retry_delay(n) for n in (1, 2, 3)], [10, 20, 40])
+        self.assertEqual(retry_delay(30), queue.RETRY_MAX_SECONDS)
+
+
+@override_settings(JOBS_BACKEND="thread")
+class ThreadBackendTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_runs_after_commit_without_a_job_row(self):
+        with mock.patch.object(queue, "_get_executor") as executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertIsNone(enqueue("test_ok", to="a@example.com"))
+                executor.assert_not_called()
+        executor.return_value.submit.assert_called_once_with(
+            queue._run_in_thread, "test_ok", {"to": "a@example.com"}, 5, 1,
+        )
+        self.assertFalse(Job.objects.exists())
+
+    def test_retry_waits_on_a_timer_not_in_the_pool(self):
+        with mock.patch.object(queue.threading, "Timer") as timer, mock.patch.object(queue.logger, "exception"):
+            queue._run_in_thread("test_fail", {}, 3, 1)
+            queue._run_in_thread("test_fail", {}, 3, 3)
+        timer.assert_called_once_with(retry_delay(1), queue._submit, ("test_fail", {}, 3, 2))
+        timer.return_value.start.assert_called_once_with()
+
+
+@skipUnlessDBFeature("has_select_for_update_skip_locked")
+@override_settings(JOBS_BACKEND="database")
+class SkipLockedTests(TransactionTestCase):
+    def test_jobs_locked_by_another_worker_are_skipped(self):
+        locked, free = enqueue("test_ok"), enqueue("test_ok")
+        held, release = threading.Event(), threading.Event()
+
+        def other_worker():
+            with transaction.atomic():
+                list(Job.objects.select_for_update().filter(id=locked.id))
+                held.set()
+                release.wait(5)
+            connection.close()
+
+        worker = threading.Thread(target=other_worker)
+        worker.start()
+        try:
+            held.wait(5)
+            self.assertEqual([job.id for job in claim_jobs()], [free.id])
+        finally:
+            release.set()
+            worker.join()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -39,11 +40,13 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     #local apps
     'accounts',
     'shopcore',
     'products',
     'payments',
+    'jobs',
 
     # Third-party
     'rest_framework',
@@ -57,6 +60,7 @@ SITE_ID = 4
 
 
 MIDDLEWARE = [
+    'utils.instrumentation.PerformanceMiddleware', #query count / timings per view, keep first
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,6 +87,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'utils.context_processors.catalog_cache',
+                'utils.context_processors.cart_badge',
             ],
         },
     },
@@ -105,6 +111,32 @@ DATABASES = {
     }
 }
 
+# Cache
+# Local memory by default; set REDIS_URL to share the cache between workers
+
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'kiddora',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'kiddora',
+        }
+    }
+
+# seconds an anonymous catalog page / product card stays cached
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', 600))
+CART_CACHE_TIMEOUT = int(os.getenv('CART_CACHE_TIMEOUT', 3600))
+# seconds a new order's stock stays reserved while it waits for payment
+ORDER_RESERVATION_TTL = int(os.getenv('ORDER_RESERVATION_TTL', 1800))
+
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
 # Password validation
@@ -179,5 +211,30 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL')
 
+# Background jobs: "thread" (in-process) or "database" (needs a run_jobs
+# worker running, otherwise jobs just pile up in the table)
+JOBS_BACKEND = os.getenv('JOBS_BACKEND', 'thread')
+JOBS_THREAD_WORKERS = int(os.getenv('JOBS_THREAD_WORKERS', 4))
+
+# Per-request query count / DB / template / total time, logged as JSON
+# lines by utils.instrumentation.PerformanceMiddleware
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'kiddora.performance': {
+            'handlers': ['console'],
+            'level': os.getenv('PERFORMANCE_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Views over their @query_budget raise instead of logging a warning
+QUERY_BUDGET_STRICT = 'test' in sys.argv or os.getenv('QUERY_BUDGET_STRICT') == 'True'
+
 RAZORPAY_KEY_ID = "rzp_test_xxxxx"
 RAZORPAY_KEY_SECRET = "xxxxxxxx"
@@ -13,6 +13,8 @@ class Payment(models.Model):
 
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
     payment_method = models.CharField(max_length=30)
+    # set by initiate_payment, payment_success finds the payment by it
+    razorpay_order_id = models.CharField(max_length=100, null=True, blank=True, db_index=True)
     transaction_id = models.UUIDField(default=uuid.uuid4, unique=True)
     payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES)
     paid_at = models.DateTimeField(null=True, blank=True)
@@ -1,6 +1,7 @@
 from django.urls import path
 from .views import payment_views
 from .views import wallet_payment_views
+from .views import wallet_views
 
 app_name = 'payments'
 
@@ -11,4 +12,12 @@ urlpatterns = [
     path('user/payment/retry/', payment_views.retry_payment, name='retry_payment'),
 
     path('user/profile/wallet/pay/', wallet_payment_views.wallet_payment, name='wallet_payment'),
+
+    path('user/profile/wallet/', wallet_views.wallet_overview, name='wallet_overview'),
+    path('user/profile/wallet/transactions/', wallet_views.wallet_transactions, name='wallet_transactions'),
+    path('user/profile/wallet/transactions/history/', wallet_views.wallet_history_api, name='wallet_history_api'),
+
+    path('admin/wallets/', wallet_views.admin_wallet_list, name='admin_wallet_list'),
+    path('admin/wallets/<int:wallet_id>/', wallet_views.admin_wallet_detail, name='admin_wallet_detail'),
+    path('admin/wallets/<int:wallet_id>/history/', wallet_views.admin_wallet_history_api, name='admin_wallet_history_api'),
 ]
\ No newline at end of file
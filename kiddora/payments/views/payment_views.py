@@ -5,7 +5,10 @@ from django.http import JsonResponse
 from django.utils.timezone import now
 from django.contrib import messages
 from django.views.decorators.csrf import csrf_exempt
+from django.db import transaction
 from accounts.decorators import admin_login_required, user_login_required
+from shopcore.services import wallet as wallet_service
+from shopcore.services.reservations import ReservationExpired, lock_payable_order
 
 from shopcore.models import *
 from ..models import *
@@ -17,6 +20,10 @@ razorpay_client = razorpay.Client(
 @user_login_required
 def initiate_payment(request, order_id):
     order = get_object_or_404(Order, id=order_id, user=request.user)
+    if order.order_status == "CANCELLED":
+        # unpaid for too long, its reservation was released
+        messages.error(request, "This order has expired. Please place it again.")
+        return redirect("orders:order_detail", order.id)
 
     payment, created = Payment.objects.get_or_create(
         order=order,
@@ -61,16 +68,43 @@ def payment_success(request):
     except razorpay.errors.SignatureVerificationError:
         return redirect("payments:payment_failed", payment_id=payment.id)
 
-    payment.payment_status = "PAID"
-    payment.paid_at = now()
-    payment.retry_allowed = False
-    payment.save()
-
-    payment.order.payment_status = "PAID"
-    payment.order.save(update_fields=["payment_status"])
-
+    with transaction.atomic():
+        payment = Payment.objects.select_for_update().get(pk=payment.pk)
+        order = payment.order
+        # a repeated callback finds the payment already settled
+        if payment.payment_status not in ("PAID", "REFUNDED"):
+            try:
+                order = lock_payable_order(payment.order_id)
+            except ReservationExpired:
+                # the money was taken but the stock is gone: keep the
+                # payment on record and give the amount back to the wallet
+                refund = wallet_service.credit(
+                    Wallet.objects.get_or_create(user=order.user)[0], order.final_amount,
+                    txn_type="REFUND", reference_type="ORDER", reference_id=order.id,
+                )
+                payment.payment_status = "REFUNDED"
+                payment.paid_at = now()
+                payment.retry_allowed = False
+                payment.failure_reason = "This order expired before the payment arrived. The amount was refunded to your wallet."
+                payment.refund_reference = str(refund.id) if refund else None
+                payment.save()
+            else:
+                payment.payment_status = "PAID"
+                payment.paid_at = now()
+                payment.retry_allowed = False
+                payment.save()
+
+                order.payment_status = "PAID"
+                order.reservation_expires_at = None
+                order.save(update_fields=["payment_status", "reservation_expires_at"])
+
+    if payment.payment_status == "REFUNDED":
+        return render(request, "payments/payment_failed.html", {
+            "order": order,
+            "payment": payment
+        })
     return render(request, "payments/payment_success.html", {
-        "order": payment.order,
+        "order": order,
         "payment": payment
     })
 
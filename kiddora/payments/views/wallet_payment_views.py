@@ -1,19 +1,28 @@
 
 from django.conf import settings
-from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.shortcuts import render, redirect
+from django.http import Http404, JsonResponse
 from django.utils.timezone import now
 from django.contrib import messages
 from django.views.decorators.csrf import csrf_exempt
 from accounts.decorators import admin_login_required, user_login_required
 from shopcore.models import *
+from shopcore.services import wallet as wallet_service
+from shopcore.services.reservations import ReservationExpired, lock_payable_order
 from django.db import transaction
 from ..models import *
 
 @user_login_required
 @transaction.atomic
 def wallet_payment(request, order_id):
-    order = get_object_or_404(Order, id=order_id, user=request.user)
+    try:
+        # held until the debit commits, the sweeper can't cancel it meanwhile
+        order = lock_payable_order(order_id, user=request.user)
+    except Order.DoesNotExist:
+        raise Http404
+    except ReservationExpired:
+        messages.error(request, "This order has expired. Please place it again.")
+        return redirect("cart:checkout")
     wallet = request.user.wallet
 
     if wallet.balance <= 0:
@@ -22,16 +31,14 @@ def wallet_payment(request, order_id):
 
     payable = min(wallet.balance, order.final_amount)
 
-    wallet.balance -= payable
-    wallet.save(update_fields=["balance"])
-
-    WalletTransaction.objects.create(
-        wallet=wallet,
-        txn_type="DEBIT",
-        amount=payable,
-        reference_type="ORDER",
-        reference_id=str(order.id)
-    )
+    try:
+        debited = wallet_service.debit(wallet, payable, reference_type="ORDER", reference_id=order.id)
+    except wallet_service.InsufficientBalance:
+        messages.error(request, "Insufficient wallet balance.")
+        return redirect("cart:checkout")
+    if debited is None:
+        # already paid from the wallet (double submit)
+        return redirect("payments:payment_success", order.id)
 
     Payment.objects.create(
         order=order,
@@ -42,7 +49,8 @@ def wallet_payment(request, order_id):
     )
 
     order.payment_status = "PAID"
-    order.save(update_fields=["payment_status"])
+    order.reservation_expires_at = None
+    order.save(update_fields=["payment_status", "reservation_expires_at"])
 
     messages.success(request, "Payment completed using wallet.")
     return redirect("payments:payment_success", order.id)
\ No newline at end of file
@@ -0,0 +1,140 @@
+from datetime import date
+from django.core.paginator import Paginator
+from django.db.models import F, Q
+from django.http import JsonResponse
+from django.shortcuts import render, get_object_or_404
+from django.views.decorators.cache import never_cache
+from accounts.decorators import admin_login_required, user_login_required
+from shopcore.models import Wallet, WalletTransaction
+from shopcore.services.wallet import HISTORY_PAGE_SIZE, transaction_history, wallet_activity
+
+MAX_HISTORY_PAGE_SIZE = 100
+WALLET_SORT_OPTIONS = [
+    ("balance", "Highest Balance"),
+    ("activity", "Recent Activity"),
+    ("transactions", "Most Transactions"),
+]
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def _history_filters(request):
+    txn_types = dict(WalletTransaction.TRANSACTION_TYPE_CHOICES)
+    reference_types = dict(WalletTransaction.REFERENCE_TYPE_CHOICES)
+    txn_type = request.GET.get("txn_type", "")
+    reference_type = request.GET.get("reference_type", "")
+    return {
+        "txn_type": txn_type if txn_type in txn_types else None,
+        "reference_type": reference_type if reference_type in reference_types else None,
+        "date_from": _parse_date(request.GET.get("date_from")),
+        "date_to": _parse_date(request.GET.get("date_to")),
+    }
+
+
+def _history_page(request, wallet, limit=HISTORY_PAGE_SIZE):
+    filters = _history_filters(request)
+    page = transaction_history(wallet, cursor=request.GET.get("cursor"), limit=limit, **filters)
+    return page, filters
+
+
+def _history_json(request, wallet):
+    try:
+        limit = min(max(int(request.GET.get("limit", HISTORY_PAGE_SIZE)), 1), MAX_HISTORY_PAGE_SIZE)
+    except ValueError:
+        limit = HISTORY_PAGE_SIZE
+    page, _ = _history_page(request, wallet, limit)
+    return JsonResponse({
+        "balance": str(wallet.balance),
+        "results": [
+            {
+                "id": txn.id,
+                "txn_type": txn.txn_type,
+                "amount": str(txn.amount),
+                "reference_type": txn.reference_type,
+                "reference_id": txn.reference_id,
+                "created_at": txn.created_at.isoformat(),
+                "running_total": str(txn.running_total),
+            }
+            for txn in page
+        ],
+        "next_cursor": page.next_cursor,
+    })
+
+
+def _history_context(request, wallet):
+    page, filters = _history_page(request, wallet)
+    return {
+        "wallet": wallet,
+        "transactions": page,
+        "filters": filters,
+        "txn_type_choices": WalletTransaction.TRANSACTION_TYPE_CHOICES,
+        "reference_type_choices": WalletTransaction.REFERENCE_TYPE_CHOICES,
+    }
+
+
+# USER WALLET
+@never_cache
+@user_login_required
+def wallet_overview(request):
+    wallet, _ = Wallet.objects.get_or_create(user=request.user)
+    recent = transaction_history(wallet, limit=5)
+    return render(request, "wallet/wallet_overview.html", {"wallet": wallet, "recent_transactions": recent})
+
+
+@never_cache
+@user_login_required
+def wallet_transactions(request):
+    wallet, _ = Wallet.objects.get_or_create(user=request.user)
+    return render(request, "wallet/wallet_transactions.html", _history_context(request, wallet))
+
+
+@never_cache
+@user_login_required
+def wallet_history_api(request):
+    wallet, _ = Wallet.objects.get_or_create(user=request.user)
+    return _history_json(request, wallet)
+
+
+# ADMIN WALLETS
+@never_cache
+@admin_login_required
+def admin_wallet_list(request):
+    query = request.GET.get("q", "").strip()
+    sort = request.GET.get("sort", "balance")
+    wallets = wallet_activity(Wallet.objects.select_related("user"))
+    if query:
+        wallets = wallets.filter(Q(user__username__icontains=query) | Q(user__email__icontains=query))
+
+    sort_map = {
+        "balance": [F("balance").desc(), F("id").desc()],
+        "activity": [F("last_activity").desc(nulls_last=True), F("id").desc()],
+        "transactions": [F("txn_count").desc(), F("id").desc()],
+    }
+    if sort not in sort_map:
+        sort = "balance"
+    page_obj = Paginator(wallets.order_by(*sort_map[sort]), 20).get_page(request.GET.get("page"))
+    return render(request, "wallet/admin_wallet_list.html", {
+        "wallets": page_obj,
+        "query": query,
+        "sort": sort,
+        "sort_options": WALLET_SORT_OPTIONS,
+    })
+
+
+@never_cache
+@admin_login_required
+def admin_wallet_detail(request, wallet_id):
+    wallet = get_object_or_404(wallet_activity(Wallet.objects.select_related("user")), id=wallet_id)
+    return render(request, "wallet/admin_wallet_detail.html", _history_context(request, wallet))
+
+
+@never_cache
+@admin_login_required
+def admin_wallet_history_api(request, wallet_id):
+    wallet = get_object_or_404(Wallet, id=wallet_id)
+    return _history_json(request, wallet)
@@ -1,6 +1,14 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.db import transaction
 from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.shortcuts import render
 from .models import *
+from .services.reference_data import bump_reference_version
+from .services.variants import generate_variant_matrix
+from utils.cache import bump_catalog_version
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -14,10 +22,14 @@ class CategoryAdmin(admin.ModelAdmin):
 
     def soft_delete(self, request, queryset):
         queryset.update(is_active=False)
+        transaction.on_commit(bump_reference_version)
+        transaction.on_commit(bump_catalog_version)
     soft_delete.short_description = "Soft delete selected categories"
 
     def restore_category(self, request, queryset):
         queryset.update(is_active=True)
+        transaction.on_commit(bump_reference_version)
+        transaction.on_commit(bump_catalog_version)
     restore_category.short_description = "Restore selected categories"
 
 @admin.register(SubCategory)
@@ -30,9 +42,10 @@ class SubCategoryAdmin(admin.ModelAdmin):
     list_per_page = 20
 
 
-class ProductImageInline(admin.StackedInline):
+class ProductImageInline(admin.TabularInline):
     model = ProductImage
     extra = 1
+    fields = ("image", "position", "is_default")
 
 class ProductVariantInline(admin.TabularInline):
     model = ProductVariant
@@ -42,6 +55,15 @@ class ProductVariantInline(admin.TabularInline):
 class InventoryInline(admin.StackedInline):
     model = Inventory
     extra = 0
+    # stock changes go through the ledger (services.inventory)
+    readonly_fields = ("quantity_available", "quantity_reserved", "quantity_sold")
+    can_delete = False
+    max_num = 0
+
+class VariantMatrixForm(forms.Form):
+    colors = forms.ModelMultipleChoiceField(queryset=Color.objects.order_by("color"))
+    age_groups = forms.ModelMultipleChoiceField(queryset=AgeGroup.objects.order_by("id"))
+    quantity = forms.IntegerField(min_value=0, initial=0, help_text="Opening stock for each new variant.")
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -52,12 +74,14 @@ class ProductAdmin(admin.ModelAdmin):
         "brand",
         "base_price",
         "final_price",
+        "effective_price",
         "is_active",
         "total_stock",
     )
 
     search_fields = (
         "product_name",
+        "product_code",
         "brand",
         "subcategory__subcategory_name",
         "subcategory__category__category_name",
@@ -73,30 +97,62 @@ class ProductAdmin(admin.ModelAdmin):
 
     ordering = ("-id",)
     list_per_page = 20
+    list_select_related = ("subcategory",)
 
     inlines = [
         ProductVariantInline,
         ProductImageInline,
     ]
 
-    actions = ["soft_delete", "restore_product"]
+    actions = ["soft_delete", "restore_product", "generate_variants"]
 
-    def total_stock(self, obj):
-        return (
-            Inventory.objects.filter(variant__product=obj)
-            .aggregate(total=Sum("quantity_available"))["total"]
-            or 0
+    def get_queryset(self, request):
+        # one grouped query for the whole changelist instead of an
+        # aggregate per row
+        return super().get_queryset(request).annotate(
+            stock_total=Coalesce(Sum("variants__inventory__quantity_available"), 0)
         )
+
+    def total_stock(self, obj):
+        return obj.stock_total
     total_stock.short_description = "Stock"
+    total_stock.admin_order_field = "stock_total"
 
     def soft_delete(self, request, queryset):
         queryset.update(is_active=False)
+        # update() sends no signals
+        transaction.on_commit(bump_catalog_version)
     soft_delete.short_description = "Soft delete selected products"
 
     def restore_product(self, request, queryset):
         queryset.update(is_active=True)
+        transaction.on_commit(bump_catalog_version)
     restore_product.short_description = "Restore selected products"
 
+    def generate_variants(self, request, queryset):
+        form = VariantMatrixForm(request.POST if "apply" in request.POST else None)
+        if form.is_valid():
+            created = 0
+            for product in queryset:
+                created += len(generate_variant_matrix(
+                    product,
+                    form.cleaned_data["colors"],
+                    form.cleaned_data["age_groups"],
+                    form.cleaned_data["quantity"],
+                ))
+            self.message_user(request, f"{created} variants created.", messages.SUCCESS)
+            return None
+
+        return render(request, "admin/products/product/variant_matrix.html", {
+            **self.admin_site.each_context(request),
+            "title": "Generate variants",
+            "form": form,
+            "products": queryset,
+            "opts": self.model._meta,
+            "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+        })
+    generate_variants.short_description = "Generate variants (color x age matrix)"
+
 @admin.register(ProductVariant)
 class ProductVariantAdmin(admin.ModelAdmin):
 
@@ -124,6 +180,7 @@ class ProductVariantAdmin(admin.ModelAdmin):
 
     ordering = ("-id",)
     list_per_page = 20
+    list_select_related = ("product", "color", "age_group", "inventory")
 
     inlines = [InventoryInline]
 
@@ -133,7 +190,7 @@ class ProductVariantAdmin(admin.ModelAdmin):
 @admin.register(ProductImage)
 class ProductImageAdmin(admin.ModelAdmin):
 
-    list_display = ("product", "is_default")
+    list_display = ("product", "position", "is_default")
     search_fields = ("product__product_name",)
     list_filter = ("is_default",)
 
@@ -152,6 +209,21 @@ class InventoryAdmin(admin.ModelAdmin):
     list_filter = ("updated_at",)
     ordering = ("-updated_at",)
     list_per_page = 20
+    readonly_fields = ("quantity_available", "quantity_reserved", "quantity_sold")
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+
+    list_display = (
+        "variant", "reason", "delta_available", "delta_reserved",
+        "delta_sold", "reference_type", "reference_id", "created_at",
+    )
+    list_select_related = ("variant", "variant__product", "variant__color", "variant__age_group")
+    search_fields = ("variant__sku", "reference_id")
+    list_filter = ("reason",)
+    raw_id_fields = ("variant",)
+    ordering = ("-created_at", "-id")
+    list_per_page = 50
 
 @admin.register(Color)
 class ColorAdmin(admin.ModelAdmin):
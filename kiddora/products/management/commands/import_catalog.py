@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from products.services.catalog_import import DEFAULT_BATCH_SIZE, FEED_COLUMNS, import_catalog, read_feed
+
+
+class Command(BaseCommand):
+    help = (
+        "Import / update products, variants and stock from a CSV or JSON Lines (.jsonl) feed. "
+        f"Columns: {', '.join(FEED_COLUMNS)}."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        with open(options["path"], newline="", encoding="utf-8-sig") as f:
+            result = import_catalog(read_feed(f, options["path"]), batch_size=options["batch_size"])
+
+        for line, message in result["errors"]:
+            self.stderr.write(f"line {line}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['rows']} rows imported: {result['products']} products, "
+            f"{result['variants_created']} new variants, {len(result['errors'])} errors."
+        ))
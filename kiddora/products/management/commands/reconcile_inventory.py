@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from products.services.inventory import find_stock_drift, reconcile_stock
+from products.services.popularity import reconcile_sold_counts
+
+
+class Command(BaseCommand):
+    help = "Compare Inventory counters with the stock movement ledger. Run periodically (cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix", action="store_true",
+            help="Overwrite drifted counters with the ledger's values.",
+        )
+
+    def handle(self, *args, **options):
+        drift = find_stock_drift()
+        for variant_id, counters, ledger in drift:
+            self.stdout.write(self.style.WARNING(
+                f"Variant {variant_id}: available/reserved/sold {counters}, ledger {ledger}"
+            ))
+        self.stdout.write(f"{len(drift)} inventory row(s) out of step with the ledger.")
+
+        if options["fix"] and drift:
+            fixed = reconcile_stock(drift)
+            if any(counters[2] != ledger[2] for _, counters, ledger in drift):
+                reconcile_sold_counts()
+            self.stdout.write(self.style.SUCCESS(f"Inventory reconciled for {fixed} variant(s)."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from products.services.popularity import reconcile_sold_counts, refresh_trending_scores
+
+
+class Command(BaseCommand):
+    help = "Reconcile Product.sold_count with inventory and refresh trending scores. Run periodically (cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--window-days", type=int, default=30)
+        parser.add_argument("--half-life-days", type=float, default=7)
+
+    def handle(self, *args, **options):
+        reconciled = reconcile_sold_counts()
+        trending = refresh_trending_scores(
+            window_days=options["window_days"],
+            half_life_days=options["half_life_days"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"sold_count reconciled for {reconciled} products, "
+            f"{trending} products have a trending score."
+        ))
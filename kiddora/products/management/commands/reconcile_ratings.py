@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from products.services.ratings import reconcile_ratings
+
+
+class Command(BaseCommand):
+    help = "Recompute Product rating count / average / histogram from reviews. Run periodically (cron) to fix drift."
+
+    def handle(self, *args, **options):
+        reconciled = reconcile_ratings()
+        self.stdout.write(self.style.SUCCESS(f"Ratings reconciled for {reconciled} products."))
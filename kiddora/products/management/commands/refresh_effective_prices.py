@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from products.services.pricing import refresh_effective_prices
+from utils.cache import bump_catalog_version
+
+
+class Command(BaseCommand):
+    help = "Recompute every product's effective price from its discount and the active offers."
+
+    def handle(self, *args, **options):
+        updated = refresh_effective_prices()
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f"Effective prices refreshed for {updated} products."))
@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-18 12:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_alter_productvariant_barcode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(choices=[('category', 'Category'), ('subcategory', 'Subcategory'), ('color', 'Color'), ('age_group', 'Age Group'), ('gender', 'Gender'), ('fabric', 'Fabric')], max_length=20)),
+                ('value', models.CharField(max_length=50)),
+                ('label', models.CharField(max_length=100)),
+                ('parent_value', models.CharField(blank=True, max_length=50)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facets', to='products.product')),
+            ],
+            options={
+                'unique_together': {('product', 'facet', 'value')},
+            },
+        ),
+    ]
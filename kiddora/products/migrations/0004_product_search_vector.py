@@ -0,0 +1,48 @@
+# Generated by Django 6.0 on 2026-10-18 12:58
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+BACKFILL_SEARCH_VECTOR = """
+UPDATE products_product AS p
+SET search_vector =
+    setweight(to_tsvector('english', coalesce(p.product_name, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(p.brand, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(s.subcategory_name, '') || ' ' || coalesce(c.category_name, '')), 'C') ||
+    setweight(to_tsvector('english', coalesce(p.about_product, '')), 'D')
+FROM products_subcategory AS s
+JOIN products_category AS c ON c.id = s.category_id
+WHERE s.id = p.subcategory_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_productfacet'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(BACKFILL_SEARCH_VECTOR, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['product_name'], name='product_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['brand'], name='product_brand_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
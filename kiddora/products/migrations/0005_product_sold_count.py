@@ -0,0 +1,47 @@
+# Generated by Django 6.0 on 2026-10-18 13:01
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_sold_count(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    Inventory = apps.get_model("products", "Inventory")
+    sold = (
+        Inventory.objects
+        .filter(variant__product=OuterRef("pk"))
+        .values("variant__product")
+        .annotate(total=Sum("quantity_sold"))
+        .values("total")
+    )
+    Product.objects.update(sold_count=Coalesce(Subquery(sold), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='sold_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_sold_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['sold_count', 'id'], name='product_sold_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['trending_score', 'id'], name='product_trending_idx'),
+        ),
+    ]
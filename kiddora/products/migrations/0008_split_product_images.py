@@ -0,0 +1,67 @@
+from django.db import migrations
+
+IMAGE_FIELDS = ("image1", "image2", "image3", "image4", "image5")
+
+
+def split_images(apps, schema_editor):
+    """
+    One row per uploaded image. The first image of the old default row
+    (or of the first row, if none was marked) becomes the default.
+    """
+    ProductImage = apps.get_model("products", "ProductImage")
+
+    old_rows = ProductImage.objects.filter(image__isnull=True).order_by("product_id", "-is_default", "id")
+    new_rows = []
+    old_ids = []
+    positions = {}
+    for row in old_rows.iterator():
+        old_ids.append(row.id)
+        for field in IMAGE_FIELDS:
+            name = getattr(row, field).name
+            if not name:
+                continue
+            position = positions.get(row.product_id, 0)
+            positions[row.product_id] = position + 1
+            new_rows.append(ProductImage(
+                product_id=row.product_id,
+                image=name,
+                position=position,
+                is_default=position == 0,
+                renditions=row.renditions.get(field, {}),
+            ))
+
+    ProductImage.objects.filter(id__in=old_ids).delete()
+    ProductImage.objects.bulk_create(new_rows, batch_size=500)
+
+
+def merge_images(apps, schema_editor):
+    ProductImage = apps.get_model("products", "ProductImage")
+
+    rows = ProductImage.objects.filter(image__isnull=False).order_by("product_id", "position", "id")
+    by_product = {}
+    for row in rows.iterator():
+        by_product.setdefault(row.product_id, []).append(row)
+
+    merged = []
+    for product_id, images in by_product.items():
+        for start in range(0, len(images), len(IMAGE_FIELDS)):
+            chunk = images[start:start + len(IMAGE_FIELDS)]
+            old = ProductImage(product_id=product_id, is_default=start == 0, renditions={})
+            for field, image in zip(IMAGE_FIELDS, chunk):
+                setattr(old, field, image.image.name)
+                old.renditions[field] = image.renditions
+            merged.append(old)
+
+    rows.delete()
+    ProductImage.objects.bulk_create(merged, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_productimage_image_position'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_images, merge_images),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 6.0 on 2026-10-18 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_split_product_images'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='productimage',
+            options={'ordering': ('position', 'id')},
+        ),
+        migrations.RemoveField(
+            model_name='productimage',
+            name='image1',
+        ),
+        migrations.RemoveField(
+            model_name='productimage',
+            name='image2',
+        ),
+        migrations.RemoveField(
+            model_name='productimage',
+            name='image3',
+        ),
+        migrations.RemoveField(
+            model_name='productimage',
+            name='image4',
+        ),
+        migrations.RemoveField(
+            model_name='productimage',
+            name='image5',
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=models.ImageField(upload_to='product_images/'),
+        ),
+        migrations.AddIndex(
+            model_name='productimage',
+            index=models.Index(fields=['product', 'position'], name='product_image_position_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='productimage',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_default', True)), fields=('product',), name='unique_default_product_image'),
+        ),
+    ]
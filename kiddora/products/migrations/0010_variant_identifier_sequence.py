@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Sequence behind generated variant SKUs / barcodes. INCREMENT BY must
+    match products.services.identifiers.BLOCK_SIZE.
+    """
+
+    dependencies = [
+        ('products', '0009_productimage_one_row_per_image'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE SEQUENCE IF NOT EXISTS products_variant_identifier_seq INCREMENT BY 100 START WITH 1",
+            "DROP SEQUENCE IF EXISTS products_variant_identifier_seq",
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 13:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_variant_identifier_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='product_code',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
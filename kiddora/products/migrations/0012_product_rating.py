@@ -0,0 +1,83 @@
+# Generated by Django 6.0 on 2026-10-18 13:27
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, FloatField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_ratings(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    Review = apps.get_model("shopcore", "Review")
+
+    def per_product(aggregate, output_field=None):
+        stats = (
+            Review.objects
+            .filter(product=OuterRef("pk"))
+            .values("product")
+            .annotate(value=aggregate)
+            .values("value")
+        )
+        return Coalesce(Subquery(stats, output_field=output_field), Value(0), output_field=output_field)
+
+    Product.objects.update(
+        rating_count=per_product(Count("id")),
+        rating_sum=per_product(Sum("rating")),
+        rating_avg=per_product(Avg("rating"), FloatField()),
+        **{f"rating_{stars}": per_product(Count("id", filter=Q(rating=stars))) for stars in range(1, 6)},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_product_code'),
+        ('shopcore', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['rating_avg', 'rating_count', 'id'], name='product_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 6.0 on 2026-10-18 13:40
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest, Round
+
+
+def backfill_effective_prices(apps, schema_editor):
+    # same computation as products.services.pricing.refresh_effective_prices
+    Product = apps.get_model("products", "Product")
+    Offer = apps.get_model("shopcore", "Offer")
+    offers = (
+        Offer.objects
+        .filter(is_active=True, is_deleted=False)
+        .filter(
+            Q(offer_type="PRODUCT", product=OuterRef("pk"))
+            | Q(offer_type="CATEGORY", category__subcategories=OuterRef("subcategory_id"))
+        )
+        .order_by("-priority", "-discount_percent")
+        .values("discount_percent")[:1]
+    )
+    percent = Greatest(F("discount_percent"), Coalesce(Subquery(offers), Value(0)))
+    Product.objects.update(
+        effective_discount=percent,
+        effective_price=Round(
+            F("base_price") - F("base_price") * percent * Value(Decimal("0.01")),
+            2,
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_product_rating'),
+        ('shopcore', '0004_wallet_transaction_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='effective_discount',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_effective_prices, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['effective_price', 'id'], name='product_effective_price_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 6.0 on 2026-10-18 13:44
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def opening_balances(apps, schema_editor):
+    # today's counters are taken as correct; the ledger starts here
+    Inventory = apps.get_model("products", "Inventory")
+    StockMovement = apps.get_model("products", "StockMovement")
+    rows = Inventory.objects.values_list("variant_id", "quantity_available", "quantity_reserved", "quantity_sold")
+    batch = []
+    for variant_id, available, reserved, sold in rows.iterator(chunk_size=5000):
+        batch.append(StockMovement(
+            variant_id=variant_id, reason="OPENING",
+            delta_available=available, delta_reserved=reserved, delta_sold=sold,
+        ))
+        if len(batch) == 5000:
+            StockMovement.objects.bulk_create(batch)
+            batch = []
+    StockMovement.objects.bulk_create(batch)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0013_product_effective_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('OPENING', 'Opening balance'), ('RESTOCK', 'Restock'), ('ADJUSTMENT', 'Adjustment'), ('IMPORT', 'Import'), ('RESERVE', 'Reserved'), ('RELEASE', 'Released'), ('SALE', 'Sold'), ('RETURN', 'Returned')], max_length=20)),
+                ('delta_available', models.IntegerField(default=0)),
+                ('delta_reserved', models.IntegerField(default=0)),
+                ('delta_sold', models.IntegerField(default=0)),
+                ('reference_type', models.CharField(blank=True, choices=[('ORDER', 'Order'), ('RETURN', 'Return')], max_length=20, null=True)),
+                ('reference_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='products.productvariant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['variant', 'created_at', 'id'], name='stock_movement_history_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('reason', 'RETURN')), fields=('variant', 'reference_type', 'reference_id'), name='stock_movement_return_unique')],
+            },
+        ),
+        migrations.RunPython(opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0 on 2026-10-18 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_cache_version'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='stockmovement',
+            name='stock_movement_return_unique',
+        ),
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='reason',
+            field=models.CharField(choices=[('OPENING', 'Opening balance'), ('RESTOCK', 'Restock'), ('ADJUSTMENT', 'Adjustment'), ('IMPORT', 'Import'), ('RESERVE', 'Reserved'), ('RELEASE', 'Released'), ('SALE', 'Sold'), ('RETURN', 'Returned'), ('RECONCILE', 'Reconciled')], max_length=20),
+        ),
+        migrations.AddConstraint(
+            model_name='stockmovement',
+            constraint=models.UniqueConstraint(condition=models.Q(('reason__in', ['RESERVE', 'RELEASE', 'SALE', 'RETURN']), ('reference_id__isnull', False)), fields=('variant', 'reference_type', 'reference_id', 'reason'), name='stock_movement_reference_unique'),
+        ),
+    ]
@@ -1,8 +1,12 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
 from django.utils import timezone
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from decimal import Decimal
-import uuid
+from products.services.identifiers import create_with_identifiers
 
 class Category(models.Model):
     category_name = models.CharField(max_length=100, unique=True)
@@ -45,21 +49,74 @@ class Product(models.Model):
 
     subcategory = models.ForeignKey("SubCategory", on_delete=models.CASCADE, related_name="products")
     product_name = models.CharField(max_length=200)
+    # supplier / feed identifier, the upsert key for catalog imports
+    product_code = models.CharField(max_length=64, unique=True, null=True, blank=True)
     brand = models.CharField(max_length=100)
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES, default="unisex")
     fabric = models.CharField(max_length=20, choices=FABRIC_CHOICES, default="Other")
     base_price = models.DecimalField(max_digits=10, decimal_places=2)
     discount_percent = models.PositiveIntegerField(default=0)
     final_price = models.DecimalField(max_digits=10,decimal_places=2,editable=False)
+    # final_price with the best active offer applied, what the shop
+    # actually charges (see products.services.pricing)
+    effective_price = models.DecimalField(max_digits=10, decimal_places=2, editable=False)
+    effective_discount = models.PositiveIntegerField(default=0, editable=False)
     about_product = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # denormalized from Inventory.quantity_sold, see Inventory.save
+    sold_count = models.PositiveIntegerField(default=0, editable=False)
+    trending_score = models.FloatField(default=0, editable=False)
+    # denormalized from shopcore.Review, kept up to date by the review
+    # signals (see products.services.ratings)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_avg = models.FloatField(default=0, editable=False)
+    rating_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_5 = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["sold_count", "id"], name="product_sold_count_idx"),
+            models.Index(fields=["trending_score", "id"], name="product_trending_idx"),
+            models.Index(fields=["rating_avg", "rating_count", "id"], name="product_rating_idx"),
+            models.Index(fields=["effective_price", "id"], name="product_effective_price_idx"),
+            GinIndex(fields=["search_vector"], name="product_search_vector_idx"),
+            GinIndex(fields=["product_name"], name="product_name_trgm_idx", opclasses=["gin_trgm_ops"]),
+            GinIndex(fields=["brand"], name="product_brand_trgm_idx", opclasses=["gin_trgm_ops"]),
+        ]
 
     def save(self, *args, **kwargs):
         base = Decimal(self.base_price or 0)
         discount = Decimal(self.discount_percent or 0)
         self.final_price = base - (base * discount / Decimal("100"))
+        if self.effective_price is None:
+            # offers are applied by the post_save refresh
+            self.effective_price = self.final_price
+            self.effective_discount = self.discount_percent
         super().save(*args, **kwargs)
 
+    @property
+    def rating_histogram(self):
+        """
+        [(stars, count), ...] from 5 down to 1.
+        """
+        return [(stars, getattr(self, f"rating_{stars}")) for stars in range(5, 0, -1)]
+
+    @property
+    def primary_image(self):
+        """
+        Default image, from the `primary_images` prefetch when present
+        (see products.utils.queryset_utils.primary_image_prefetch).
+        """
+        images = getattr(self, "primary_images", None)
+        if images is None:
+            images = [image for image in self.images.all() if image.is_default]
+        return images[0] if images else None
+
     def __str__(self):
         return self.product_name
     
@@ -169,28 +226,11 @@ class ProductVariant(models.Model):
     class Meta:
         unique_together = ("product", "color", "age_group")
 
-    def generate_unique_sku(self):
-        while True:
-            sku = f"KIDDORA-{uuid.uuid4().hex[:8].upper()}"
-            if not ProductVariant.objects.filter(sku=sku).exists():
-                return sku
-
-    def generate_unique_barcode(self):
-        while True:
-            barcode = uuid.uuid4().int % 10**12
-            barcode = str(barcode).zfill(12)
-            if not ProductVariant.objects.filter(barcode=barcode).exists():
-                return barcode
-
     def save(self, *args, **kwargs):
-
-        if not self.sku:
-            self.sku = self.generate_unique_sku()
-
-        if not self.barcode:
-            self.barcode = self.generate_unique_barcode()
-
-        super().save(*args, **kwargs)
+        if self.sku and self.barcode:
+            return super().save(*args, **kwargs)
+        # sequence-allocated, see products.services.identifiers
+        create_with_identifiers(lambda: super(ProductVariant, self).save(*args, **kwargs), [self])
 
     def __str__(self):
         return f"{self.product.product_name} | {self.color} | {self.age_group}"
@@ -198,23 +238,73 @@ class ProductVariant(models.Model):
 class ProductImage(models.Model):
 
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="images")
-
-    image1 = models.ImageField(upload_to="product_images/",blank=True, null=True)
-    image2 = models.ImageField(upload_to="product_images/",blank=True, null=True)
-    image3 = models.ImageField(upload_to="product_images/",blank=True, null=True)
-    image4 = models.ImageField(upload_to="product_images/",blank=True, null=True)
-    image5 = models.ImageField(upload_to="product_images/",blank=True, null=True)
-
+    image = models.ImageField(upload_to="product_images/")
+    position = models.PositiveSmallIntegerField(default=0)
     is_default = models.BooleanField(default=False)
+    # {"card": {"jpeg": name, "webp": name, "width": .., "height": ..}, ...}
+    # filled in the background by products.services.images
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
+
+    class Meta:
+        ordering = ("position", "id")
+        indexes = [
+            models.Index(fields=["product", "position"], name="product_image_position_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product"],
+                condition=models.Q(is_default=True),
+                name="unique_default_product_image",
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_is_default = instance.__dict__.get("is_default")
+        return instance
 
     def save(self, *args, **kwargs):
-        if self.is_default:
-            ProductImage.objects.filter(product=self.product, is_default=True
-                ).update(is_default=False)
-        super().save(*args, **kwargs)
+        # only clear the previous default when this image becomes the default
+        becoming_default = self.is_default and not getattr(self, "_loaded_is_default", False)
+        with transaction.atomic():
+            if becoming_default:
+                ProductImage.objects.filter(product_id=self.product_id, is_default=True
+                    ).exclude(pk=self.pk).update(is_default=False)
+            super().save(*args, **kwargs)
+        self._loaded_is_default = self.is_default
+
+    def rendition_url(self, label, ext="jpeg"):
+        entry = self.renditions.get(label)
+        if entry:
+            return default_storage.url(entry[ext])
+        return self.image.url
+
+    @property
+    def thumb_url(self):
+        return self.rendition_url("thumb")
+
+    @property
+    def card_url(self):
+        return self.rendition_url("card")
+
+    @property
+    def detail_url(self):
+        return self.rendition_url("detail")
+
+    @property
+    def rendition_urls(self):
+        """
+        Same shape as `renditions` but with URLs, for templates:
+        {{ img.rendition_urls.card.webp }}
+        """
+        return {
+            label: {**entry, "jpeg": default_storage.url(entry["jpeg"]), "webp": default_storage.url(entry["webp"])}
+            for label, entry in self.renditions.items()
+        }
 
     def __str__(self):
-        return f"{self.product.product_name} Images"
+        return f"{self.product.product_name} Image {self.position}"
 
 class Inventory(models.Model):
 
@@ -224,5 +314,115 @@ class Inventory(models.Model):
     quantity_sold = models.PositiveIntegerField(default=0)
     updated_at = models.DateTimeField(auto_now=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_quantity_sold = instance.__dict__.get("quantity_sold")
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        loaded_sold = getattr(self, "_loaded_quantity_sold", 0 if self._state.adding else None)
+        sold_delta = 0
+        if loaded_sold is not None and (update_fields is None or "quantity_sold" in update_fields):
+            sold_delta = self.quantity_sold - loaded_sold
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if sold_delta:
+                Product.objects.filter(variants__id=self.variant_id).update(
+                    sold_count=F("sold_count") + sold_delta
+                )
+        self._loaded_quantity_sold = self.quantity_sold
+
     def __str__(self):
         return f"{self.variant} Inventory"
+
+class StockMovement(models.Model):
+    """
+    Append-only stock ledger: every change to an Inventory row, as a
+    delta per bucket. The counters on Inventory are the running sum of
+    a variant's movements (see products.services.inventory).
+    """
+    REASON_CHOICES = (
+        ("OPENING", "Opening balance"),
+        ("RESTOCK", "Restock"),
+        ("ADJUSTMENT", "Adjustment"),
+        ("IMPORT", "Import"),
+        ("RESERVE", "Reserved"),
+        ("RELEASE", "Released"),
+        ("SALE", "Sold"),
+        ("RETURN", "Returned"),
+        ("RECONCILE", "Reconciled"),
+    )
+
+    REFERENCE_TYPE_CHOICES = (
+        ("ORDER", "Order"),
+        ("RETURN", "Return"),
+    )
+
+    variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name="stock_movements")
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    delta_available = models.IntegerField(default=0)
+    delta_reserved = models.IntegerField(default=0)
+    delta_sold = models.IntegerField(default=0)
+    reference_type = models.CharField(max_length=20, choices=REFERENCE_TYPE_CHOICES, null=True, blank=True)
+    reference_id = models.CharField(max_length=50, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        constraints = [
+            # a reservation, release, sale or return happens once per
+            # variant and order/return, however many callers see it
+            models.UniqueConstraint(
+                fields=["variant", "reference_type", "reference_id", "reason"],
+                condition=models.Q(reason__in=["RESERVE", "RELEASE", "SALE", "RETURN"], reference_id__isnull=False),
+                name="stock_movement_reference_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["variant", "created_at", "id"], name="stock_movement_history_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.variant} {self.reason}"
+
+class ProductFacet(models.Model):
+    """
+    Denormalized facet index used by the catalog sidebar.
+    One row per (product, facet, value), rebuilt whenever the product
+    or its variants change.
+    """
+
+    FACET_CHOICES = [
+        ("category", "Category"),
+        ("subcategory", "Subcategory"),
+        ("color", "Color"),
+        ("age_group", "Age Group"),
+        ("gender", "Gender"),
+        ("fabric", "Fabric"),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="facets")
+    facet = models.CharField(max_length=20, choices=FACET_CHOICES)
+    value = models.CharField(max_length=50)
+    label = models.CharField(max_length=100)
+    parent_value = models.CharField(max_length=50, blank=True)
+
+    class Meta:
+        unique_together = ("product", "facet", "value")
+
+    def __str__(self):
+        return f"{self.product_id} | {self.facet}={self.label}"
+
+class CacheVersion(models.Model):
+    """
+    Shared version numbers in cache keys (catalog, reference data), see
+    utils.cache. Kept in the database so every worker sees a bump,
+    whichever cache backend is configured.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
@@ -0,0 +1,311 @@
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+from django.db import DatabaseError, transaction
+from products.models import AgeGroup, Category, Color, Inventory, Product, ProductVariant, SubCategory
+from products.services.facets import refresh_product_facets
+from products.services.identifiers import create_with_identifiers
+from products.services.inventory import set_available_stock
+from products.services.pricing import refresh_effective_prices
+from products.services.reference_data import bump_reference_version
+from products.services.search import refresh_search_vectors
+from utils.cache import bump_catalog_version
+
+# One feed row per variant; product columns repeat on every variant row
+# of the same product_code (the last row of a batch wins).
+FEED_COLUMNS = [
+    "product_code", "product_name", "category", "subcategory", "brand", "gender", "fabric",
+    "base_price", "discount_percent", "about_product", "is_active",
+    "color", "age", "sku", "barcode", "quantity",
+]
+REQUIRED_COLUMNS = ["product_code", "product_name", "category", "subcategory", "brand", "base_price", "color", "age"]
+PRODUCT_UPDATE_FIELDS = [
+    "product_name", "subcategory", "brand", "gender", "fabric", "base_price",
+    "discount_percent", "final_price", "about_product", "is_active",
+]
+DEFAULT_BATCH_SIZE = 1000
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_feed(file, name=""):
+    """
+    Yield (line_number, row dict) from a CSV (with header) or JSON Lines
+    feed, one row at a time. `file` may be text or binary (an upload).
+    Lines that can't be read come out as rows with an "__error__"
+    message, reported by import_catalog like any other bad row.
+    """
+    if isinstance(file.read(0), bytes):
+        file = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+
+    line_number = 0
+    try:
+        for line_number, row in _read_rows(file, name):
+            yield line_number, row
+    except UnicodeDecodeError:
+        yield line_number + 1, {"__error__": "not UTF-8 text, the rest of the file was not read"}
+
+
+def _read_rows(file, name):
+    if name.lower().endswith((".jsonl", ".ndjson")):
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                row = {"__error__": f"invalid JSON: {e}"}
+            if not isinstance(row, dict):
+                row = {"__error__": "expected a JSON object"}
+            yield line_number, row
+    else:
+        # line 1 is the header
+        for line_number, row in enumerate(csv.DictReader(file), start=2):
+            yield line_number, row
+
+
+def _text(row, column):
+    value = row.get(column)
+    return "" if value is None else str(value).strip()
+
+
+def _choice(value, choices, column, default):
+    if not value:
+        return default
+    for key, label in choices:
+        if value.lower() in (key.lower(), label.lower()):
+            return key
+    raise RowError(f"unknown {column} '{value}'")
+
+
+def _parse_row(row, lookups):
+    if "__error__" in row:
+        raise RowError(row["__error__"])
+    missing = [column for column in REQUIRED_COLUMNS if not _text(row, column)]
+    if missing:
+        raise RowError(f"missing {', '.join(missing)}")
+
+    try:
+        base_price = Decimal(_text(row, "base_price"))
+        discount = int(_text(row, "discount_percent") or 0)
+        quantity = _text(row, "quantity")
+        quantity = int(quantity) if quantity else None
+    except (InvalidOperation, ValueError):
+        raise RowError("base_price, discount_percent and quantity must be numbers")
+    if base_price < 0 or not 0 <= discount <= 100 or (quantity is not None and quantity < 0):
+        raise RowError("base_price / quantity must be positive, discount_percent 0-100")
+
+    color_id = lookups["colors"].get(_text(row, "color").lower())
+    if color_id is None:
+        raise RowError(f"unknown color '{_text(row, 'color')}'")
+    age_group_id = lookups["ages"].get(_text(row, "age").lower())
+    if age_group_id is None:
+        raise RowError(f"unknown age '{_text(row, 'age')}'")
+
+    is_active = _text(row, "is_active").lower() not in ("0", "false", "no", "n")
+    return {
+        "product_code": _text(row, "product_code"),
+        "taxonomy": (_text(row, "category"), _text(row, "subcategory")),
+        "product": {
+            "product_name": _text(row, "product_name"),
+            "brand": _text(row, "brand"),
+            "gender": _choice(_text(row, "gender"), Product.GENDER_CHOICES, "gender", "unisex"),
+            "fabric": _choice(_text(row, "fabric"), Product.FABRIC_CHOICES, "fabric", "Other"),
+            "base_price": base_price,
+            "discount_percent": discount,
+            # bulk_create skips Product.save, same formula; offers are
+            # applied by the effective price refresh after the batch
+            "final_price": base_price - base_price * discount / Decimal("100"),
+            "effective_price": base_price - base_price * discount / Decimal("100"),
+            "about_product": _text(row, "about_product"),
+            "is_active": is_active,
+        },
+        "color_id": color_id,
+        "age_group_id": age_group_id,
+        "sku": _text(row, "sku"),
+        "barcode": _text(row, "barcode"),
+        "quantity": quantity,
+        "is_active": is_active,
+    }
+
+
+def _subcategory_ids(pairs, lookups):
+    """
+    (category name, subcategory name) -> SubCategory id, creating
+    whatever doesn't exist yet. Cached for the whole import.
+    """
+    cache = lookups["subcategories"]
+    missing = {pair for pair in pairs if pair not in cache}
+    if not missing:
+        return cache
+
+    names = {category for category, _ in missing}
+    Category.objects.bulk_create([Category(category_name=name) for name in names], ignore_conflicts=True)
+    categories = dict(Category.objects.filter(category_name__in=names).values_list("category_name", "id"))
+
+    SubCategory.objects.bulk_create(
+        [SubCategory(category_id=categories[category], subcategory_name=name) for category, name in missing],
+        ignore_conflicts=True,
+    )
+    rows = SubCategory.objects.filter(
+        category_id__in=categories.values(), subcategory_name__in={name for _, name in missing}
+    ).values_list("category__category_name", "subcategory_name", "id")
+    for category, name, subcategory_id in rows:
+        cache[(category, name)] = subcategory_id
+    # bulk_create sends no signals
+    transaction.on_commit(bump_reference_version)
+    return cache
+
+
+def _check_identifiers(rows, result):
+    """
+    Reject rows whose sku / barcode is already used by a different
+    variant (in the database or earlier in the batch), so a single bad
+    row doesn't fail the whole batch on the unique constraint.
+    """
+    for field in ("sku", "barcode"):
+        wanted = {row[field] for _, row in rows if row[field]}
+        owners = {
+            value: (product_code, color_id, age_group_id)
+            for value, product_code, color_id, age_group_id in ProductVariant.objects
+            .filter(**{f"{field}__in": wanted})
+            .values_list(field, "product__product_code", "color_id", "age_group_id")
+        }
+        kept = []
+        for line, row in rows:
+            key = (row["product_code"], row["color_id"], row["age_group_id"])
+            value = row[field]
+            if value and owners.setdefault(value, key) != key:
+                result["errors"].append((line, f"{field} '{value}' belongs to another variant"))
+                continue
+            kept.append((line, row))
+        rows = kept
+    return rows
+
+
+def _import_batch(batch, lookups, result):
+    rows = []
+    seen = {}
+    for line, raw in batch:
+        try:
+            row = _parse_row(raw, lookups)
+        except RowError as e:
+            result["errors"].append((line, str(e)))
+            continue
+        key = (row["product_code"], row["color_id"], row["age_group_id"])
+        if key in seen:
+            result["errors"].append((line, f"duplicate variant, already on line {seen[key]}"))
+            continue
+        seen[key] = line
+        rows.append((line, row))
+
+    rows = _check_identifiers(rows, result)
+    if not rows:
+        return
+
+    subcategories = _subcategory_ids({row["taxonomy"] for _, row in rows}, lookups)
+    products = {}
+    for _, row in rows:
+        products[row["product_code"]] = Product(
+            product_code=row["product_code"],
+            subcategory_id=subcategories[row["taxonomy"]],
+            **row["product"],
+        )
+    Product.objects.bulk_create(
+        products.values(),
+        update_conflicts=True,
+        unique_fields=["product_code"],
+        update_fields=PRODUCT_UPDATE_FIELDS,
+    )
+    product_ids = {code: product.pk for code, product in products.items()}
+
+    existing = {
+        (product_id, color_id, age_group_id): (sku, barcode)
+        for product_id, color_id, age_group_id, sku, barcode in ProductVariant.objects
+        .filter(product_id__in=product_ids.values())
+        .values_list("product_id", "color_id", "age_group_id", "sku", "barcode")
+    }
+    variants = []
+    for _, row in rows:
+        key = (product_ids[row["product_code"]], row["color_id"], row["age_group_id"])
+        sku, barcode = existing.get(key, ("", ""))
+        variants.append(ProductVariant(
+            product_id=key[0],
+            color_id=key[1],
+            age_group_id=key[2],
+            sku=row["sku"] or sku,
+            barcode=row["barcode"] or barcode,
+            is_active=row["is_active"],
+        ))
+    create_with_identifiers(lambda: ProductVariant.objects.bulk_create(
+        variants,
+        update_conflicts=True,
+        unique_fields=["product", "color", "age_group"],
+        update_fields=["sku", "barcode", "is_active"],
+    ), variants)
+
+    # the differences to the current stock go to the ledger
+    set_available_stock({
+        variant.pk: row["quantity"] for variant, (_, row) in zip(variants, rows) if row["quantity"] is not None
+    })
+    # new variants without a quantity still get an (empty) inventory row
+    Inventory.objects.bulk_create(
+        [Inventory(variant_id=variant.pk, quantity_available=0)
+         for variant, (_, row) in zip(variants, rows) if row["quantity"] is None],
+        ignore_conflicts=True,
+    )
+
+    # bulk_create sends no signals
+    refresh_effective_prices(product_ids=product_ids.values())
+    refresh_product_facets(product_ids.values())
+    refresh_search_vectors(product_ids=product_ids.values())
+
+    result["rows"] += len(rows)
+    result["products"] += len(products)
+    result["variants_created"] += sum(
+        1 for variant in variants if (variant.product_id, variant.color_id, variant.age_group_id) not in existing
+    )
+
+
+def import_catalog(rows, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Upsert categories, subcategories, products (by product_code),
+    variants (by product / color / age) and stock from feed rows, as
+    yielded by read_feed(). Rows are validated and written a batch at a
+    time, each batch in its own transaction; bad rows are skipped and
+    reported, they don't stop the import.
+
+    Returns {"rows", "products", "variants_created", "errors"}, where
+    errors is a list of (line_number, message).
+    """
+    lookups = {
+        "colors": {name.lower(): pk for pk, name in Color.objects.values_list("id", "color")},
+        "ages": {name.lower(): pk for pk, name in AgeGroup.objects.values_list("id", "age")},
+        "subcategories": {},
+    }
+    result = {"rows": 0, "products": 0, "variants_created": 0, "errors": []}
+
+    def flush(batch):
+        try:
+            with transaction.atomic():
+                _import_batch(batch, lookups, result)
+        except DatabaseError as e:
+            lookups["subcategories"].clear()
+            result["errors"].append((batch[0][0], f"lines {batch[0][0]}-{batch[-1][0]} not imported: {e}"))
+
+    batch = []
+    for line, row in rows:
+        batch.append((line, row))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    result["errors"].sort(key=lambda error: error[0])
+    if result["rows"]:
+        bump_catalog_version()
+    return result
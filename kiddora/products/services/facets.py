@@ -0,0 +1,101 @@
+from django.db import transaction
+from django.db.models import Count, Prefetch
+from products.models import Product, ProductVariant, ProductFacet
+from products.services.reference_data import get_labels
+
+
+def _facet_rows(product):
+    """
+    Build the facet rows for a single product.
+    Expects subcategory__category and active variants to be loaded.
+    """
+    subcategory = product.subcategory
+    gender_map = dict(Product.GENDER_CHOICES)
+    fabric_map = dict(Product.FABRIC_CHOICES)
+
+    values = {
+        ("category", str(subcategory.category_id)): (subcategory.category.category_name, ""),
+        ("subcategory", str(subcategory.id)): (subcategory.subcategory_name, str(subcategory.category_id)),
+    }
+    if product.gender:
+        values[("gender", product.gender)] = (gender_map.get(product.gender, product.gender), "")
+    if product.fabric:
+        values[("fabric", product.fabric)] = (fabric_map.get(product.fabric, product.fabric), "")
+
+    for variant in product.active_variants:
+        values[("color", str(variant.color_id))] = (variant.color.color, "")
+        values[("age_group", str(variant.age_group_id))] = (variant.age_group.age, "")
+
+    return [
+        ProductFacet(
+            product=product,
+            facet=facet,
+            value=value,
+            label=label,
+            parent_value=parent,
+        )
+        for (facet, value), (label, parent) in values.items()
+    ]
+
+
+def refresh_product_facets(product_ids):
+    """
+    Rebuild the facet index rows for the given products.
+    """
+    product_ids = list(product_ids)
+    if not product_ids:
+        return
+
+    products = (
+        Product.objects
+        .filter(id__in=product_ids)
+        .select_related("subcategory", "subcategory__category")
+        .prefetch_related(
+            Prefetch(
+                "variants",
+                queryset=ProductVariant.objects.filter(is_active=True).select_related("color", "age_group"),
+                to_attr="active_variants",
+            )
+        )
+    )
+
+    rows = []
+    for product in products:
+        rows.extend(_facet_rows(product))
+
+    with transaction.atomic():
+        ProductFacet.objects.filter(product_id__in=product_ids).delete()
+        ProductFacet.objects.bulk_create(rows, batch_size=1000)
+
+
+def get_facet_summary(products_qs):
+    """
+    Per-value product counts for every facet, restricted to the
+    products in the given queryset. Runs as a single grouped query.
+    Categories that are inactive (and their subcategories) are left out.
+    """
+    rows = (
+        ProductFacet.objects
+        .filter(product_id__in=products_qs.order_by().values("id"))
+        .values("facet", "value", "label", "parent_value")
+        .annotate(count=Count("product_id"))
+        .order_by()
+    )
+
+    summary = {facet: [] for facet, _ in ProductFacet.FACET_CHOICES}
+    # current names from the in-memory reference data; the stored label
+    # is only a fallback (e.g. gender / fabric)
+    labels = {facet: get_labels(facet) for facet in summary}
+    for row in rows:
+        if row["facet"] in ("category", "subcategory") and row["value"] not in labels[row["facet"]]:
+            # the reference data only holds active categories
+            continue
+        summary[row["facet"]].append({
+            "code": row["value"],
+            "label": labels[row["facet"]].get(row["value"], row["label"]),
+            "parent": row["parent_value"],
+            "count": row["count"],
+        })
+    for values in summary.values():
+        values.sort(key=lambda value: value["label"])
+    return summary
@@ -0,0 +1,109 @@
+import threading
+from django.db import IntegrityError, connection, transaction
+
+# hi/lo allocation: every nextval() on the sequence (created with
+# INCREMENT BY BLOCK_SIZE, see migration 0010) hands this process a
+# block of BLOCK_SIZE numbers, used up without touching the database.
+SEQUENCE = "products_variant_identifier_seq"
+BLOCK_SIZE = 100
+SKU_PREFIX = "KIDDORA-S"
+# EAN-13 prefix 2 is reserved for in-store numbering, so generated
+# barcodes can't clash with real GS1 codes
+BARCODE_PREFIX = "2"
+IDENTIFIER_ATTEMPTS = 3
+# the unique columns filled in here; a violation of any other constraint
+# is not a collision and is raised straight away
+IDENTIFIER_COLUMNS = ("sku", "barcode")
+VARIANT_TABLE = "products_productvariant"
+
+_lock = threading.Lock()
+_pool = []
+
+
+def _reserve_blocks(count):
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT nextval('{SEQUENCE}') FROM generate_series(1, %s)", [count])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def allocate_numbers(count):
+    """
+    `count` unique numbers, at most one query however many are asked for.
+    Numbers left over in a block are used by the next call; a restart
+    leaves gaps, never duplicates.
+    """
+    with _lock:
+        if len(_pool) < count:
+            blocks = -(-(count - len(_pool)) // BLOCK_SIZE)
+            for start in _reserve_blocks(blocks):
+                _pool.extend(range(start, start + BLOCK_SIZE))
+        numbers = _pool[:count]
+        del _pool[:count]
+    return numbers
+
+
+def ean13_check_digit(digits):
+    """
+    Check digit for the first 12 digits of an EAN-13
+    (weights 1 and 3 alternating from the left).
+    """
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits))
+    return str((10 - total % 10) % 10)
+
+
+def sku_for(number):
+    return f"{SKU_PREFIX}{number:08d}"
+
+
+def barcode_for(number):
+    digits = f"{BARCODE_PREFIX}{number:011d}"
+    return digits + ean13_check_digit(digits)
+
+
+def assign_identifiers(variants):
+    """
+    Fill in a missing sku / barcode on each variant from one allocation.
+    """
+    missing = [variant for variant in variants if not variant.sku or not variant.barcode]
+    for variant, number in zip(missing, allocate_numbers(len(missing))):
+        if not variant.sku:
+            variant.sku = sku_for(number)
+        if not variant.barcode:
+            variant.barcode = barcode_for(number)
+
+
+def is_identifier_collision(error):
+    """
+    Whether an IntegrityError is a duplicate sku or barcode: by the
+    constraint name on Postgres (products_productvariant_sku_key...),
+    by the message on backends that don't report one.
+    """
+    constraint = getattr(getattr(error.__cause__, "diag", None), "constraint_name", None)
+    if constraint:
+        return any(constraint.startswith(f"{VARIANT_TABLE}_{column}_") for column in IDENTIFIER_COLUMNS)
+    message = str(error)
+    return any(f"{VARIANT_TABLE}.{column}" in message for column in IDENTIFIER_COLUMNS)
+
+
+def create_with_identifiers(create, variants):
+    """
+    Assign identifiers to `variants` and run `create` (a save() or
+    bulk_create of them). Uniqueness is left to the database: if a
+    generated value collides (e.g. the sequence was reset by a restore)
+    the generated ones are redrawn and create retried. Any other
+    IntegrityError (a duplicate variant, a missing FK) is raised as is.
+    """
+    generated = [(variant, not variant.sku, not variant.barcode) for variant in variants]
+    for attempt in range(IDENTIFIER_ATTEMPTS):
+        assign_identifiers(variants)
+        try:
+            with transaction.atomic():
+                return create()
+        except IntegrityError as error:
+            if attempt == IDENTIFIER_ATTEMPTS - 1 or not is_identifier_collision(error):
+                raise
+            for variant, sku, barcode in generated:
+                if sku:
+                    variant.sku = ""
+                if barcode:
+                    variant.barcode = ""
@@ -0,0 +1,26 @@
+from products.models import ProductImage
+from jobs.services.queue import enqueue, register
+from utils.cache import bump_catalog_version
+from utils.image_utils import generate_renditions
+
+
+@register("product_image_renditions")
+def build_product_image_renditions(product_image_id):
+    """
+    Generate thumb / card / detail renditions (JPEG + WebP) for one
+    product image.
+    """
+    product_image = ProductImage.objects.filter(id=product_image_id).first()
+    if product_image is None or not product_image.image:
+        return
+
+    with product_image.image.open("rb") as file:
+        renditions = generate_renditions(file)
+
+    # update() rather than save(): no post_save, so this doesn't re-queue itself
+    ProductImage.objects.filter(id=product_image_id).update(renditions=renditions)
+    bump_catalog_version()
+
+
+def queue_renditions(product_image):
+    return enqueue("product_image_renditions", product_image_id=product_image.id)
@@ -1,24 +1,495 @@
-from django.db import transaction
-from products.models import Inventory
+import logging
+from collections import defaultdict
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Q, Sum, Value, When
+from django.utils import timezone
+from products.models import Inventory, Product, ProductVariant, StockMovement
 
-def reserve_stock(variant, quantity):
+# Stock changes are single conditional UPDATEs with F() expressions, so
+# no row is read into Python and no SELECT ... FOR UPDATE lock is taken.
+# Each change is also appended to the StockMovement ledger in the same
+# transaction; the counters are the sum of the ledger.
+
+BUCKETS = (
+    ("quantity_available", "delta_available"),
+    ("quantity_reserved", "delta_reserved"),
+    ("quantity_sold", "delta_sold"),
+)
+
+RESERVE_ATTEMPTS = 3
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientStock(ValueError):
+    """
+    A reservation could not be met.
+    `failures` maps variant_id -> quantity currently available.
+    """
+
+    def __init__(self, failures):
+        self.failures = failures
+        super().__init__("Insufficient stock")
+
+
+def _variant_id(variant):
+    return getattr(variant, "pk", variant)
+
+
+def _group_lines(lines):
+    """
+    (variant, quantity) pairs -> {variant_id: total quantity}, sorted by id
+    so concurrent batches touch rows in the same order.
+    """
+    wanted = defaultdict(int)
+    for variant, quantity in lines:
+        wanted[_variant_id(variant)] += quantity
+    return dict(sorted(wanted.items()))
+
+
+def _per_variant(wanted):
+    return Case(
+        *[When(variant_id=variant_id, then=Value(quantity)) for variant_id, quantity in wanted.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def _shortfalls(wanted):
+    available = dict(
+        Inventory.objects
+        .filter(variant_id__in=wanted)
+        .values_list("variant_id", "quantity_available")
+    )
+    return {
+        variant_id: available.get(variant_id, 0)
+        for variant_id, quantity in wanted.items()
+        if available.get(variant_id, 0) < quantity
+    }
+
+
+def _bump_sold_count(wanted):
+    if len(wanted) == 1:
+        [(variant_id, quantity)] = wanted.items()
+        Product.objects.filter(variants__id=variant_id).update(sold_count=F("sold_count") + quantity)
+        return
+    per_product = defaultdict(int)
+    for variant_id, product_id in ProductVariant.objects.filter(id__in=wanted).values_list("id", "product_id"):
+        per_product[product_id] += wanted[variant_id]
+    if per_product:
+        Product.objects.filter(id__in=per_product).update(sold_count=F("sold_count") + Case(
+            *[When(id=product_id, then=Value(quantity)) for product_id, quantity in sorted(per_product.items())],
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+
+
+def _movements(reason, wanted, reference_type=None, reference_id=None, available=0, reserved=0, sold=0):
+    """
+    One StockMovement per variant of `wanted`, each bucket's delta being
+    the quantity times its sign (1, -1 or 0).
+    """
+    reference_id = str(reference_id) if reference_id is not None else None
+    return [
+        StockMovement(
+            variant_id=variant_id,
+            reason=reason,
+            delta_available=quantity * available,
+            delta_reserved=quantity * reserved,
+            delta_sold=quantity * sold,
+            reference_type=reference_type,
+            reference_id=reference_id,
+        )
+        for variant_id, quantity in wanted.items()
+    ]
+
+
+def _apply_deltas(movements):
+    """
+    Add the movements' deltas to Inventory: one UPDATE with a CASE per
+    bucket, whatever the number of variants. Conditional like
+    reserve_stock_bulk: if any counter would go below zero nothing is
+    changed and InsufficientStock is raised, so the ledger never holds
+    a delta the counters didn't take.
+    """
+    totals = defaultdict(lambda: [0, 0, 0])
+    for movement in movements:
+        for i, (_, delta) in enumerate(BUCKETS):
+            totals[movement.variant_id][i] += getattr(movement, delta)
+    totals = dict(sorted(totals.items()))
+    changes = {}
+    for i, (field, _) in enumerate(BUCKETS):
+        per_variant = {variant_id: deltas[i] for variant_id, deltas in totals.items() if deltas[i]}
+        if per_variant:
+            changes[field] = F(field) + _per_variant(per_variant)
+    if not changes:
+        return
+    enough = Q()
+    for variant_id, deltas in totals.items():
+        enough |= Q(variant_id=variant_id, **{
+            f"{field}__gte": -deltas[i] for i, (field, _) in enumerate(BUCKETS) if deltas[i] < 0
+        })
+    updated = Inventory.objects.filter(enough).update(**changes, updated_at=timezone.now())
+    if updated != len(totals):
+        raise InsufficientStock(dict(
+            Inventory.objects.filter(variant_id__in=totals).exclude(enough)
+            .values_list("variant_id", "quantity_available")
+        ))
+    # queryset updates bypass Inventory.save, keep the counter in step here
+    _bump_sold_count({variant_id: deltas[2] for variant_id, deltas in totals.items() if deltas[2]})
+
+
+def apply_movements(movements):
+    """
+    Append unsaved StockMovements to the ledger and apply them to
+    Inventory: one INSERT and one UPDATE for the whole batch, all or
+    nothing (InsufficientStock if a counter would go negative).
+    """
+    movements = [movement for movement in movements if movement.delta_available or movement.delta_reserved
+                 or movement.delta_sold]
+    if not movements:
+        return
+    with transaction.atomic():
+        StockMovement.objects.bulk_create(movements)
+        _apply_deltas(movements)
+
+
+def reserve_stock(variant, quantity, reference_type=None, reference_id=None):
+    reserve_stock_bulk([(variant, quantity)], reference_type, reference_id)
+
+
+def reserve_stock_bulk(lines, reference_type=None, reference_id=None):
+    """
+    Reserve stock for several variants in one UPDATE.
+    All or nothing: if any variant is short, nothing is reserved and
+    InsufficientStock lists every variant that couldn't be met.
+    """
+    wanted = _group_lines(lines)
+    if not wanted:
+        return
+
+    enough = Q()
+    for variant_id, quantity in wanted.items():
+        enough |= Q(variant_id=variant_id, quantity_available__gte=quantity)
+
+    for _ in range(RESERVE_ATTEMPTS):
+        with transaction.atomic():
+            updated = Inventory.objects.filter(enough).update(
+                quantity_available=F("quantity_available") - _per_variant(wanted),
+                quantity_reserved=F("quantity_reserved") + _per_variant(wanted),
+                updated_at=timezone.now(),
+            )
+            if updated == len(wanted):
+                StockMovement.objects.bulk_create(
+                    _movements("RESERVE", wanted, reference_type, reference_id, available=-1, reserved=1)
+                )
+                return
+            transaction.set_rollback(True)
+
+        failures = _shortfalls(wanted)
+        if failures:
+            raise InsufficientStock(failures)
+        # stock came back between the UPDATE and the check, try again
+
+    raise InsufficientStock(_shortfalls(wanted))
+
+
+def move_reserved(reason, lines):
+    """
+    Take reserved units out of reservation: back to available (RELEASE)
+    or to sold (SALE). `lines` are (variant, quantity, reference_type,
+    reference_id), e.g. one per order line.
+
+    Conditional like reserve_stock_bulk: one UPDATE with
+    quantity_reserved >= n per variant, redone row by row if a variant
+    is short. Short variants are skipped and logged, never clamped, and
+    only the lines that were applied get a ledger row. A referenced
+    line is applied once: (variant, reference, reason) is unique in the
+    ledger, so a repeated release or sale is a no-op.
+    Returns the applied lines as {(variant_id, reference_type,
+    reference_id): quantity}.
+    """
+    signs = {"RELEASE": (1, -1, 0), "SALE": (0, -1, 1)}[reason]
+    pending = defaultdict(int)
+    for variant, quantity, reference_type, reference_id in lines:
+        reference_id = str(reference_id) if reference_id is not None else None
+        pending[(_variant_id(variant), reference_type, reference_id)] += quantity
+
+    for attempt in range(RESERVE_ATTEMPTS):
+        try:
+            return _move_reserved(reason, signs, dict(pending))
+        except IntegrityError:
+            # the same line was applied concurrently; the retry skips it
+            if attempt == RESERVE_ATTEMPTS - 1:
+                raise
+
+
+def _move_reserved(reason, signs, pending):
     with transaction.atomic():
-        inventory = Inventory.objects.select_for_update().get(variant=variant)
-        if inventory.quantity_available < quantity:
-            raise ValueError("Insufficient stock")
-        inventory.quantity_available -= quantity
-        inventory.quantity_reserved += quantity
-        inventory.save()
-
-def release_stock(variant, quantity):
+        references = {reference_id for _, _, reference_id in pending if reference_id is not None}
+        if references:
+            done = set(
+                StockMovement.objects
+                .filter(reason=reason, reference_id__in=references, variant_id__in={key[0] for key in pending})
+                .values_list("variant_id", "reference_type", "reference_id")
+            )
+            pending = {key: quantity for key, quantity in pending.items() if key not in done}
+        wanted = defaultdict(int)
+        for (variant_id, _, _), quantity in pending.items():
+            wanted[variant_id] += quantity
+        wanted = dict(sorted(wanted.items()))
+        if not wanted:
+            return {}
+
+        def move(wanted):
+            enough = Q()
+            for variant_id, quantity in wanted.items():
+                enough |= Q(variant_id=variant_id, quantity_reserved__gte=quantity)
+            changes = {
+                field: F(field) + _per_variant(wanted) * sign
+                for (field, _), sign in zip(BUCKETS, signs) if sign
+            }
+            return Inventory.objects.filter(enough).update(**changes, updated_at=timezone.now())
+
+        with transaction.atomic():
+            moved = set(wanted) if move(wanted) == len(wanted) else None
+            if moved is None:
+                transaction.set_rollback(True)
+        if moved is None:
+            # some variant is short, find out which one row at a time
+            moved = {variant_id for variant_id, quantity in wanted.items() if move({variant_id: quantity})}
+            logger.warning(
+                "%s skipped variants without enough reserved: %s", reason, sorted(set(wanted) - moved),
+            )
+
+        applied = {key: quantity for key, quantity in pending.items() if key[0] in moved}
+        StockMovement.objects.bulk_create([
+            StockMovement(
+                variant_id=variant_id, reason=reason,
+                delta_available=quantity * signs[0],
+                delta_reserved=quantity * signs[1],
+                delta_sold=quantity * signs[2],
+                reference_type=reference_type, reference_id=reference_id,
+            )
+            for (variant_id, reference_type, reference_id), quantity in applied.items()
+        ])
+        if signs[2]:
+            _bump_sold_count({variant_id: wanted[variant_id] for variant_id in moved})
+    return applied
+
+
+def release_stock(variant, quantity, reference_type=None, reference_id=None):
+    release_stock_bulk([(variant, quantity)], reference_type, reference_id)
+
+
+def release_stock_bulk(lines, reference_type=None, reference_id=None):
+    """
+    Return reserved stock to available for several variants in one
+    UPDATE (see move_reserved). Returns {variant_id: quantity} actually
+    released.
+    """
+    applied = move_reserved("RELEASE", [
+        (variant, quantity, reference_type, reference_id) for variant, quantity in lines
+    ])
+    return {variant_id: quantity for (variant_id, _, _), quantity in applied.items()}
+
+
+def deduct_stock_on_delivery(variant, quantity, reference_type=None, reference_id=None):
+    """
+    Move delivered units from reserved to sold (see move_reserved).
+    """
+    move_reserved("SALE", [(variant, quantity, reference_type, reference_id)])
+
+
+def adjust_stock(variant, quantity, reason="ADJUSTMENT"):
+    """
+    Add `quantity` (negative to remove) to a variant's available stock.
+    A removal is a conditional UPDATE, InsufficientStock if there isn't
+    that much available.
+    """
+    if not quantity:
+        return
+    variant_id = _variant_id(variant)
     with transaction.atomic():
-        inventory = Inventory.objects.select_for_update().get(variant=variant)
-        inventory.quantity_available += quantity
-        inventory.quantity_reserved -= quantity
-        inventory.save()
+        updated = Inventory.objects.filter(
+            variant_id=variant_id, quantity_available__gte=max(-quantity, 0)
+        ).update(
+            quantity_available=F("quantity_available") + quantity,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            raise InsufficientStock(_shortfalls({variant_id: -quantity}))
+        StockMovement.objects.bulk_create(_movements(reason, {variant_id: quantity}, available=1))
+
+
+def restock_return(variant, quantity, return_id):
+    """
+    Put a return's units back on sale, once per return. Returns False if
+    the return was already restocked.
+    """
+    variant_id = _variant_id(variant)
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                StockMovement.objects.create(
+                    variant_id=variant_id, reason="RETURN", delta_available=quantity,
+                    reference_type="RETURN", reference_id=str(return_id),
+                )
+        except IntegrityError:
+            return False
+        Inventory.objects.filter(variant_id=variant_id).update(
+            quantity_available=F("quantity_available") + quantity,
+            updated_at=timezone.now(),
+        )
+    return True
+
+
+def create_inventory(stock, reason="OPENING", batch_size=None):
+    """
+    Create inventory rows for new variants ({variant_id: quantity}) with
+    their opening movements, in one INSERT each.
+    """
+    with transaction.atomic():
+        Inventory.objects.bulk_create(
+            [Inventory(variant_id=variant_id, quantity_available=quantity) for variant_id, quantity in stock.items()],
+            batch_size=batch_size,
+        )
+        StockMovement.objects.bulk_create(
+            _movements(reason, {variant_id: quantity for variant_id, quantity in stock.items() if quantity}, available=1),
+            batch_size=batch_size,
+        )
+
+
+def set_available_stock(stock, reason="IMPORT"):
+    """
+    Set quantity_available to absolute levels ({variant_id: quantity}),
+    creating missing rows, and record the differences in the ledger:
+    one read, one upsert and one ledger INSERT.
+    """
+    if not stock:
+        return
+    with transaction.atomic():
+        current = dict(
+            Inventory.objects
+            .select_for_update()
+            .filter(variant_id__in=stock)
+            .values_list("variant_id", "quantity_available")
+        )
+        Inventory.objects.bulk_create(
+            [Inventory(variant_id=variant_id, quantity_available=quantity) for variant_id, quantity in stock.items()],
+            update_conflicts=True,
+            unique_fields=["variant"],
+            update_fields=["quantity_available", "updated_at"],
+        )
+        StockMovement.objects.bulk_create(_movements(
+            reason,
+            {variant_id: quantity - current.get(variant_id, 0) for variant_id, quantity in stock.items()
+             if quantity != current.get(variant_id, 0)},
+            available=1,
+        ))
+
+
+def record_opening_balances(inventories=None, batch_size=5000):
+    """
+    OPENING movements equal to the current counters, for inventory rows
+    that have no movements yet (rows written outside the ledger, such
+    as generated benchmark data). Returns the number written.
+    """
+    if inventories is None:
+        inventories = Inventory.objects.all()
+    rows = (
+        inventories
+        .filter(~Exists(StockMovement.objects.filter(variant=OuterRef("variant"))))
+        .values_list("variant_id", "quantity_available", "quantity_reserved", "quantity_sold")
+    )
+    movements = [
+        StockMovement(
+            variant_id=variant_id, reason="OPENING",
+            delta_available=available, delta_reserved=reserved, delta_sold=sold,
+        )
+        for variant_id, available, reserved, sold in rows.iterator()
+    ]
+    StockMovement.objects.bulk_create(movements, batch_size=batch_size)
+    return len(movements)
+
+
+def _ledger_totals(movements):
+    return (
+        movements
+        .values("variant_id")
+        .annotate(
+            available=Sum("delta_available"),
+            reserved=Sum("delta_reserved"),
+            sold=Sum("delta_sold"),
+        )
+        .values_list("variant_id", "available", "reserved", "sold")
+    )
+
+
+def stock_at(when, variant_ids=None):
+    """
+    {variant_id: (available, reserved, sold)} as of `when`, rebuilt from
+    the ledger in one GROUP BY. Variants without movements by then are
+    left out.
+    """
+    movements = StockMovement.objects.filter(created_at__lte=when)
+    if variant_ids is not None:
+        movements = movements.filter(variant_id__in=variant_ids)
+    return {variant_id: (available, reserved, sold) for variant_id, available, reserved, sold
+            in _ledger_totals(movements).iterator()}
+
+
+def find_stock_drift(variant_ids=None):
+    """
+    [(variant_id, counters, ledger)] for inventory rows whose counters
+    (available, reserved, sold) don't match the sum of their movements.
+    One GROUP BY over the ledger, one scan of Inventory.
+    """
+    movements = StockMovement.objects.all()
+    inventories = Inventory.objects.all()
+    if variant_ids is not None:
+        movements = movements.filter(variant_id__in=variant_ids)
+        inventories = inventories.filter(variant_id__in=variant_ids)
+    ledger = {variant_id: totals for variant_id, *totals in _ledger_totals(movements).iterator()}
+    drift = []
+    for variant_id, *counters in inventories.values_list(
+        "variant_id", "quantity_available", "quantity_reserved", "quantity_sold"
+    ).iterator():
+        expected = tuple(ledger.get(variant_id, (0, 0, 0)))
+        if tuple(counters) != expected:
+            drift.append((variant_id, tuple(counters), expected))
+    return drift
+
 
-def deduct_stock_on_delivery(variant, quantity):
+def reconcile_stock(drift, batch_size=1000):
+    """
+    Overwrite drifted counters (find_stock_drift) with the ledger's
+    values, one UPDATE per batch. A bucket whose ledger sum is negative
+    can't be stored: the counter goes to zero and a RECONCILE movement
+    brings the ledger up to it, so the row doesn't drift again.
+    Returns the number of rows fixed.
+    """
     with transaction.atomic():
-        inventory = Inventory.objects.select_for_update().get(variant=variant)
-        inventory.quantity_reserved -= quantity
-        inventory.save()
+        corrections = [
+            StockMovement(
+                variant_id=variant_id, reason="RECONCILE",
+                **{delta: max(-ledger[i], 0) for i, (_, delta) in enumerate(BUCKETS)},
+            )
+            for variant_id, _, ledger in drift
+            if min(ledger) < 0
+        ]
+        StockMovement.objects.bulk_create(corrections, batch_size=batch_size)
+        for start in range(0, len(drift), batch_size):
+            batch = {variant_id: ledger for variant_id, _, ledger in drift[start:start + batch_size]}
+            Inventory.objects.filter(variant_id__in=batch).update(
+                updated_at=timezone.now(),
+                **{
+                    field: Case(
+                        *[When(variant_id=variant_id, then=Value(max(ledger[i], 0)))
+                          for variant_id, ledger in batch.items()],
+                        output_field=IntegerField(),
+                    )
+                    for i, (field, _) in enumerate(BUCKETS)
+                },
+            )
+    return len(drift)
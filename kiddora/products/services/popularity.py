@@ -0,0 +1,57 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+from products.models import Product, Inventory
+
+
+def reconcile_sold_counts():
+    """
+    Recompute Product.sold_count from Inventory.quantity_sold
+    in a single UPDATE. Returns the number of products touched.
+    """
+    sold = (
+        Inventory.objects
+        .filter(variant__product=OuterRef("pk"))
+        .values("variant__product")
+        .annotate(total=Sum("quantity_sold"))
+        .values("total")
+    )
+    return Product.objects.update(sold_count=Coalesce(Subquery(sold), Value(0)))
+
+
+def refresh_trending_scores(window_days=30, half_life_days=7):
+    """
+    Time-decayed sales score: every unit sold `age` days ago
+    counts 0.5 ** (age / half_life_days). Orders older than
+    window_days are ignored.
+    """
+    from shopcore.models import OrderItem
+
+    today = timezone.localdate()
+    since = timezone.now() - timedelta(days=window_days)
+
+    daily_sales = (
+        OrderItem.objects
+        .filter(order__created_at__gte=since)
+        .exclude(order__order_status="CANCELLED")
+        .annotate(day=TruncDate("order__created_at"))
+        .values("variant__product_id", "day")
+        .annotate(quantity=Sum("quantity"))
+    )
+
+    scores = defaultdict(float)
+    for row in daily_sales:
+        age = (today - row["day"]).days
+        scores[row["variant__product_id"]] += row["quantity"] * 0.5 ** (age / half_life_days)
+
+    products = [
+        Product(id=product_id, trending_score=round(score, 4))
+        for product_id, score in scores.items()
+    ]
+    with transaction.atomic():
+        Product.objects.exclude(id__in=list(scores)).exclude(trending_score=0).update(trending_score=0)
+        Product.objects.bulk_update(products, ["trending_score"], batch_size=1000)
+    return len(products)
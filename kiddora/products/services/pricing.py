@@ -0,0 +1,54 @@
+from decimal import Decimal
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest, Round
+from products.models import Product
+
+
+def _best_offer_percent():
+    """
+    Discount of the best active offer for the outer product, product
+    and category offers together: highest priority, then the biggest
+    discount.
+    """
+    from shopcore.models import Offer
+
+    offers = (
+        Offer.objects
+        .filter(is_active=True, is_deleted=False)
+        .filter(
+            Q(offer_type="PRODUCT", product=OuterRef("pk"))
+            # category via the subcategory: UPDATE can't join to it
+            | Q(offer_type="CATEGORY", category__subcategories=OuterRef("subcategory_id"))
+        )
+        .order_by("-priority", "-discount_percent")
+        .values("discount_percent")[:1]
+    )
+    return Coalesce(Subquery(offers), Value(0))
+
+
+def refresh_effective_prices(product_ids=None, category_ids=None):
+    """
+    Recompute Product.effective_price / effective_discount in one UPDATE:
+    the better of the product's own discount_percent and its best
+    offer, applied to base_price. Limited to the given products and / or
+    categories, all products when neither is given.
+    Returns the number of products updated.
+    """
+    products = Product.objects.all()
+    if product_ids is not None or category_ids is not None:
+        condition = Q()
+        if product_ids is not None:
+            condition |= Q(id__in=product_ids)
+        if category_ids is not None:
+            condition |= Q(subcategory__category_id__in=category_ids)
+        products = products.filter(condition)
+
+    percent = Greatest(F("discount_percent"), _best_offer_percent())
+    return products.update(
+        effective_discount=percent,
+        effective_price=Round(
+            F("base_price") - F("base_price") * percent * Value(Decimal("0.01")),
+            2,
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        ),
+    )
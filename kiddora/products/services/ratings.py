@@ -0,0 +1,70 @@
+from collections import defaultdict
+from django.db.models import Avg, Count, F, FloatField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+from products.models import Product
+
+RATING_VALUES = range(1, 6)
+
+
+def _average(rating_sum, rating_count):
+    return Coalesce(
+        Cast(rating_sum, FloatField()) / NullIf(rating_count, Value(0)),
+        Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def record_rating(product_id, added=None, removed=None):
+    """
+    Apply one review change to the product's rating columns in a single
+    UPDATE. `added` is the new rating (None on delete), `removed` the
+    old one (None on create); pass both when a rating is edited.
+    """
+    buckets = defaultdict(int)
+    if added is not None:
+        buckets[added] += 1
+    if removed is not None:
+        buckets[removed] -= 1
+    updates = {
+        f"rating_{stars}": F(f"rating_{stars}") + delta
+        for stars, delta in buckets.items() if delta
+    }
+    if not updates:
+        return
+
+    # every SET expression sees the row as it was before the UPDATE,
+    # so the average is computed from the new sum / count explicitly
+    rating_count = F("rating_count") + (added is not None) - (removed is not None)
+    rating_sum = F("rating_sum") + (added or 0) - (removed or 0)
+    Product.objects.filter(pk=product_id).update(
+        rating_count=rating_count,
+        rating_sum=rating_sum,
+        rating_avg=_average(rating_sum, rating_count),
+        **updates,
+    )
+
+
+def reconcile_ratings():
+    """
+    Recompute every product's rating columns from Review in a single
+    UPDATE. Returns the number of products touched.
+    """
+    from shopcore.models import Review
+
+    def per_product(aggregate, output_field=None):
+        stats = (
+            Review.objects
+            .filter(product=OuterRef("pk"))
+            .values("product")
+            .annotate(value=aggregate)
+            .values("value")
+        )
+        return Coalesce(Subquery(stats, output_field=output_field), Value(0), output_field=output_field)
+
+    updates = {f"rating_{stars}": per_product(Count("id", filter=Q(rating=stars))) for stars in RATING_VALUES}
+    return Product.objects.update(
+        rating_count=per_product(Count("id")),
+        rating_sum=per_product(Sum("rating")),
+        rating_avg=per_product(Avg("rating"), FloatField()),
+        **updates,
+    )
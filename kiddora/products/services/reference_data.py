@@ -0,0 +1,97 @@
+import threading
+import time
+from products.models import AgeGroup, Category, Color, SubCategory
+from utils.cache import bump_version, get_version
+
+# Colors, age groups and the active category tree are tiny and change
+# rarely, but are needed on almost every catalog / admin form request.
+# Each process keeps them in memory and reloads when the shared version
+# (a CacheVersion row, bumped from products.signals on any change)
+# moves, or at the latest after REFERENCE_MAX_AGE seconds, in case a
+# change slipped past the signals.
+REFERENCE_VERSION = "reference"
+REFERENCE_MAX_AGE = 600
+
+_lock = threading.Lock()
+_loaded = {"version": None, "data": None, "loaded_at": 0.0}
+
+
+def get_reference_version():
+    return get_version(REFERENCE_VERSION)
+
+
+def bump_reference_version():
+    """
+    Make every process reload its reference data on next use.
+    Call after changes that bypass model signals (bulk_create, update).
+    """
+    bump_version(REFERENCE_VERSION)
+
+
+def _load():
+    colors = list(Color.objects.order_by("id"))
+    age_groups = list(AgeGroup.objects.order_by("id"))
+    categories = list(Category.objects.filter(is_active=True).order_by("id"))
+    subcategories = list(
+        SubCategory.objects.filter(category__is_active=True).select_related("category").order_by("id")
+    )
+    return {
+        "colors": colors,
+        "age_groups": age_groups,
+        "categories": categories,
+        "subcategories": subcategories,
+        # facet name -> {str(id): label}, same keys as ProductFacet
+        "labels": {
+            "color": {str(color.id): color.color for color in colors},
+            "age_group": {str(age.id): age.age for age in age_groups},
+            "category": {str(category.id): category.category_name for category in categories},
+            "subcategory": {str(sub.id): sub.subcategory_name for sub in subcategories},
+        },
+    }
+
+
+def get_reference_data():
+    """
+    In-memory reference data, reloaded from the database when the
+    shared version has changed or REFERENCE_MAX_AGE has passed. The
+    lists hold model instances and are shared between requests: read
+    them, don't modify them.
+    """
+    version = get_reference_version()
+
+    def stale():
+        return _loaded["version"] != version or time.monotonic() - _loaded["loaded_at"] >= REFERENCE_MAX_AGE
+
+    if stale():
+        with _lock:
+            if stale():
+                _loaded["data"] = _load()
+                _loaded["version"] = version
+                _loaded["loaded_at"] = time.monotonic()
+    return _loaded["data"]
+
+
+def get_colors():
+    return get_reference_data()["colors"]
+
+
+def get_age_groups():
+    return get_reference_data()["age_groups"]
+
+
+def get_categories():
+    """
+    Active categories.
+    """
+    return get_reference_data()["categories"]
+
+
+def get_subcategories():
+    """
+    Subcategories of active categories, with .category loaded.
+    """
+    return get_reference_data()["subcategories"]
+
+
+def get_labels(facet):
+    return get_reference_data()["labels"].get(facet, {})
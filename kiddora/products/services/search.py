@@ -0,0 +1,77 @@
+import re
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+)
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Greatest
+from products.models import Product, SubCategory
+
+SEARCH_CONFIG = "english"
+
+
+def product_search_vector(taxonomy):
+    """
+    Weighted document for a product:
+    name (A) > brand (B) > subcategory/category (C) > description (D).
+    """
+    return (
+        SearchVector("product_name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("brand", weight="B", config=SEARCH_CONFIG)
+        + SearchVector(Value(taxonomy), weight="C", config=SEARCH_CONFIG)
+        + SearchVector("about_product", weight="D", config=SEARCH_CONFIG)
+    )
+
+
+def refresh_search_vectors(product_ids=None, subcategory_ids=None):
+    """
+    Recompute search_vector for the given products / subcategories.
+    One UPDATE per subcategory, since the taxonomy text is shared.
+    """
+    subcategories = SubCategory.objects.select_related("category")
+    if subcategory_ids is not None:
+        subcategories = subcategories.filter(id__in=subcategory_ids)
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        subcategories = subcategories.filter(products__id__in=product_ids).distinct()
+
+    for subcategory in subcategories:
+        taxonomy = f"{subcategory.subcategory_name} {subcategory.category.category_name}"
+        products = Product.objects.filter(subcategory=subcategory)
+        if product_ids is not None:
+            products = products.filter(id__in=product_ids)
+        products.update(search_vector=product_search_vector(taxonomy))
+
+
+def apply_product_search(queryset, query):
+    """
+    Full-text search with ranking and prefix matching, plus trigram
+    similarity on name / brand so small typos still return results.
+    Both conditions use their GIN index (@@ and the % operator, whose
+    cut-off is pg_trgm.similarity_threshold, 0.3 by default) and run as
+    one query. Full-text matches rank above every fuzzy-only match.
+    Annotates `search_rank` on the returned queryset.
+    """
+    terms = re.findall(r"\w+", query.lower())
+    if not terms:
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    ts_query = SearchQuery(
+        " & ".join(f"{term}:*" for term in terms),
+        search_type="raw",
+        config=SEARCH_CONFIG,
+    )
+    return queryset.filter(
+        Q(search_vector=ts_query)
+        | Q(product_name__trigram_similar=query)
+        | Q(brand__trigram_similar=query)
+    ).annotate(
+        search_rank=Case(
+            # similarity is at most 1, so 1 + rank keeps text matches first
+            When(search_vector=ts_query, then=Value(1.0) + SearchRank(F("search_vector"), ts_query)),
+            default=Greatest(
+                TrigramSimilarity("product_name", query),
+                TrigramSimilarity("brand", query),
+            ),
+            output_field=FloatField(),
+        )
+    )
@@ -0,0 +1,45 @@
+from django.db import transaction
+from products.models import ProductVariant
+from products.services.facets import refresh_product_facets
+from products.services.identifiers import create_with_identifiers
+from products.services.inventory import create_inventory
+from products.services.reference_data import get_age_groups, get_colors
+from utils.cache import bump_catalog_version
+
+
+def _ids(objects):
+    return [getattr(obj, "pk", obj) for obj in objects]
+
+
+def generate_variant_matrix(product, colors=None, age_groups=None, quantity=0):
+    """
+    Create a variant, with an inventory row of `quantity`, for every
+    color x age group combination the product doesn't have yet.
+    colors / age_groups default to all of them.
+
+    A fixed handful of statements whatever the matrix size: one
+    identifier allocation, one bulk insert each for variants,
+    inventories and their opening stock movements, then one facet refresh (bulk_create sends no signals).
+    Returns the created variants.
+    """
+    color_ids = _ids(colors if colors is not None else get_colors())
+    age_group_ids = _ids(age_groups if age_groups is not None else get_age_groups())
+
+    existing = set(
+        ProductVariant.objects.filter(product=product).values_list("color_id", "age_group_id")
+    )
+    variants = [
+        ProductVariant(product=product, color_id=color_id, age_group_id=age_group_id)
+        for color_id in color_ids
+        for age_group_id in age_group_ids
+        if (color_id, age_group_id) not in existing
+    ]
+    if not variants:
+        return []
+
+    with transaction.atomic():
+        create_with_identifiers(lambda: ProductVariant.objects.bulk_create(variants), variants)
+        create_inventory({variant.pk: quantity for variant in variants})
+        refresh_product_facets([product.pk])
+        transaction.on_commit(bump_catalog_version)
+    return variants
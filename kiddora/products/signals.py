@@ -0,0 +1,120 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from products.models import (
+    Category, SubCategory, Product, ProductVariant, ProductImage, ProductFacet,
+    Color, AgeGroup
+)
+from products.services.facets import refresh_product_facets
+from products.services.search import refresh_search_vectors
+from products.services.images import queue_renditions
+from products.services.pricing import refresh_effective_prices
+from products.services.reference_data import bump_reference_version
+from utils.cache import bump_catalog_version
+
+#FACET INDEX
+@receiver(post_save, sender=Product)
+def refresh_facets_on_product_save(sender, instance, **kwargs):
+    refresh_product_facets([instance.id])
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def refresh_facets_on_variant_change(sender, instance, origin=None, **kwargs):
+    # cascaded from a product / category delete: the product is going
+    # away too, rebuilding its facet rows would leave them orphaned
+    if origin is not None and getattr(origin, "model", type(origin)) is not ProductVariant:
+        return
+    refresh_product_facets([instance.product_id])
+
+@receiver(post_save, sender=Category)
+def refresh_category_facet_label(sender, instance, created, **kwargs):
+    if not created:
+        ProductFacet.objects.filter(
+            facet="category", value=str(instance.id)
+        ).update(label=instance.category_name)
+
+@receiver(post_save, sender=SubCategory)
+def refresh_facets_on_subcategory_save(sender, instance, created, **kwargs):
+    if not created:
+        refresh_product_facets(
+            instance.products.values_list("id", flat=True)
+        )
+
+@receiver(post_save, sender=Color)
+def refresh_color_facet_label(sender, instance, created, **kwargs):
+    if not created:
+        ProductFacet.objects.filter(
+            facet="color", value=str(instance.id)
+        ).update(label=instance.color)
+
+@receiver(post_save, sender=AgeGroup)
+def refresh_age_group_facet_label(sender, instance, created, **kwargs):
+    if not created:
+        ProductFacet.objects.filter(
+            facet="age_group", value=str(instance.id)
+        ).update(label=instance.age)
+
+#SEARCH INDEX
+@receiver(post_save, sender=Product)
+def refresh_search_vector_on_product_save(sender, instance, **kwargs):
+    refresh_search_vectors(product_ids=[instance.id])
+
+@receiver(post_save, sender=SubCategory)
+def refresh_search_vectors_on_subcategory_save(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_vectors(subcategory_ids=[instance.id])
+
+@receiver(post_save, sender=Category)
+def refresh_search_vectors_on_category_save(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_vectors(
+            subcategory_ids=instance.subcategories.values_list("id", flat=True)
+        )
+
+#EFFECTIVE PRICE
+PRICING_FIELDS = {"base_price", "discount_percent", "subcategory"}
+
+@receiver(post_save, sender=Product)
+def refresh_effective_price_on_product_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or PRICING_FIELDS & set(update_fields):
+        refresh_effective_prices(product_ids=[instance.id])
+
+@receiver(post_save, sender=SubCategory)
+def refresh_effective_prices_on_subcategory_save(sender, instance, created, **kwargs):
+    # may have moved to a category with different offers
+    if not created:
+        refresh_effective_prices(product_ids=instance.products.values("id"))
+
+#IMAGE RENDITIONS
+@receiver(post_save, sender=ProductImage)
+def queue_product_image_renditions(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or "image" in update_fields:
+        queue_renditions(instance)
+
+#CATALOG CACHE
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=SubCategory)
+@receiver(post_delete, sender=SubCategory)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_catalog_cache(sender, **kwargs):
+    transaction.on_commit(bump_catalog_version)
+
+#REFERENCE DATA
+@receiver(post_save, sender=Color)
+@receiver(post_delete, sender=Color)
+@receiver(post_save, sender=AgeGroup)
+@receiver(post_delete, sender=AgeGroup)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=SubCategory)
+@receiver(post_delete, sender=SubCategory)
+def invalidate_reference_data(sender, **kwargs):
+    # after commit, so other processes can't reload the old rows
+    # under the new version
+    transaction.on_commit(bump_reference_version)
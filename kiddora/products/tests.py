@@ -1,3 +1,408 @@
-from django.test import TestCase
+import re
+from io import BytesIO
+from unittest import mock
+from PIL import Image
+from django.contrib.admin.sites import site
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from accounts.models import CustomUser
+from products.models import (
+    AgeGroup, CacheVersion, Category, Color, Inventory, Product, ProductVariant, StockMovement, SubCategory,
+)
+from products.services.catalog_import import FEED_COLUMNS
+from products.services.facets import refresh_product_facets
+from products.services import identifiers, reference_data
+from products.services.inventory import (
+    InsufficientStock, apply_movements, deduct_stock_on_delivery, find_stock_drift, reconcile_stock,
+    record_opening_balances, release_stock, release_stock_bulk, reserve_stock, stock_at,
+)
+from products.utils.pagination import keyset_paginate
+from products.views.catalog_views import build_category_tree, get_filter_options
+from utils import cache as cache_utils
+from utils.image_utils import open_image, process_image
+from utils.instrumentation import QueryBudgetExceeded, query_budget
 
-# Create your tests here.
+
+def make_product(subcategory, name="Shirt", color=None, age_group=None, stock=10, **fields):
+    fields.setdefault("base_price", 100)
+    product = Product.objects.create(subcategory=subcategory, product_name=name, brand="Acme", **fields)
+    variant = ProductVariant.objects.create(
+        product=product,
+        color=color or Color.objects.get_or_create(color="Red")[0],
+        age_group=age_group or AgeGroup.objects.get_or_create(age="2-3 years")[0],
+    )
+    Inventory.objects.create(variant=variant, quantity_available=stock)
+    return product
+
+
+class FilterOptionsTests(TestCase):
+    def setUp(self):
+        self.boys = Category.objects.create(category_name="Boys")
+        self.shirts = SubCategory.objects.create(category=self.boys, subcategory_name="Shirts")
+        self.hidden = Category.objects.create(category_name="Hidden")
+        self.hidden_sub = SubCategory.objects.create(category=self.hidden, subcategory_name="Old")
+        self.blue = Color.objects.create(color="Blue")
+        products = [make_product(self.shirts, color=self.blue), make_product(self.hidden_sub, name="Old")]
+        refresh_product_facets([product.id for product in products])
+        Category.objects.filter(pk=self.hidden.pk).update(is_active=False)
+
+    def test_inactive_categories_are_left_out(self):
+        options = get_filter_options(Product.objects.all())
+        categories = build_category_tree(options["facets"])
+
+        self.assertEqual([category.category_name for category in categories], ["Boys"])
+        self.assertEqual([sub.subcategory_name for sub in categories[0].active_subcategories], ["Shirts"])
+
+    def test_options_are_model_instances(self):
+        options = get_filter_options(Product.objects.all())
+
+        self.assertEqual([color.color for color in options["colors"]], ["Blue", "Red"])
+        self.assertIsInstance(options["age_groups"][0], AgeGroup)
+
+
+class KeysetPagingLinkTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(category_name="Boys")
+        subcategory = SubCategory.objects.create(category=category, subcategory_name="Shirts")
+        for i in range(7):
+            make_product(subcategory, name=f"Shirt {i}", base_price=100 + i, gender="boy")
+        make_product(subcategory, name="Dress", base_price=50, gender="girl")
+
+    def _page(self, path):
+        request = RequestFactory().get(path)
+        products = Product.objects.filter(gender=request.GET["gender"])
+        page = keyset_paginate(request, products, ["-base_price", "id"], per_page=3)
+        html = render_to_string("products/admin/pagination.html", {"page_obj": page}, request=request)
+        next_link = re.search(r'href="([^"]*cursor=[^"]*)">Next', html)
+        return page, next_link.group(1).replace("&amp;", "&") if next_link else None
+
+    def test_next_link_keeps_filters_and_sort(self):
+        seen = []
+        page, link = self._page("/products/?gender=boy&sort_by=price_high&paging=keyset")
+        seen += [product.base_price for product in page]
+        while link:
+            self.assertIn("gender=boy", link)
+            self.assertIn("sort_by=price_high", link)
+            page, link = self._page("/products/" + link)
+            seen += [product.base_price for product in page]
+
+        self.assertEqual(seen, sorted(seen, reverse=True))
+        self.assertEqual(len(seen), 7)
+
+
+class SoldCountTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(category_name="Boys")
+        self.product = make_product(SubCategory.objects.create(category=category, subcategory_name="Shirts"))
+        self.variant = self.product.variants.get()
+
+    def test_released_reservation_is_not_a_sale(self):
+        reserve_stock(self.variant, 3)
+        release_stock(self.variant, 3)
+
+        inventory = Inventory.objects.get(variant=self.variant)
+        self.assertEqual((inventory.quantity_available, inventory.quantity_reserved, inventory.quantity_sold), (10, 0, 0))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.sold_count, 0)
+
+
+class ReleaseGuardTests(TestCase):
+    def setUp(self):
+        subcategory = SubCategory.objects.create(
+            category=Category.objects.create(category_name="Boys"), subcategory_name="Shirts",
+        )
+        self.shirt = make_product(subcategory).variants.get()
+        self.shorts = make_product(subcategory, name="Shorts", color=Color.objects.create(color="Blue")).variants.get()
+
+    def counters(self, variant):
+        return Inventory.objects.values_list("quantity_available", "quantity_reserved").get(variant=variant)
+
+    def test_second_release_is_skipped(self):
+        reserve_stock(self.shirt, 3)
+        release_stock(self.shirt, 3)
+        with self.assertLogs("products.services.inventory", "WARNING"):
+            self.assertEqual(release_stock_bulk([(self.shirt, 3)]), {})
+        self.assertEqual(self.counters(self.shirt), (10, 0))
+        self.assertEqual(StockMovement.objects.filter(reason="RELEASE").count(), 1)
+
+    def test_short_variant_does_not_block_the_others(self):
+        reserve_stock(self.shirt, 2)
+        reserve_stock(self.shorts, 4)
+        with self.assertLogs("products.services.inventory", "WARNING"):
+            released = release_stock_bulk([(self.shirt, 5), (self.shorts, 4)])
+        self.assertEqual(released, {self.shorts.id: 4})
+        self.assertEqual(self.counters(self.shirt), (8, 2))
+        self.assertEqual(self.counters(self.shorts), (10, 0))
+
+
+class StockLedgerTests(TestCase):
+    def setUp(self):
+        subcategory = SubCategory.objects.create(
+            category=Category.objects.create(category_name="Boys"), subcategory_name="Shirts",
+        )
+        self.shirt = make_product(subcategory).variants.get()
+        record_opening_balances()
+
+    def counters(self):
+        return Inventory.objects.values_list(
+            "quantity_available", "quantity_reserved", "quantity_sold",
+        ).get(variant=self.shirt)
+
+    def test_reserve_release_sale_leaves_no_drift(self):
+        opened = timezone.now()
+        reserve_stock(self.shirt, 5, "ORDER", 1)
+        release_stock(self.shirt, 2, "ORDER", 1)
+        deduct_stock_on_delivery(self.shirt, 3, "ORDER", 1)
+
+        self.assertEqual(self.counters(), (7, 0, 3))
+        self.assertEqual(find_stock_drift(), [])
+        self.assertEqual(stock_at(opened), {self.shirt.id: (10, 0, 0)})
+        self.assertEqual(stock_at(timezone.now()), {self.shirt.id: (7, 0, 3)})
+
+    def test_repeated_release_or_sale_for_an_order_is_a_no_op(self):
+        reserve_stock(self.shirt, 4, "ORDER", 1)
+        reserve_stock(self.shirt, 4, "ORDER", 2)
+        deduct_stock_on_delivery(self.shirt, 4, "ORDER", 1)
+        deduct_stock_on_delivery(self.shirt, 4, "ORDER", 1)
+        self.assertEqual(release_stock_bulk([(self.shirt, 4)], "ORDER", 2), {self.shirt.id: 4})
+        self.assertEqual(release_stock_bulk([(self.shirt, 4)], "ORDER", 2), {})
+
+        self.assertEqual(self.counters(), (6, 0, 4))
+        self.assertEqual(StockMovement.objects.filter(reason__in=["RELEASE", "SALE"]).count(), 2)
+        self.assertEqual(find_stock_drift(), [])
+
+    def test_movements_that_would_go_negative_are_refused(self):
+        with self.assertRaises(InsufficientStock):
+            apply_movements([StockMovement(variant=self.shirt, reason="ADJUSTMENT", delta_reserved=-1)])
+        self.assertEqual(self.counters(), (10, 0, 0))
+        self.assertFalse(StockMovement.objects.filter(reason="ADJUSTMENT").exists())
+
+    def test_reconcile_of_a_negative_ledger_does_not_drift_again(self):
+        # a release written straight to the ledger, with nothing reserved
+        StockMovement.objects.create(variant=self.shirt, reason="RELEASE", delta_available=2, delta_reserved=-2)
+        drift = find_stock_drift()
+        self.assertEqual(reconcile_stock(drift), 1)
+
+        self.assertEqual(self.counters(), (12, 0, 0))
+        self.assertEqual(find_stock_drift(), [])
+
+
+class IdentifierRetryTests(TestCase):
+    def setUp(self):
+        subcategory = SubCategory.objects.create(
+            category=Category.objects.create(category_name="Boys"), subcategory_name="Shirts",
+        )
+        self.variant = make_product(subcategory).variants.get()
+        ProductVariant.objects.filter(pk=self.variant.pk).update(
+            sku=identifiers.sku_for(1), barcode=identifiers.barcode_for(1),
+        )
+
+    def test_sku_collision_is_redrawn(self):
+        variant = ProductVariant(
+            product=self.variant.product, color=Color.objects.create(color="Blue"), age_group=self.variant.age_group,
+        )
+        with mock.patch.object(identifiers, "allocate_numbers", side_effect=[[1], [2]]) as allocate:
+            variant.save()
+        self.assertEqual(allocate.call_count, 2)
+        self.assertEqual(variant.sku, identifiers.sku_for(2))
+
+    def test_other_integrity_errors_are_not_retried(self):
+        duplicate = ProductVariant(
+            product=self.variant.product, color=self.variant.color, age_group=self.variant.age_group,
+        )
+        with mock.patch.object(identifiers, "allocate_numbers", side_effect=[[2], [3]]) as allocate:
+            with self.assertRaises(IntegrityError):
+                duplicate.save()
+        self.assertEqual(allocate.call_count, 1)
+
+
+class CatalogImportUploadTests(TestCase):
+    def setUp(self):
+        admin = CustomUser.objects.create_user(
+            username="admin", email="admin@example.com", password="x", role=CustomUser.ROLE_ADMIN,
+        )
+        self.client.force_login(admin)
+
+    def upload(self, name, content):
+        response = self.client.post(reverse("products:admin_import_catalog"), {
+            "feed": SimpleUploadedFile(name, content),
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.context["result"]
+
+    def test_json_lines_that_are_not_objects_are_row_errors(self):
+        result = self.upload("feed.jsonl", b'[1,2]\n"x"\n\n3\n')
+
+        self.assertEqual(result["errors"], [(1, "expected a JSON object"), (2, "expected a JSON object"),
+                                            (4, "expected a JSON object")])
+        self.assertEqual(result["rows"], 0)
+
+    def test_file_that_is_not_utf8_is_reported(self):
+        result = self.upload("feed.csv", ",".join(FEED_COLUMNS).encode() + b"\nP1,Chemise \xe9t\xe9\n")
+
+        self.assertEqual(result["rows"], 0)
+        [(_, message)] = result["errors"]
+        self.assertIn("not UTF-8", message)
+
+
+class CatalogVersionTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(category_name="Boys")
+        self.product = make_product(SubCategory.objects.create(category=category, subcategory_name="Shirts"))
+        cache_utils._versions_read_at = None
+
+    def test_bump_is_seen_without_waiting_for_the_interval(self):
+        before = cache_utils.get_catalog_version()
+        cache_utils.bump_catalog_version()
+        self.assertEqual(cache_utils.get_catalog_version(), before + 1)
+
+    def test_version_is_read_from_the_database(self):
+        before = cache_utils.get_catalog_version()
+        # another worker bumped it; this process sees it after the interval
+        CacheVersion.objects.filter(name=cache_utils.CATALOG_VERSION).update(version=before + 5)
+        self.assertEqual(cache_utils.get_catalog_version(), before)
+        cache_utils._versions_read_at -= cache_utils.VERSION_CHECK_INTERVAL
+        self.assertEqual(cache_utils.get_catalog_version(), before + 5)
+
+    def test_product_save_bumps_after_commit(self):
+        before = cache_utils.get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.product.save()
+        self.assertEqual(cache_utils.get_catalog_version(), before)
+        for callback in callbacks:
+            callback()
+        self.assertGreater(cache_utils.get_catalog_version(), before)
+
+    def test_admin_soft_delete_bumps(self):
+        before = cache_utils.get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            site._registry[Product].soft_delete(None, Product.objects.all())
+        self.assertGreater(cache_utils.get_catalog_version(), before)
+
+
+class TransparentImageTests(TestCase):
+    def png(self):
+        # transparent everywhere, the hidden colour is black
+        file = BytesIO()
+        Image.new("RGBA", (40, 40), (0, 0, 0, 0)).save(file, format="PNG")
+        file.seek(0)
+        file.name = "logo.png"
+        return file
+
+    def test_alpha_is_kept_for_formats_that_support_it(self):
+        self.assertEqual(open_image(self.png(), (20, 20)).mode, "RGBA")
+
+    def test_jpeg_output_is_composited_onto_white(self):
+        output = Image.open(process_image(self.png(), (20, 20)))
+        self.assertEqual(output.convert("RGB").getpixel((10, 10)), (255, 255, 255))
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    def view(self, queries):
+        @query_budget(2)
+        def view(request):
+            for _ in range(queries):
+                list(Category.objects.all())
+            return HttpResponse()
+        return view
+
+    def test_within_budget(self):
+        request = RequestFactory().get("/")
+        self.assertEqual(self.view(2)(request).status_code, 200)
+        self.assertEqual(self.view(2).query_budget, 2)
+
+    def test_over_budget_raises_when_strict(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, "ran 3 queries (budget 2)"):
+            self.view(3)(RequestFactory().get("/"))
+
+    @override_settings(QUERY_BUDGET_STRICT=False)
+    def test_over_budget_only_logs_otherwise(self):
+        with self.assertLogs("kiddora.performance", "WARNING"):
+            self.assertEqual(self.view(3)(RequestFactory().get("/")).status_code, 200)
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class CatalogPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        subcategory = SubCategory.objects.create(
+            category=Category.objects.create(category_name="Boys"), subcategory_name="Shirts",
+        )
+        colors = [Color.objects.create(color=name) for name in ("Red", "Blue", "Green")]
+        ages = [AgeGroup.objects.create(age=age) for age in ("2-3 years", "4-5 years")]
+        cls.products = []
+        for i in range(12):
+            product = make_product(subcategory, name=f"Shirt {i}", color=colors[i % 3], age_group=ages[0])
+            variant = ProductVariant.objects.create(product=product, color=colors[(i + 1) % 3], age_group=ages[1])
+            Inventory.objects.create(variant=variant, quantity_available=5)
+            cls.products.append(product)
+        # version rows exist after the first request ever
+        CacheVersion.objects.bulk_create([CacheVersion(name="catalog"), CacheVersion(name="reference")])
+
+    def setUp(self):
+        # nothing from page or fragment caches, every product card renders
+        cache.clear()
+        cache_utils._versions_read_at = None
+        reference_data._loaded["version"] = None
+
+    def test_product_list_renders_within_budget(self):
+        response = self.client.get(reverse("products:product_list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Shirt 11")
+        self.assertContains(response, reverse("products:product_detail", args=[self.products[0].id]))
+        self.assertContains(response, "4-5 years")
+
+    def test_sidebar_shows_facet_counts(self):
+        response = self.client.get(reverse("products:product_list"))
+        # every product has two of the three colors and both age groups
+        self.assertEqual({color.color: color.count for color in response.context["colors"]},
+                         {"Red": 8, "Blue": 8, "Green": 8})
+        self.assertEqual([age.count for age in response.context["age_groups"]], [12, 12])
+        [category] = response.context["categories"]
+        self.assertEqual((category.count, category.active_subcategories[0].count), (12, 12))
+        self.assertContains(response, "Red (8)")
+        self.assertContains(response, "Shirts (12)")
+
+    def test_product_detail_renders_within_budget(self):
+        response = self.client.get(reverse("products:product_detail", args=[self.products[0].id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_server_timing_is_not_sent_to_customers(self):
+        response = self.client.get(reverse("products:product_list"))
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(DEBUG=True)
+    def test_server_timing_in_debug(self):
+        response = self.client.get(reverse("products:product_list"))
+        self.assertIn("queries", response["Server-Timing"])
+
+
+class ReferenceDataTests(TestCase):
+    def setUp(self):
+        Color.objects.create(color="Red")
+        cache_utils._versions_read_at = None
+        reference_data._loaded["version"] = None
+
+    def test_reloads_when_another_process_bumps_the_version(self):
+        self.assertEqual([color.color for color in reference_data.get_colors()], ["Red"])
+        Color.objects.bulk_create([Color(color="Blue")])
+        # the bump lands in the shared row, as it would from another worker
+        version = cache_utils.get_version(reference_data.REFERENCE_VERSION)
+        CacheVersion.objects.filter(name=reference_data.REFERENCE_VERSION).update(version=version + 1)
+        cache_utils._versions_read_at = None
+        self.assertEqual([color.color for color in reference_data.get_colors()], ["Red", "Blue"])
+
+    def test_reloads_after_max_age_without_a_bump(self):
+        reference_data.get_colors()
+        Color.objects.bulk_create([Color(color="Blue")])
+        with self.assertNumQueries(0):
+            self.assertEqual(len(reference_data.get_colors()), 1)
+        reference_data._loaded["loaded_at"] -= reference_data.REFERENCE_MAX_AGE
+        self.assertEqual(len(reference_data.get_colors()), 2)
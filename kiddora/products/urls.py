@@ -11,8 +11,8 @@ urlpatterns = [
     path("user/categories/", catalog_views.category_list_view, name="category_list"),
     path("user/categories/<int:category_id>/subcategories/",catalog_views.subcategory_list_view,name="subcategory_list"),
     path("user/products/",catalog_views.product_list,name="product_list"),
-    path("user/categories/<int:category_id>/subcategory/<int:subcategory_id>/products/<int:product_id>/",catalog_views.product_detail_view,name="product_detail"),
-    path("user/categories/<int:category_id>/subcategory/<int:subcategory_id>/products/<int:product_id>/variant-info/",catalog_views.ajax_variant_info,name="ajax_variant_info"),
+    path("user/products/<int:product_id>/",catalog_views.product_detail_view,name="product_detail"),
+    path("user/products/variant-info/",catalog_views.ajax_variant_info,name="ajax_variant_info"),
 
     #Product_admin
     # Category
@@ -32,6 +32,7 @@ urlpatterns = [
     path("admin/products/<int:product_id>/details/",product_admin_views.admin_product_details,name="admin_product_details"),
     
     path("admin/products/add/", product_admin_views.admin_add_product, name="admin_add_product"),
+    path("admin/products/import/", product_admin_views.admin_import_catalog, name="admin_import_catalog"),
     path("admin/products/<int:product_id>/edit/", product_admin_views.admin_edit_product, name="admin_edit_product"),
     path("admin/products/<int:product_id>/delete/", product_admin_views.admin_delete_product, name="admin_delete_product"),
 
@@ -1,4 +1,13 @@
+import base64
+import hashlib
+import json
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
 from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+COUNT_CACHE_TIMEOUT = 300
 
 
 def paginate_queryset(request, queryset, per_page=10):
@@ -11,3 +20,152 @@ def paginate_queryset(request, queryset, per_page=10):
     page_obj = paginator.get_page(page_number)
 
     return page_obj
+
+
+# -----------------------------
+# KEYSET (SEEK) PAGINATION
+# -----------------------------
+class KeysetPage:
+    """
+    One page of keyset-paginated results.
+    Iterable like django's Page; navigation is done with the opaque
+    next_cursor / previous_cursor tokens instead of page numbers.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, count=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+
+def encode_cursor(ordering, values, direction="next"):
+    payload = json.dumps({"o": list(ordering), "v": values, "d": direction}, cls=DjangoJSONEncoder)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, ordering):
+    """
+    Return (values, direction), or (None, "next") for a bad token or
+    one that was issued for a different sort order.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if data["o"] != list(ordering) or len(data["v"]) != len(ordering):
+            return None, "next"
+        return data["v"], data.get("d", "next")
+    except (ValueError, KeyError, TypeError):
+        return None, "next"
+
+
+def cached_count(queryset, timeout=COUNT_CACHE_TIMEOUT):
+    """
+    COUNT(*) for the queryset, cached by its SQL so repeated page
+    views of the same listing don't re-count.
+    """
+    queryset = queryset.order_by()
+    key = "listing-count:" + hashlib.md5(str(queryset.query).encode()).hexdigest()
+    return cache.get_or_set(key, queryset.count, timeout)
+
+
+def _parse_ordering(ordering):
+    return [(field.lstrip("-"), field.startswith("-")) for field in ordering]
+
+
+def _key_value(obj, name):
+    for part in name.split("__"):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _from_cursor(model, name, value):
+    try:
+        return model._meta.get_field(name).to_python(value)
+    except FieldDoesNotExist:
+        # annotation (e.g. search_rank) – plain JSON value is fine
+        return value
+
+
+def _seek_filter(model, fields, values, backwards):
+    """
+    (a > x) OR (a = x AND b > y) OR ... for the given sort keys,
+    with comparisons flipped for descending keys / backwards paging.
+    """
+    condition = Q()
+    equal_so_far = Q()
+    for (name, desc), raw in zip(fields, values):
+        value = _from_cursor(model, name, raw)
+        lookup = "lt" if desc != backwards else "gt"
+        condition |= equal_so_far & Q(**{f"{name}__{lookup}": value})
+        equal_so_far &= Q(**{name: value})
+    return condition
+
+
+def keyset_paginate(request, queryset, ordering, per_page=15, with_count=False, cursor_param="cursor"):
+    """
+    Cursor-based pagination on the given sort keys.
+    The last key must be unique (normally "id" / "-id") and all keys
+    must be non-null.
+
+    usage:
+    page_obj = keyset_paginate(request, products, ["final_price", "id"], 15)
+    """
+    fields = _parse_ordering(ordering)
+    values, direction = decode_cursor(request.GET.get(cursor_param) or "", ordering)
+    backwards = direction == "previous"
+
+    total = cached_count(queryset) if with_count else None
+
+    if values is not None:
+        try:
+            queryset = queryset.filter(_seek_filter(queryset.model, fields, values, backwards))
+        except (ValueError, ValidationError):
+            # tampered cursor → start from the first page
+            values, backwards = None, False
+
+    order_by = [("-" if desc != backwards else "") + name for name, desc in fields]
+    rows = list(queryset.order_by(*order_by)[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    next_cursor = previous_cursor = None
+    if rows:
+        first = [_key_value(rows[0], name) for name, _ in fields]
+        last = [_key_value(rows[-1], name) for name, _ in fields]
+        if has_more or backwards:
+            next_cursor = encode_cursor(ordering, last, "next")
+        if values is not None and (has_more or not backwards):
+            previous_cursor = encode_cursor(ordering, first, "previous")
+
+    return KeysetPage(rows, next_cursor, previous_cursor, total)
+
+
+def paginate_listing(request, queryset, ordering, per_page=10, with_count=False):
+    """
+    Keyset paging when the request carries a cursor (or asks for it
+    with ?paging=keyset), numbered OFFSET pages otherwise.
+    """
+    if request.GET.get("cursor") or request.GET.get("paging") == "keyset":
+        return keyset_paginate(request, queryset, ordering, per_page, with_count)
+    return paginate_queryset(request, queryset.order_by(*ordering), per_page)
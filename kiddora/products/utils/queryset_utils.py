@@ -1,3 +1,6 @@
+from django.db.models import Prefetch
+from products.models import ProductImage, ProductVariant
+
 def apply_product_filters(queryset, category_id=None, subcategory_id=None):
     """
     Applies category & subcategory filters
@@ -19,3 +22,28 @@ def apply_sorting(queryset, sort_key, sort_map, default="-id"):
 
     order_by = sort_map.get(sort_key, default)
     return queryset.order_by(order_by)
+
+
+def primary_image_prefetch():
+    """
+    Prefetch each product's default image into `primary_images`,
+    one query for a whole page of products. Read it in templates as
+    {{ product.primary_image.card_url }}.
+    """
+    return Prefetch(
+        "images",
+        queryset=ProductImage.objects.filter(is_default=True),
+        to_attr="primary_images",
+    )
+
+
+def active_variants_prefetch():
+    """
+    Prefetch each product's active variants with their colour and age
+    group, for listings that show variant badges via
+    {% for variant in product.variants.all %}.
+    """
+    return Prefetch(
+        "variants",
+        queryset=ProductVariant.objects.filter(is_active=True).select_related("color", "age_group"),
+    )
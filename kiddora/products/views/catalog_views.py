@@ -1,20 +1,27 @@
+import copy
 from django.shortcuts import render, get_object_or_404
 from django.http import JsonResponse
-from products.models import (
-    Category, SubCategory, Product,
-    ProductVariant, ProductImage, Inventory, Color, AgeGroup
-)
-from django.db.models import Q, Min, Max, Count, Sum, Prefetch
-from django.core.paginator import Paginator
-
-
+from products.models import Category, Product, ProductVariant
+from django.db.models import Min, Max
+from products.services.facets import get_facet_summary
+from products.services.reference_data import get_age_groups, get_categories, get_colors, get_subcategories
+from products.services.search import apply_product_search
+from products.utils.pagination import paginate_listing
+from products.utils.queryset_utils import active_variants_prefetch, primary_image_prefetch
+from utils.cache import anonymous_page_cache
+from utils.reviews import get_product_review_stats
+from utils.instrumentation import query_budget
+
+
+@anonymous_page_cache()
 def category_list_view(request):
-    categories = Category.objects.filter(is_active=True)
+    categories = get_categories()
     return render(request, 'products/catalog/category_list.html', {
         'categories': categories,
     })
 
 
+@anonymous_page_cache()
 def subcategory_list_view(request, category_id):
     category = get_object_or_404(Category, id=category_id, is_active=True)
     subcategories = category.subcategories.filter(
@@ -26,106 +33,66 @@ def subcategory_list_view(request, category_id):
     })
 
 
-def get_filter_options(products_qs):
+def _with_counts(options, values):
     """
-    Build sidebar filter options strictly from products in the current queryset.
-    All values come from actual DB records — nothing hardcoded.
+    Copies of the cached reference rows that appear in the facet values,
+    each with the facet's product `count` attached.
     """
+    counts = {value["code"]: value["count"] for value in values}
+    for option in options:
+        if str(option.id) in counts:
+            # the reference data is shared between requests, annotate a copy
+            option = copy.copy(option)
+            option.count = counts[str(option.id)]
+            yield option
 
-    # Colors: from variants of matching products
-    colors = (
-        Color.objects
-        .filter(variants__product__in=products_qs, variants__is_active=True)
-        .distinct()
-        .order_by("color")
-    )
-
-    # Age groups: from variants of matching products
-    age_groups = (
-        AgeGroup.objects
-        .filter(variants__product__in=products_qs, variants__is_active=True)
-        .distinct()
-        .order_by("age")
-    )
 
-    # Genders: only genders actually used by products in this queryset
-    gender_codes = (
-        products_qs
-        .values_list("gender", flat=True)
-        .distinct()
-        .order_by("gender")
-    )
-    gender_map = dict(Product.GENDER_CHOICES)
-    genders = [
-        {"code": code, "label": gender_map.get(code, code)}
-        for code in gender_codes
-        if code
-    ]
-
-    # Fabrics: only fabrics actually used by products in this queryset
-    fabric_values = (
-        products_qs
-        .values_list("fabric", flat=True)
-        .distinct()
-        .order_by("fabric")
-    )
-    fabric_map = dict(Product.FABRIC_CHOICES)
-    fabric_types = [
-        {"code": f, "label": fabric_map.get(f, f)}
-        for f in fabric_values
-        if f
-    ]
+def get_filter_options(products_qs):
+    """
+    Build sidebar filter options strictly from products in the current queryset.
+    Values and per-value counts come from the precomputed facet index.
+    """
+    facets = get_facet_summary(products_qs)
 
     # Price range
-    price_range = products_qs.aggregate(
-        min_price=Min("final_price"),
-        max_price=Max("final_price"),
+    price_range = products_qs.order_by().aggregate(
+        min_price=Min("effective_price"),
+        max_price=Max("effective_price"),
     )
 
     return {
-        "colors": colors,
-        "age_groups": age_groups,
-        "genders": genders,
-        "fabric_types": fabric_types,          # key matches template
+        "facets": facets,
+        "colors": sorted(_with_counts(get_colors(), facets["color"]), key=lambda c: c.color),
+        "age_groups": sorted(_with_counts(get_age_groups(), facets["age_group"]), key=lambda a: a.age),
+        "genders": facets["gender"],
+        "fabric_types": facets["fabric"],          # key matches template
         "min_price": price_range["min_price"] or 0,
         "max_price": price_range["max_price"] or 0,
     }
 
 
-def build_category_tree(products_qs):
+def build_category_tree(facets):
     """
     Return only categories and subcategories that have
     at least one active product in the current queryset.
     """
-    # subcategory ids that have products in this queryset
-    active_sub_ids = products_qs.values_list(
-        "subcategory_id", flat=True
-    ).distinct()
-
-    # prefetch only subcategories with active products
-    active_subs = SubCategory.objects.filter(
-        id__in=active_sub_ids
-    )
-
-    categories = (
-        Category.objects
-        .filter(
-            is_active=True,
-            subcategories__id__in=active_sub_ids,
-        )
-        .prefetch_related(
-            Prefetch(
-                "subcategories",
-                queryset=active_subs,
-                to_attr="active_subcategories",   # custom attr, not .all()
-            )
-        )
-        .distinct()
-        .order_by("category_name")
-    )
+    subs_by_category = {}
+    for sub in _with_counts(get_subcategories(), facets["subcategory"]):
+        subs_by_category.setdefault(sub.category_id, []).append(sub)
+
+    category_counts = {value["code"]: value["count"] for value in facets["category"]}
+    categories = []
+    for category in sorted(get_categories(), key=lambda c: c.category_name):
+        if category.id in subs_by_category:
+            category = copy.copy(category)
+            category.count = category_counts.get(str(category.id), 0)
+            category.active_subcategories = subs_by_category[category.id]
+            categories.append(category)
     return categories
 
 
+RATING_FILTER_OPTIONS = [4, 3, 2, 1]
+
 SORT_OPTIONS = [
     {"key": "newest",           "label": "Newest First"},
     {"key": "oldest",           "label": "Oldest First"},
@@ -134,11 +101,14 @@ SORT_OPTIONS = [
     {"key": "az",               "label": "Name: A → Z"},
     {"key": "za",               "label": "Name: Z → A"},
     {"key": "popularity",       "label": "Most Popular"},
+    {"key": "trending",         "label": "Trending Now"},
+    {"key": "top_rated",        "label": "Top Rated"},
     {"key": "highest_discount", "label": "Highest Discount"},
     {"key": "lowest_discount",  "label": "Lowest Discount"},
 ]
 
 
+@query_budget(12)
 def product_list(request, category_id=None, subcategory_id=None):
 
     products = Product.objects.filter(
@@ -161,16 +131,13 @@ def product_list(request, category_id=None, subcategory_id=None):
     selected_fabrics    = request.GET.getlist("fabric")
     min_price           = request.GET.get("min_price")
     max_price           = request.GET.get("max_price")
+    min_rating          = request.GET.get("min_rating")
     sort_by_list        = request.GET.getlist("sort_by")
     sort_by             = sort_by_list[0] if sort_by_list else None
 
     # ── Filters ──
     if query:
-        products = products.filter(
-            Q(product_name__icontains=query) |
-            Q(brand__icontains=query) |
-            Q(about_product__icontains=query)
-        )
+        products = apply_product_search(products, query)
     if selected_categories:
         products = products.filter(
             subcategory__category_id__in=selected_categories
@@ -193,37 +160,48 @@ def product_list(request, category_id=None, subcategory_id=None):
     if selected_fabrics:
         products = products.filter(fabric__in=selected_fabrics)
     if min_price:
-        products = products.filter(final_price__gte=min_price)
+        products = products.filter(effective_price__gte=min_price)
     if max_price:
-        products = products.filter(final_price__lte=max_price)
+        products = products.filter(effective_price__lte=max_price)
+    try:
+        min_rating = int(min_rating) if min_rating else None
+    except ValueError:
+        min_rating = None
+    if min_rating:
+        products = products.filter(rating_avg__gte=min_rating)
 
     products = products.distinct()
 
     # ── Sorting ──
     sort_map = {
-        "price_low":        "final_price",
-        "price_high":       "-final_price",
-        "az":               "product_name",
-        "za":               "-product_name",
-        "highest_discount": "-discount_percent",
-        "lowest_discount":  "discount_percent",
-        "newest":           "-id",
-        "oldest":           "id",
+        "price_low":        ["effective_price", "id"],
+        "price_high":       ["-effective_price", "-id"],
+        "az":               ["product_name", "id"],
+        "za":               ["-product_name", "-id"],
+        "highest_discount": ["-effective_discount", "-id"],
+        "lowest_discount":  ["effective_discount", "id"],
+        "newest":           ["-id"],
+        "oldest":           ["id"],
+        "popularity":       ["-sold_count", "-id"],
+        "trending":         ["-trending_score", "-id"],
+        "top_rated":        ["-rating_avg", "-rating_count", "-id"],
     }
-    if sort_by == "popularity":
-        products = products.annotate(
-            popularity=Sum("variants__inventory__quantity_sold")
-        ).order_by("-popularity")
+    if query and sort_by not in sort_map:
+        # no explicit sort → best matches first
+        ordering = ["-search_rank", "-id"]
     else:
-        products = products.order_by(sort_map.get(sort_by, "-id"))
+        ordering = sort_map.get(sort_by, ["-id"])
 
-    # ── Pagination ──
-    paginator  = Paginator(products, 15)
-    page_obj   = paginator.get_page(request.GET.get("page"))
+    # ── Pagination (numbered, or keyset with ?cursor=) ──
+    page_obj = paginate_listing(
+        request,
+        products.prefetch_related(primary_image_prefetch(), active_variants_prefetch()),
+        ordering, 15, with_count=True,
+    )
 
     # ── Sidebar filter options (based on filtered queryset) ──
     filter_options = get_filter_options(products)
-    categories     = build_category_tree(products)
+    categories     = build_category_tree(filter_options["facets"])
 
     context = {
         "products":             page_obj.object_list,
@@ -243,6 +221,8 @@ def product_list(request, category_id=None, subcategory_id=None):
         "selected_genders":     selected_genders,
         "selected_fabrics":     selected_fabrics,
         "sort_by":              sort_by,
+        "min_rating":           min_rating,
+        "rating_filter_options": RATING_FILTER_OPTIONS,
         "query":                query,
     }
 
@@ -253,9 +233,11 @@ def product_list(request, category_id=None, subcategory_id=None):
     return render(request, "products/catalog/product_list.html", context)
 
 
+@query_budget(12)
 def product_detail_view(request, product_id):
     product = get_object_or_404(
-        Product, id=product_id, is_active=True,
+        Product.objects.prefetch_related("images"),
+        id=product_id, is_active=True,
         subcategory__category__is_active=True,
     )
     variants = ProductVariant.objects.filter(
@@ -263,11 +245,12 @@ def product_detail_view(request, product_id):
     ).select_related("color", "age_group", "inventory")
     related_products = Product.objects.filter(
         subcategory=product.subcategory, is_active=True
-    ).exclude(id=product.id)[:4]
+    ).exclude(id=product.id).prefetch_related(primary_image_prefetch())[:4]
     return render(request, "products/catalog/product_detail.html", {
         "product":          product,
         "variants":         variants,
         "related_products": related_products,
+        "review_stats":     get_product_review_stats(product),
     })
 
 
@@ -279,7 +262,7 @@ def ajax_variant_info(request):
         ).get(id=variant_id, is_active=True)
         inventory = getattr(variant, "inventory", None)
         data = {
-            "price":              str(variant.product.final_price),
+            "price":              str(variant.product.effective_price),
             "color":              str(variant.color),
             "age_group":          str(variant.age_group),
             "quantity_available": inventory.quantity_available if inventory else 0,
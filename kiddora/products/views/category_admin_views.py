@@ -2,8 +2,11 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.core.paginator import Paginator
 from django.contrib import messages
 from django.views.decorators.cache import never_cache
+from django.db import transaction
 from products.models import *
 from accounts.decorators import admin_login_required
+from products.services.reference_data import get_categories
+from utils.cache import bump_catalog_version
 
 # CATEGORY MANAGEMENT
 
@@ -57,7 +60,7 @@ def admin_add_category(request):
         messages.success(request, "Category added successfully")
         return redirect("products:admin_category_list")
 
-    categories = Category.objects.filter(is_active=True)
+    categories = get_categories()
     return render(request, "products/admin/admin_category_form.html", {"categories": categories})
 
 @admin_login_required
@@ -75,7 +78,7 @@ def admin_edit_category(request, category_id):
         messages.success(request, "Category updated")
         return redirect("products:admin_category_list")
 
-    categories = Category.objects.filter(is_active=True)
+    categories = get_categories()
     return render(request, "products/admin/admin_category_form.html", {"category": category, "categories": categories})
 
 @admin_login_required
@@ -84,6 +87,7 @@ def admin_delete_category(request, category_id):
     category.is_active = False  # soft delete
     category.save()
     Product.objects.filter(subcategory__category=category).update(is_active=False)
+    transaction.on_commit(bump_catalog_version)
     messages.success(request, "Category deleted safely")
     return redirect("products:admin_category_list")
 
@@ -123,7 +127,7 @@ def admin_subcategory_list(request):
 
 @admin_login_required
 def admin_add_subcategory(request):
-    categories = Category.objects.filter(is_active=True)
+    categories = get_categories()
     if request.method == "POST":
         name = request.POST.get("subcategory_name").strip()
         category_id = request.POST.get("category")
@@ -142,7 +146,7 @@ def admin_add_subcategory(request):
 @admin_login_required
 def admin_edit_subcategory(request, subcategory_id):
     subcategory = get_object_or_404(SubCategory, id=subcategory_id)
-    categories = Category.objects.filter(is_active=True)
+    categories = get_categories()
 
     if request.method == "POST":
         name = request.POST.get("subcategory_name").strip()
@@ -165,6 +169,7 @@ def admin_edit_subcategory(request, subcategory_id):
 def admin_delete_subcategory(request, subcategory_id):
     subcategory = get_object_or_404(SubCategory, id=subcategory_id)
     Product.objects.filter(subcategory=subcategory).update(is_active=False)
+    transaction.on_commit(bump_catalog_version)
     subcategory.delete()  
     messages.success(request, "SubCategory deleted safely")
     return redirect("products:admin_subcategory_list")
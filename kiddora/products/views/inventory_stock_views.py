@@ -3,9 +3,10 @@ from django.contrib import messages
 from django.db import transaction
 from django.views.decorators.cache import never_cache
 from accounts.decorators import admin_login_required
-from products.models import Inventory, ProductVariant
+from products.models import Inventory, ProductVariant, StockMovement
+from products.services.inventory import InsufficientStock, adjust_stock, apply_movements
 from products.utils.search_utils import apply_search
-from products.utils.pagination import paginate_queryset
+from products.utils.pagination import paginate_listing
 
 
 @never_cache
@@ -20,7 +21,7 @@ def admin_inventory_list(request):
         "variant__product__subcategory__category",
         "variant__color",
         "variant__age_group",
-    ).order_by("-updated_at")
+    )
 
     if search:
         inventories = inventories.filter(
@@ -31,7 +32,7 @@ def admin_inventory_list(request):
             variant__product__brand__icontains=search
         )
 
-    page_obj = paginate_queryset(request, inventories, 20)
+    page_obj = paginate_listing(request, inventories, ["-updated_at", "-id"], 20)
 
     return render(
         request,
@@ -59,25 +60,26 @@ def update_stock(request, inventory_id):   # renamed param to inventory_id
 
         action = request.POST.get("action", "add")
 
-        if action == "remove":
-            if change > inventory.quantity_available:
-                messages.error(request, "Not enough stock available.")
-                return redirect("products:admin_inventory_list")
-            inventory.quantity_available -= change
-        else:
-            inventory.quantity_available += change
+        try:
+            if action == "remove":
+                adjust_stock(inventory.variant_id, -change, reason="ADJUSTMENT")
+            else:
+                adjust_stock(inventory.variant_id, change, reason="RESTOCK")
+        except InsufficientStock:
+            messages.error(request, "Not enough stock available.")
+            return redirect("products:admin_inventory_list")
 
-        inventory.save()
         messages.success(request, f"Stock updated for {inventory.variant}.")
 
     return redirect("products:admin_inventory_list")
 
 
 def sync_inventory(variant: ProductVariant, delta_available=0, delta_reserved=0, delta_sold=0):
-    inventory, _ = Inventory.objects.get_or_create(
-        variant=variant, defaults={"quantity_available": 0}
-    )
-    inventory.quantity_available += delta_available
-    inventory.quantity_reserved += delta_reserved
-    inventory.quantity_sold += delta_sold
-    inventory.save()
\ No newline at end of file
+    Inventory.objects.get_or_create(variant=variant, defaults={"quantity_available": 0})
+    apply_movements([StockMovement(
+        variant=variant,
+        reason="ADJUSTMENT",
+        delta_available=delta_available,
+        delta_reserved=delta_reserved,
+        delta_sold=delta_sold,
+    )])
\ No newline at end of file
@@ -1,9 +1,12 @@
 from django.views.decorators.cache import never_cache
-from products.utils.queryset_utils import apply_product_filters, apply_sorting
+from products.utils.queryset_utils import apply_product_filters
 from products.utils.search_utils import apply_search
-from products.utils.pagination import paginate_queryset
+from products.utils.pagination import paginate_listing
 from django.db.models.functions import Coalesce
-from utils.image_utils import process_image
+from utils.image_utils import validate_image
+from products.services.catalog_import import FEED_COLUMNS, import_catalog, read_feed
+from products.services.inventory import create_inventory
+from products.services.reference_data import get_age_groups, get_categories, get_colors, get_subcategories
 from accounts.decorators import admin_login_required
 from django.shortcuts import render, redirect, get_object_or_404
 from django.db.models import Avg, Count, Sum, F, Value
@@ -85,12 +88,6 @@ def admin_product_list(request):
 # SEARCH
     queryset = apply_search(queryset, search, ["product_name", "brand"])
 
-    # POPULARITY (BASED ON SOLD QTY)
-    queryset = queryset.annotate(
-        popularity_score=Coalesce(
-            Sum("variants__inventory__quantity_sold"), Value(0)
-        )
-    )
     # FILTERS
     queryset = apply_product_filters(queryset, category_id, subcategory_id)
 
@@ -105,24 +102,22 @@ def admin_product_list(request):
 
     # SORTING
     sort_map = {
-        "price_low": "final_price",
-        "price_high": "-final_price",
-        "az": "product_name",
-        "za": "-product_name",
-        "new": "-id",
-        "popular": "-popularity_score",
+        "price_low": ["final_price", "id"],
+        "price_high": ["-final_price", "-id"],
+        "az": ["product_name", "id"],
+        "za": ["-product_name", "-id"],
+        "new": ["-id"],
+        "popular": ["-sold_count", "-id"],  # POPULARITY (BASED ON SOLD QTY)
     }
 
-    queryset = apply_sorting(queryset, sort, sort_map, "-id")
-
-    page_obj = paginate_queryset(request, queryset, 15)
+    page_obj = paginate_listing(request, queryset, sort_map.get(sort, ["-id"]), 15)
 
     context = {
         "page_obj": page_obj,
         "search": search,
         "sort": sort,
-        "categories": Category.objects.filter(is_active=True),
-        "subcategories": SubCategory.objects.filter(category__is_active=True),
+        "categories": get_categories(),
+        "subcategories": get_subcategories(),
     }
 
     return render(request, "products/admin/admin_product_list.html", context)
@@ -147,13 +142,19 @@ def admin_add_product(request):
         image4 = request.FILES.get("productImage4")
         image5 = request.FILES.get("productImage5")
         # Validate minimum 3 images BEFORE touching the database
+        uploads = [image for image in (image1, image2, image3, image4, image5) if image]
+        image_error = None
         if not (image1 and image2 and image3):
-            messages.error(request, "Minimum 3 images required")
+            image_error = "Minimum 3 images required"
+        elif not all(validate_image(image) for image in uploads):
+            image_error = "Uploaded files must be valid images"
+        if image_error:
+            messages.error(request, image_error)
             return render(
                 request,
                 "products/admin/admin_product_form.html",
                 {
-                    "subcategories": SubCategory.objects.filter(category__is_active=True),
+                    "subcategories": get_subcategories(),
                     "preview_final_price": preview_final_price,
                     "fabric_choices": Product.FABRIC_CHOICES,
                     "gender_choices": Product.GENDER_CHOICES,
@@ -168,13 +169,6 @@ def admin_add_product(request):
         )
         print("Creating product with name:", name, "and subcategory:", subcategory)
 
-        # Process images before DB writes — fail fast if process_image errors
-        processed1 = process_image(image1)
-        processed2 = process_image(image2)
-        processed3 = process_image(image3)
-        processed4 = process_image(image4) if image4 else None
-        processed5 = process_image(image5) if image5 else None
-
         # Now write to DB inside a single clean transaction
         with transaction.atomic():
             product = Product.objects.create(
@@ -188,21 +182,13 @@ def admin_add_product(request):
                 subcategory=subcategory,
                 is_active=True,
             )
-            img_instance = ProductImage(
-                product=product,
-                image1=processed1,
-                image2=processed2,
-                image3=processed3,
-                image4=processed4,
-                image5=processed5,
-                is_default=True,
-            )
-        
-            ProductImage.objects.filter(
-                product=product, is_default=True
-            ).update(is_default=False)
-            
-            super(ProductImage, img_instance).save(force_insert=True)
+            for position, image in enumerate(uploads):
+                ProductImage.objects.create(
+                    product=product,
+                    image=image,
+                    position=position,
+                    is_default=position == 0,
+                )
 
         print("Product images saved for product ID:", product.id)
         print("image1",image1)
@@ -218,7 +204,7 @@ def admin_add_product(request):
         request,
         "products/admin/admin_product_form.html",
         {
-            "subcategories": SubCategory.objects.filter(category__is_active=True),
+            "subcategories": get_subcategories(),
             "preview_final_price": preview_final_price,
             "fabric_choices": Product.FABRIC_CHOICES,
             "gender_choices": Product.GENDER_CHOICES,
@@ -226,6 +212,33 @@ def admin_add_product(request):
     )
 
 
+# -----------------------------
+# IMPORT CATALOG (CSV / JSONL)
+# -----------------------------
+@never_cache
+@admin_login_required
+def admin_import_catalog(request):
+    result = None
+
+    if request.method == "POST":
+        feed = request.FILES.get("feed")
+        if not feed:
+            messages.error(request, "Choose a CSV or JSONL file to import")
+        else:
+            result = import_catalog(read_feed(feed, feed.name))
+            messages.success(
+                request,
+                f"{result['rows']} rows imported, {result['variants_created']} new variants, "
+                f"{len(result['errors'])} errors",
+            )
+
+    return render(request, "products/admin/admin_import_catalog.html", {
+        "result": result,
+        "errors": result["errors"][:200] if result else [],
+        "columns": FEED_COLUMNS,
+    })
+
+
 # -----------------------------
 # EDIT PRODUCT
 # -----------------------------
@@ -293,10 +306,7 @@ def admin_add_variant(request, product_id):
             age_group_id=request.POST.get("age_group"),
         )
 
-        Inventory.objects.create(
-            variant=variant,
-            quantity_available=request.POST.get("stock"),
-        )
+        create_inventory({variant.id: int(request.POST.get("stock") or 0)})
 
         messages.success(request, "Variant added")
         return redirect("products:admin_product_details", product_id=product.id)
@@ -306,8 +316,8 @@ def admin_add_variant(request, product_id):
         "products/admin/admin_variant_form.html",
         {
             "product": product,
-            "colors": Color.objects.all(),
-            "ages": AgeGroup.objects.all(),
+            "colors": get_colors(),
+            "ages": get_age_groups(),
         },
     )
 
@@ -332,8 +342,8 @@ def admin_edit_variant(request, variant_id, product_id):
         "products/admin/admin_variant_form.html",
         {
             "variant": variant,
-            "colors": Color.objects.all(),
-            "ages": AgeGroup.objects.all(),
+            "colors": get_colors(),
+            "ages": get_age_groups(),
         },
     )
 
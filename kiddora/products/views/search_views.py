@@ -1,17 +1,15 @@
 from django.shortcuts import render
 from products.models import *
-from django.db.models import Q
+from products.services.search import apply_product_search
+from products.utils.queryset_utils import primary_image_prefetch
 
 def search_products(request):
     query = request.GET.get("q", "")
-    products = Product.objects.filter(is_active=True)
+    products = Product.objects.filter(
+        is_active=True
+    ).select_related("subcategory", "subcategory__category").prefetch_related(primary_image_prefetch())
     if query:
-        products = products.filter(
-            Q(product_name__icontains=query) |
-            Q(brand__icontains=query) |
-            Q(subcategory__subcategory_name__icontains=query) |
-            Q(subcategory__category__category_name__icontains=query)
-        )
-    
-    context={{"products": products, "query": query}}
+        products = apply_product_search(products, query).order_by("-search_rank", "-id")
+
+    context = {"products": products, "query": query}
     return render(request,"products/search/search_results.html",context)
@@ -1,6 +1,23 @@
 from django.contrib import admin
 from .models import *
 
+#COUPON
+@admin.register(Coupon)
+class CouponAdmin(admin.ModelAdmin):
+    list_display = ("code", "discount_type", "used_count", "usage_limit", "per_user_limit", "expiry_date", "is_active")
+    list_filter = ("is_active", "discount_type")
+    search_fields = ("code",)
+    readonly_fields = ("used_count",)
+    exclude = ("used_by",)
+
+@admin.register(CouponRedemption)
+class CouponRedemptionAdmin(admin.ModelAdmin):
+    list_display = ("coupon", "user", "order", "use_number", "discount_amount", "created_at")
+    list_select_related = ("coupon", "user", "order")
+    search_fields = ("coupon__code", "user__email")
+    raw_id_fields = ("coupon", "user", "order")
+    ordering = ("-created_at",)
+
 # CART 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
@@ -47,6 +64,11 @@ class WalletAdmin(admin.ModelAdmin):
 class WalletTransactionAdmin(admin.ModelAdmin):
     list_display = ("wallet", "txn_type", "amount", "reference_type","reference_id","created_at")
 
+@admin.register(WalletBalanceSnapshot)
+class WalletBalanceSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("wallet", "balance", "last_transaction_id", "created_at")
+    list_select_related = ("wallet__user",)
+
 @admin.register(Wishlist)
 class WishlistAdmin(admin.ModelAdmin):
     list_display = ("user",)
@@ -0,0 +1,21 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from shopcore.models import DailyOrderRollup, DailySalesRollup
+from shopcore.services.sales_rollup import rebuild_sales_rollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily sales rollups used by the admin dashboard from order history."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since", type=date.fromisoformat,
+            help="Only rebuild days on or after this date (YYYY-MM-DD).",
+        )
+
+    def handle(self, *args, **options):
+        rebuild_sales_rollup(since=options["since"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Sales rollup rebuilt: {DailySalesRollup.objects.count()} product rows, "
+            f"{DailyOrderRollup.objects.count()} day rows."
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from shopcore.services.wallet import checkpoint_wallets, find_balance_drift
+
+
+class Command(BaseCommand):
+    help = "Snapshot wallet balances so ledger verification only sums recent transactions. Run periodically (cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify", action="store_true",
+            help="Also compare every wallet's balance with its ledger and list mismatches.",
+        )
+
+    def handle(self, *args, **options):
+        written = checkpoint_wallets()
+        self.stdout.write(self.style.SUCCESS(f"Wallet snapshots written: {written}."))
+
+        if options["verify"]:
+            drift = find_balance_drift()
+            for wallet_id, balance, ledger in drift:
+                self.stdout.write(self.style.WARNING(f"Wallet {wallet_id}: balance {balance}, ledger {ledger}"))
+            self.stdout.write(f"{len(drift)} wallet(s) out of balance.")
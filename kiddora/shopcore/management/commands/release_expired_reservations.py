@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from shopcore.services.reservations import RELEASE_BATCH_SIZE, release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = "Cancel unpaid orders whose stock reservation expired and release the stock. Run every few minutes (cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=RELEASE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        stats = release_expired_reservations(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Released {stats['units']} reserved unit(s) from {stats['orders']} expired order(s) "
+            f"in {stats['batches']} batch(es)."
+        ))
@@ -0,0 +1,38 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from shopcore.services.benchmarks import compare_reports, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = "Time the main storefront, admin and checkout paths against seed_benchmark_data and write a JSON report."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--warmup", type=int, default=1)
+        parser.add_argument("--only", nargs="*", help="Case name prefixes, e.g. product_list checkout.")
+        parser.add_argument("--output", help="Write the report here instead of stdout.")
+        parser.add_argument("--compare", help="Earlier report to compare median times against.")
+
+    def handle(self, *args, **options):
+        report = run_benchmarks(
+            repeat=options["repeat"],
+            warmup=options["warmup"],
+            only=options["only"],
+            log=self.stderr.write,
+        )
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stderr.write(self.style.SUCCESS(f"Report written to {options['output']}."))
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+            for name, before, after, change in compare_reports(baseline, report):
+                self.stderr.write(f"{name:40} {before:>10} -> {after:>10} ms  {change:+.1f}%")
+
+        if report["failed"]:
+            raise CommandError(f"{len(report['failed'])} case(s) failed: {', '.join(report['failed'])}")
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from shopcore.services.benchmark_data import DEFAULT_SIZES, delete_benchmark_data, seed_benchmark_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-insert a large synthetic catalog, customers and order history for run_benchmarks. "
+        "Use --scale 0.01 for a quick local dataset."
+    )
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_SIZES.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default)
+        parser.add_argument("--scale", type=float, default=1.0, help="Multiply the product / user / order counts.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--reset", action="store_true", help="Remove earlier benchmark data first.")
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            delete_benchmark_data(log=self.stdout.write)
+
+        scale = options["scale"]
+        seed_benchmark_data(
+            products=int(options["products"] * scale),
+            variants_per_product=options["variants_per_product"],
+            users=int(options["users"] * scale),
+            orders=int(options["orders"] * scale),
+            items_per_order=options["items_per_order"],
+            batch_size=options["batch_size"],
+            seed=options["seed"],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS("Benchmark data seeded."))
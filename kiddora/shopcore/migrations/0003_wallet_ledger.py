@@ -0,0 +1,82 @@
+# Generated by Django 6.0 on 2026-10-18 13:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def release_duplicate_references(apps, schema_editor):
+    # refunds recorded twice before the constraint existed: keep the
+    # reference on the first row only, the amounts stay in the ledger
+    WalletTransaction = apps.get_model("shopcore", "WalletTransaction")
+    duplicates = (
+        WalletTransaction.objects
+        .filter(reference_id__isnull=False)
+        .values("reference_type", "reference_id", "txn_type")
+        .annotate(rows=Count("id"), first=Min("id"))
+        .filter(rows__gt=1)
+    )
+    for row in duplicates.iterator():
+        WalletTransaction.objects.filter(
+            reference_type=row["reference_type"],
+            reference_id=row["reference_id"],
+            txn_type=row["txn_type"],
+            id__gt=row["first"],
+        ).update(reference_type=None, reference_id=None)
+
+
+def opening_snapshots(apps, schema_editor):
+    # today's balances are taken as correct; verification starts here
+    Wallet = apps.get_model("shopcore", "Wallet")
+    WalletTransaction = apps.get_model("shopcore", "WalletTransaction")
+    WalletBalanceSnapshot = apps.get_model("shopcore", "WalletBalanceSnapshot")
+    last_transaction = (
+        WalletTransaction.objects
+        .filter(wallet=OuterRef("pk"))
+        .values("wallet")
+        .annotate(last=Max("id"))
+        .values("last")
+    )
+    wallets = Wallet.objects.annotate(last_id=Coalesce(Subquery(last_transaction), Value(0)))
+    WalletBalanceSnapshot.objects.bulk_create(
+        (
+            WalletBalanceSnapshot(wallet_id=wallet_id, balance=balance, last_transaction_id=last_id)
+            for wallet_id, balance, last_id in wallets.values_list("id", "balance", "last_id").iterator()
+        ),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopcore', '0002_daily_sales_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletBalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('last_transaction_id', models.PositiveBigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(release_duplicate_references, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='wallettransaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('reference_id__isnull', False)), fields=('reference_type', 'reference_id', 'txn_type'), name='wallet_txn_reference_unique'),
+        ),
+        migrations.AddField(
+            model_name='walletbalancesnapshot',
+            name='wallet',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='shopcore.wallet'),
+        ),
+        migrations.AddIndex(
+            model_name='walletbalancesnapshot',
+            index=models.Index(fields=['wallet', '-last_transaction_id'], name='wallet_snapshot_latest_idx'),
+        ),
+        migrations.RunPython(opening_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 13:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopcore', '0003_wallet_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', 'created_at', 'id'], name='wallet_txn_history_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0 on 2026-10-18 13:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_used_by(apps, schema_editor):
+    # each user in the old used_by M2M had used the coupon once
+    Coupon = apps.get_model("shopcore", "Coupon")
+    CouponRedemption = apps.get_model("shopcore", "CouponRedemption")
+    used_by = Coupon.used_by.through.objects.values_list("coupon_id", "customuser_id")
+    CouponRedemption.objects.bulk_create(
+        (CouponRedemption(coupon_id=coupon_id, user_id=user_id, use_number=1) for coupon_id, user_id in used_by.iterator()),
+        batch_size=5000,
+        ignore_conflicts=True,
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopcore', '0004_wallet_transaction_history_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coupon',
+            name='per_user_limit',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.CreateModel(
+            name='CouponRedemption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('use_number', models.PositiveIntegerField(default=1)),
+                ('discount_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('coupon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='redemptions', to='shopcore.coupon')),
+                ('order', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='coupon_redemption', to='shopcore.order')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coupon_redemptions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('coupon', 'user', 'use_number'), name='coupon_redemption_slot_unique')],
+            },
+        ),
+        migrations.RunPython(copy_used_by, migrations.RunPython.noop),
+    ]
@@ -27,16 +27,36 @@ class Coupon(models.Model):
     is_active = models.BooleanField(default=True)
     expiry_date = models.DateTimeField()
     is_deleted = models.BooleanField(default=False)
+    # legacy, per-user usage is recorded in CouponRedemption
     used_by = models.ManyToManyField("accounts.CustomUser", blank=True)
     usage_limit = models.PositiveIntegerField(default=1)
     used_count = models.PositiveIntegerField(default=0)
+    per_user_limit = models.PositiveIntegerField(default=1)
 
     def is_valid(self):
         return self.is_active and not self.is_deleted and timezone.now() <= self.expiry_date
     
     def __str__(self):
         return self.code
-    
+
+class CouponRedemption(models.Model):
+    """
+    One use of a coupon by a user. use_number is the user's slot
+    (1..per_user_limit); the unique constraint on it stops two
+    concurrent checkouts from taking the same slot.
+    """
+    coupon = models.ForeignKey(Coupon, on_delete=models.CASCADE, related_name="redemptions")
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="coupon_redemptions")
+    order = models.OneToOneField("Order", on_delete=models.CASCADE, null=True, blank=True, related_name="coupon_redemption")
+    use_number = models.PositiveIntegerField(default=1)
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["coupon", "user", "use_number"], name="coupon_redemption_slot_unique"),
+        ]
+
 class Offer(models.Model):
     OFFER_TYPE_CHOICES = (
         ("PRODUCT", "Product"),
@@ -50,6 +70,14 @@ class Offer(models.Model):
     is_active = models.BooleanField(default=True)
     is_deleted = models.BooleanField(default=False)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remembered so prices of the previous target get refreshed too
+        instance._loaded_product_id = instance.__dict__.get("product_id")
+        instance._loaded_category_id = instance.__dict__.get("category_id")
+        return instance
+
     def __str__(self):
         return f"{self.offer_type} - {self.discount_percent}%"
 
@@ -99,6 +127,26 @@ class Order(models.Model):
     delivered_at = models.DateTimeField(null=True, blank=True)
     cancelled_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # set while the order's stock is reserved awaiting payment; expired
+    # orders are cancelled by release_expired_reservations
+    reservation_expires_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["reservation_expires_at"],
+                name="order_reservation_expiry_idx",
+                condition=models.Q(reservation_expires_at__isnull=False),
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remembered so the sales rollup can react to status changes
+        instance._loaded_order_status = instance.__dict__.get("order_status")
+        instance._loaded_payment_status = instance.__dict__.get("payment_status")
+        return instance
 
     def save(self, *args, **kwargs):
         if not self.order_id:
@@ -168,6 +216,14 @@ class Review(models.Model):
     class Meta:
         unique_together = ("user", "product")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remembered so the product's rating columns can be adjusted
+        instance._loaded_rating = instance.__dict__.get("rating")
+        instance._loaded_product_id = instance.__dict__.get("product_id")
+        return instance
+
     #WALLET
 class Wallet(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE)
@@ -194,6 +250,35 @@ class WalletTransaction(models.Model):
     reference_type = models.CharField(max_length=20, choices=REFERENCE_TYPE_CHOICES, null=True, blank=True)
     reference_id = models.CharField(max_length=50, null=True, blank=True)
 
+    class Meta:
+        constraints = [
+            # one refund / debit per order or return, see services.wallet
+            models.UniqueConstraint(
+                fields=["reference_type", "reference_id", "txn_type"],
+                condition=models.Q(reference_id__isnull=False),
+                name="wallet_txn_reference_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["wallet", "created_at", "id"], name="wallet_txn_history_idx"),
+        ]
+
+class WalletBalanceSnapshot(models.Model):
+    """
+    Wallet balance as of a transaction id. The ledger balance is the
+    latest snapshot plus the transactions after it, so verifying a
+    wallet never has to sum its whole history.
+    """
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="snapshots")
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+    last_transaction_id = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["wallet", "-last_transaction_id"], name="wallet_snapshot_latest_idx"),
+        ]
+
     #WISHLIST
 class Wishlist(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE)
@@ -204,4 +289,36 @@ class Wishlist(models.Model):
 
 class WishlistItem(models.Model):
     wishlist = models.ForeignKey(Wishlist, on_delete=models.CASCADE, related_name="items")
-    product = models.ForeignKey(Product, on_delete=models.CASCADE)
\ No newline at end of file
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+
+    #SALES ROLLUP
+class DailySalesRollup(models.Model):
+    """
+    Units and gross sales per day and product, kept up to date as
+    order items are created. Category and brand are copied in so the
+    dashboard can group without joining back to the catalog.
+    """
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="sales_rollups")
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name="sales_rollups")
+    brand = models.CharField(max_length=100, blank=True)
+    quantity = models.PositiveIntegerField(default=0)
+    gross = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ("day", "product")
+
+    def __str__(self):
+        return f"{self.day} - {self.product_id}"
+
+class DailyOrderRollup(models.Model):
+    """
+    Order-level totals per day (orders placed, delivered, paid revenue).
+    """
+    day = models.DateField(unique=True)
+    orders = models.PositiveIntegerField(default=0)
+    delivered = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return str(self.day)
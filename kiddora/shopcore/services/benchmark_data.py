@@ -0,0 +1,322 @@
+import random
+from array import array
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.db import connection, models, transaction
+from django.db.models import DurationField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from accounts.models import CustomUser, UserAddress
+from products.models import AgeGroup, Category, Color, Inventory, Product, ProductVariant, SubCategory
+from products.services.facets import refresh_product_facets
+from products.services.inventory import record_opening_balances
+from products.services.popularity import reconcile_sold_counts, refresh_trending_scores
+from products.services.reference_data import bump_reference_version
+from products.services.search import refresh_search_vectors
+from shopcore.models import Order, OrderItem
+from shopcore.services.sales_rollup import rebuild_sales_rollup
+from utils.cache import bump_catalog_version
+
+# Everything seeded here is recognisable by these markers, so it can be
+# removed again with delete_benchmark_data().
+BENCH_EMAIL_DOMAIN = "bench.kiddora.test"
+BENCH_ADMIN_EMAIL = f"admin@{BENCH_EMAIL_DOMAIN}"
+BENCH_CATEGORY_PREFIX = "Bench "
+BENCH_ORDER_PREFIX = "BEN"
+
+DEFAULT_SIZES = {
+    "products": 100_000,
+    "variants_per_product": 10,
+    "users": 500_000,
+    "orders": 500_000,
+    "items_per_order": 4,
+}
+
+CATEGORIES = {
+    "Boys": ["T-Shirts", "Shirts", "Shorts", "Jeans", "Jackets", "Nightwear", "Sets", "Ethnic"],
+    "Girls": ["Tops", "Dresses", "Skirts", "Leggings", "Jackets", "Nightwear", "Sets", "Ethnic"],
+    "Infants": ["Bodysuits", "Rompers", "Sleepsuits", "Bibs", "Caps", "Mittens", "Sets", "Blankets"],
+    "Footwear": ["Sneakers", "Sandals", "Boots", "Booties", "School Shoes", "Flip Flops", "Socks", "Slippers"],
+    "Accessories": ["Bags", "Hats", "Hair Bands", "Belts", "Sunglasses", "Watches", "Bottles", "Umbrellas"],
+}
+BRANDS = ["Acme Kids", "Tiny Threads", "Little Sprout", "Bumble", "Puddle Jumpers",
+          "Sunny Days", "Playtime", "Cubby", "Minnow", "Hopscotch"]
+ADJECTIVES = ["Soft", "Classic", "Striped", "Printed", "Organic", "Cozy", "Summer", "Winter", "Denim", "Party"]
+ORDER_STATUSES = [
+    # (order_status, payment_status, weight)
+    ("DELIVERED", "PAID", 60),
+    ("SHIPPED", "PAID", 10),
+    ("CONFIRMED", "PAID", 10),
+    ("PENDING", "PENDING", 10),
+    ("CANCELLED", "REFUNDED", 10),
+]
+
+
+def _batches(total, batch_size):
+    for start in range(0, total, batch_size):
+        yield start, min(batch_size, total - start)
+
+
+def _ensure_lookups():
+    Color.objects.bulk_create(
+        [Color(color=value) for value, _ in Color.COLOR_CHOICES], ignore_conflicts=True
+    )
+    AgeGroup.objects.bulk_create(
+        [AgeGroup(age=value) for value, _ in AgeGroup.AGE_CHOICES], ignore_conflicts=True
+    )
+    bump_reference_version()
+    colors = list(Color.objects.values_list("id", flat=True))
+    ages = list(AgeGroup.objects.values_list("id", flat=True))
+    return [(color, age) for color in colors for age in ages]
+
+
+def _ensure_taxonomy():
+    subcategories = []
+    for category_name, names in CATEGORIES.items():
+        category, _ = Category.objects.get_or_create(category_name=BENCH_CATEGORY_PREFIX + category_name)
+        for name in names:
+            subcategory, _ = SubCategory.objects.get_or_create(category=category, subcategory_name=name)
+            subcategories.append(subcategory)
+    return subcategories
+
+
+def _seed_catalog(rng, products, variants_per_product, batch_size, log):
+    """
+    Returns parallel arrays of variant ids and unit prices (in paise)
+    for the order generator.
+    """
+    combos = _ensure_lookups()
+    subcategories = _ensure_taxonomy()
+    variants_per_product = min(variants_per_product, len(combos))
+    fabrics = [value for value, _ in Product.FABRIC_CHOICES]
+    genders = [value for value, _ in Product.GENDER_CHOICES]
+
+    variant_ids = array("q")
+    variant_prices = array("q")
+    product_ids = []
+    for start, size in _batches(products, batch_size):
+        batch = []
+        for n in range(start, start + size):
+            subcategory = rng.choice(subcategories)
+            base_price = Decimal(rng.randrange(199, 4999))
+            discount = rng.choice([0, 0, 5, 10, 15, 20, 30, 40])
+            # bulk_create skips Product.save, same formula
+            final_price = base_price - base_price * discount / Decimal("100")
+            batch.append(Product(
+                subcategory=subcategory,
+                product_name=f"{rng.choice(ADJECTIVES)} {subcategory.subcategory_name} {n}",
+                brand=rng.choice(BRANDS),
+                gender=rng.choice(genders),
+                fabric=rng.choice(fabrics),
+                base_price=base_price,
+                discount_percent=discount,
+                final_price=final_price,
+                effective_price=final_price,
+                effective_discount=discount,
+                about_product=f"{rng.choice(ADJECTIVES)} everyday wear for kids.",
+            ))
+
+        with transaction.atomic():
+            Product.objects.bulk_create(batch)
+            variants = []
+            for product in batch:
+                for n, (color_id, age_id) in enumerate(rng.sample(combos, variants_per_product)):
+                    variants.append(ProductVariant(
+                        product=product,
+                        color_id=color_id,
+                        age_group_id=age_id,
+                        sku=f"BENCH-{product.id:09d}-{n:02d}",
+                        barcode=f"B{product.id:010d}{n:02d}",
+                    ))
+            ProductVariant.objects.bulk_create(variants, batch_size=batch_size)
+            Inventory.objects.bulk_create(
+                [Inventory(variant=variant, quantity_available=rng.randrange(0, 200)) for variant in variants],
+                batch_size=batch_size,
+            )
+
+        for variant in variants:
+            variant_ids.append(variant.id)
+            variant_prices.append(int(variant.product.effective_price * 100))
+        product_ids.extend(product.id for product in batch)
+        log(f"products: {start + size}/{products}")
+
+    return product_ids, variant_ids, variant_prices
+
+
+def _seed_users(users, batch_size, log):
+    # hashing is deliberately slow, every benchmark user shares one hash
+    password = make_password("benchmark")
+    CustomUser.objects.get_or_create(
+        email=BENCH_ADMIN_EMAIL,
+        defaults={"username": "bench-admin", "role": CustomUser.ROLE_ADMIN, "password": password},
+    )
+
+    user_ids = array("q")
+    address_ids = array("q")
+    for start, size in _batches(users, batch_size):
+        batch = [
+            CustomUser(
+                username=f"bench{n}",
+                email=f"user{n}@{BENCH_EMAIL_DOMAIN}",
+                full_name=f"Bench User {n}",
+                password=password,
+                role=CustomUser.ROLE_CUSTOMER,
+                email_verified=True,
+            )
+            for n in range(start, start + size)
+        ]
+        with transaction.atomic():
+            CustomUser.objects.bulk_create(batch)
+            addresses = UserAddress.objects.bulk_create([
+                UserAddress(
+                    user=user, address_line1=f"{n} Bench Street", city="Kochi", state="Kerala",
+                    country="India", pincode="682001", address_type=UserAddress.ADDRESS_HOME, is_default=True,
+                )
+                for n, user in enumerate(batch, start)
+            ])
+        user_ids.extend(user.id for user in batch)
+        address_ids.extend(address.id for address in addresses)
+        log(f"users: {start + size}/{users}")
+
+    return user_ids, address_ids
+
+
+def _seed_orders(rng, orders, items_per_order, user_ids, address_ids, variant_ids, variant_prices, batch_size, log):
+    statuses = [status[:2] for status in ORDER_STATUSES]
+    weights = [status[2] for status in ORDER_STATUSES]
+    max_items = max(1, 2 * items_per_order - 1)
+    item_count = 0
+
+    for start, size in _batches(orders, batch_size):
+        batch = []
+        lines = []
+        for n in range(start, start + size):
+            customer = rng.randrange(len(user_ids))
+            order_status, payment_status = rng.choices(statuses, weights)[0]
+            picks = rng.sample(range(len(variant_ids)), min(rng.randint(1, max_items), len(variant_ids)))
+            order_lines = []
+            total = Decimal("0")
+            for pick in picks:
+                quantity = rng.randint(1, 3)
+                unit_price = Decimal(variant_prices[pick]) / 100
+                order_lines.append((variant_ids[pick], quantity, unit_price))
+                total += unit_price * quantity
+            batch.append(Order(
+                order_id=f"{BENCH_ORDER_PREFIX}{n:011d}",
+                user_id=user_ids[customer],
+                address_id=address_ids[customer],
+                order_status=order_status,
+                payment_status=payment_status,
+                total_amount=total,
+                final_amount=total,
+            ))
+            lines.append(order_lines)
+
+        with transaction.atomic():
+            Order.objects.bulk_create(batch)
+            items = [
+                OrderItem(
+                    order=order, variant_id=variant_id, quantity=quantity,
+                    unit_price=unit_price, total_price=unit_price * quantity,
+                )
+                for order, order_lines in zip(batch, lines)
+                for variant_id, quantity, unit_price in order_lines
+            ]
+            OrderItem.objects.bulk_create(items, batch_size=batch_size)
+        item_count += len(items)
+        log(f"orders: {start + size}/{orders} ({item_count} items)")
+
+    # auto_now_add stamps every row with "now"; spread the orders over
+    # the last year so dashboards and reports have history to chew on.
+    bench_orders = Order.objects.filter(order_id__startswith=BENCH_ORDER_PREFIX)
+    age = ExpressionWrapper(Value(timedelta(days=1)) * (F("id") % 365), output_field=DurationField())
+    bench_orders.update(created_at=F("created_at") - age, order_date=F("order_date") - age)
+    bench_orders.filter(order_status="DELIVERED").update(
+        delivered_at=F("created_at") + Value(timedelta(days=4))
+    )
+
+
+def _refresh_derived(product_ids, batch_size, log):
+    sold = (
+        OrderItem.objects
+        .filter(variant=OuterRef("variant"), order__order_status="DELIVERED")
+        .values("variant")
+        .annotate(total=Sum("quantity"))
+        .values("total")
+    )
+    Inventory.objects.filter(variant__product__subcategory__category__category_name__startswith=BENCH_CATEGORY_PREFIX) \
+        .update(quantity_sold=Coalesce(Subquery(sold), Value(0)))
+    # generated stock has no history: open the ledger at today's counters
+    record_opening_balances(
+        Inventory.objects.filter(variant__product__subcategory__category__category_name__startswith=BENCH_CATEGORY_PREFIX),
+        batch_size=batch_size,
+    )
+    reconcile_sold_counts()
+    refresh_trending_scores()
+    log("popularity refreshed")
+
+    rebuild_sales_rollup()
+    log("sales rollup rebuilt")
+
+    for start in range(0, len(product_ids), batch_size):
+        refresh_product_facets(product_ids[start:start + batch_size])
+    if connection.vendor == "postgresql":
+        refresh_search_vectors(
+            subcategory_ids=SubCategory.objects
+            .filter(category__category_name__startswith=BENCH_CATEGORY_PREFIX)
+            .values_list("id", flat=True)
+        )
+    log("facets / search refreshed")
+
+
+def seed_benchmark_data(products, variants_per_product, users, orders, items_per_order,
+                        batch_size=5000, seed=42, log=print):
+    """
+    Bulk-insert a synthetic catalog, customers and order history for
+    benchmarking. Rows are created with bulk_create, so model save()
+    and signals don't run; the denormalized counters, rollups, facets
+    and search vectors are rebuilt in bulk at the end instead.
+    The same seed gives the same dataset on an empty database.
+    """
+    rng = random.Random(seed)
+    product_ids, variant_ids, variant_prices = _seed_catalog(rng, products, variants_per_product, batch_size, log)
+    user_ids, address_ids = _seed_users(users, batch_size, log)
+    if orders and user_ids and variant_ids:
+        _seed_orders(rng, orders, items_per_order, user_ids, address_ids,
+                     variant_ids, variant_prices, batch_size, log)
+    _refresh_derived(product_ids, batch_size, log)
+
+
+def _delete_tree(queryset, path=()):
+    """
+    Delete `queryset` and whatever cascades from it with one DELETE per
+    table, children first, each filtered by a subquery on its parent.
+    Unlike QuerySet.delete(), no rows are loaded and no delete signals
+    are sent; SET_NULL relations are cleared with an UPDATE.
+    """
+    model = queryset.model
+    for relation in model._meta.get_fields(include_hidden=True):
+        if not (relation.auto_created and not relation.concrete and (relation.one_to_many or relation.one_to_one)):
+            continue
+        related = relation.related_model._base_manager.filter(**{f"{relation.field.name}__in": queryset})
+        if relation.on_delete is models.CASCADE and relation.related_model not in path + (model,):
+            _delete_tree(related, path + (model,))
+        elif relation.on_delete is models.SET_NULL:
+            related.update(**{relation.field.name: None})
+    return queryset._raw_delete(queryset.db)
+
+
+def delete_benchmark_data(log=print):
+    """
+    Remove everything seed_benchmark_data created. Rows go by raw
+    DELETEs (see _delete_tree), the receivers that would have run per
+    row only invalidate caches, which are bumped once at the end.
+    """
+    with transaction.atomic():
+        _delete_tree(Order.objects.filter(order_id__startswith=BENCH_ORDER_PREFIX))
+        _delete_tree(CustomUser.objects.filter(email__endswith=f"@{BENCH_EMAIL_DOMAIN}"))
+        _delete_tree(Category.objects.filter(category_name__startswith=BENCH_CATEGORY_PREFIX))
+        rebuild_sales_rollup()
+        transaction.on_commit(bump_reference_version)
+        transaction.on_commit(bump_catalog_version)
+    log("benchmark data removed")
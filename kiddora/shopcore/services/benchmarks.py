@@ -0,0 +1,188 @@
+import statistics
+import time
+from datetime import datetime, timezone as dt_timezone
+import django
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from accounts.models import CustomUser
+from products.models import AgeGroup, Category, Color, Inventory, Product
+from products.services.inventory import reserve_stock_bulk
+from shopcore.models import Order, OrderItem
+from shopcore.services.benchmark_data import BENCH_ADMIN_EMAIL, BENCH_EMAIL_DOMAIN
+from shopcore.services.checkout import place_order
+from utils.instrumentation import track_queries
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _rolled_back(func):
+    """
+    Run func inside a transaction that is always rolled back, so
+    checkout / reservation benchmarks can repeat on the same stock.
+    """
+    def run():
+        try:
+            with transaction.atomic():
+                result = func()
+                raise _Rollback(result)
+        except _Rollback as rollback:
+            return rollback.args[0]
+    return run
+
+
+def _succeeded(status):
+    return status == "ok" or (isinstance(status, int) and 200 <= status < 300)
+
+
+def _measure(func, repeat, warmup):
+    """
+    Timings for func over `repeat` runs. A run that doesn't succeed
+    (an error page, a redirect to login) fails the whole case: timing
+    an error page would only make the report look fast.
+    """
+    for _ in range(warmup):
+        status = func()
+        if not _succeeded(status):
+            return {"failed": True, "status": status}
+
+    timings, db_times, queries = [], [], []
+    status = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with track_queries() as metrics:
+            status = func()
+        if not _succeeded(status):
+            return {"failed": True, "status": status}
+        timings.append((time.perf_counter() - start) * 1000)
+        db_times.append(metrics.db_time * 1000)
+        queries.append(metrics.queries)
+
+    timings.sort()
+    return {
+        "runs": repeat,
+        "min_ms": round(timings[0], 2),
+        "median_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+        "max_ms": round(timings[-1], 2),
+        "db_median_ms": round(statistics.median(db_times), 2),
+        "queries": max(queries),
+        "status": status,
+    }
+
+
+def _get(client, url):
+    return lambda: client.get(url).status_code
+
+
+def build_cases():
+    """
+    name -> zero-argument callable. HTTP cases return the status code,
+    service cases return "ok".
+    """
+    customer = CustomUser.objects.filter(email__endswith=f"@{BENCH_EMAIL_DOMAIN}", role=CustomUser.ROLE_CUSTOMER) \
+        .order_by("id").first()
+    admin = CustomUser.objects.filter(email=BENCH_ADMIN_EMAIL).first()
+    if customer is None or admin is None:
+        raise ValueError("No benchmark data, run seed_benchmark_data first")
+
+    # logged in, so product pages skip the anonymous page cache
+    shopper = Client(raise_request_exception=False)
+    shopper.force_login(customer)
+    staff = Client(raise_request_exception=False)
+    staff.force_login(admin)
+
+    category = Category.objects.filter(subcategories__products__isnull=False).order_by("id").first()
+    product = Product.objects.filter(is_active=True).select_related("subcategory").order_by("-sold_count", "id").first()
+    in_stock = list(
+        Inventory.objects.filter(quantity_available__gte=10, variant__is_active=True, variant__product__is_active=True)
+        .order_by("id").values_list("variant_id", flat=True)[:5]
+    )
+    address = customer.addresses.first()
+    colors = "&".join(f"color={pk}" for pk in Color.objects.order_by("id").values_list("id", flat=True)[:2])
+    ages = "&".join(f"age={pk}" for pk in AgeGroup.objects.order_by("id").values_list("id", flat=True)[:2])
+
+    def checkout():
+        place_order(customer, address, [(variant_id, 1) for variant_id in in_stock[:3]])
+        return "ok"
+
+    def reservation():
+        reserve_stock_bulk([(variant_id, 1) for variant_id in in_stock])
+        return "ok"
+
+    product_list = reverse("products:product_list")
+    cases = {
+        "product_list": _get(shopper, product_list),
+        "product_list:category": _get(shopper, f"{product_list}?category={category.id}"),
+        "product_list:color_age": _get(shopper, f"{product_list}?{colors}&{ages}"),
+        "product_list:gender_fabric_price": _get(
+            shopper, f"{product_list}?gender=girl&fabric=Cotton&min_price=300&max_price=1500&sort_by=price_low"
+        ),
+        "product_list:popularity": _get(shopper, f"{product_list}?sort_by=popularity"),
+        "product_list:page_50": _get(shopper, f"{product_list}?page=50"),
+        "product_detail": _get(shopper, reverse("products:product_detail", args=[product.id])),
+        "admin_dashboard": _get(staff, reverse("accounts:admin_dashboard")),
+        "admin_sales_report": _get(staff, reverse("accounts:sales_report")),
+        "admin_sales_report:monthly": _get(staff, f"{reverse('accounts:sales_report')}?type=monthly"),
+        "checkout": _rolled_back(checkout),
+        "reservation": _rolled_back(reservation),
+    }
+    if connection.vendor == "postgresql":
+        cases["product_list:search"] = _get(shopper, f"{product_list}?q=cotton+shirt")
+    return cases
+
+
+def run_benchmarks(repeat=5, warmup=1, only=None, log=print):
+    """
+    Time each case in build_cases() and return a JSON-serialisable
+    report. `only` keeps cases whose name starts with one of the
+    given prefixes. Cases that didn't return 2xx / "ok" are listed in
+    report["failed"] and have no timings.
+    """
+    # the test client talks to "testserver"
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+        cases = build_cases()
+        results = {}
+        for name, func in cases.items():
+            if only and not name.startswith(tuple(only)):
+                continue
+            results[name] = _measure(func, repeat, warmup)
+            if results[name].get("failed"):
+                log(f"{name}: FAILED (status {results[name]['status']})")
+            else:
+                log(f"{name}: {results[name]['median_ms']} ms, {results[name]['queries']} queries")
+
+    return {
+        "generated_at": datetime.now(dt_timezone.utc).isoformat(),
+        "database": connection.vendor,
+        "django": django.get_version(),
+        "repeat": repeat,
+        "dataset": {
+            "products": Product.objects.count(),
+            "variants": Inventory.objects.count(),
+            "users": CustomUser.objects.count(),
+            "orders": Order.objects.count(),
+            "order_items": OrderItem.objects.count(),
+        },
+        "results": results,
+        "failed": [name for name, result in results.items() if result.get("failed")],
+    }
+
+
+def compare_reports(baseline, current):
+    """
+    Per case median change against an earlier report, as
+    (name, baseline_ms, current_ms, change_percent) rows.
+    """
+    rows = []
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before or before.get("failed") or result.get("failed"):
+            continue
+        change = (result["median_ms"] - before["median_ms"]) / before["median_ms"] * 100 if before["median_ms"] else 0
+        rows.append((name, before["median_ms"], result["median_ms"], round(change, 1)))
+    return rows
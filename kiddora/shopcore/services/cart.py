@@ -0,0 +1,108 @@
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from shopcore.models import Cart, CartItem
+from utils.cache import get_catalog_version
+
+EMPTY_SUMMARY = {
+    "count": 0,
+    "lines": {},
+    "subtotal": Decimal("0"),
+    "discount": Decimal("0"),
+    "total": Decimal("0"),
+}
+
+
+def touch_cart(cart_id):
+    """
+    Move Cart.updated_at, which retires the cached summary.
+    """
+    Cart.objects.filter(pk=cart_id).update(updated_at=timezone.now())
+
+
+def get_cart_items(user):
+    """
+    The user's cart lines with variant, product, color, age group and
+    stock, in one query.
+    """
+    return list(
+        CartItem.objects
+        .filter(cart__user=user)
+        .select_related("variant__product", "variant__color", "variant__age_group", "variant__inventory")
+        .order_by("id")
+    )
+
+
+def price_cart_items(items):
+    """
+    Price every line in one pass from the products' precomputed
+    effective_price (best offer already applied, see
+    products.services.pricing), so no further queries. Returns the
+    summary dict: count, subtotal (MRP), discount, total and per-line
+    prices keyed by cart item id.
+    """
+    lines = {}
+    count = 0
+    subtotal = total = Decimal("0")
+    for item in items:
+        product = item.variant.product
+        unit_price = product.effective_price
+        line_total = unit_price * item.quantity
+        lines[item.id] = {
+            "unit_price": unit_price,
+            "mrp": product.base_price,
+            "line_total": line_total,
+            "discount_percent": product.effective_discount,
+        }
+        count += item.quantity
+        subtotal += product.base_price * item.quantity
+        total += line_total
+    return {
+        "count": count,
+        "lines": lines,
+        "subtotal": subtotal,
+        "discount": subtotal - total,
+        "total": total,
+    }
+
+
+def _summary_key(cart_id, updated_at):
+    # prices come from the catalog and offers, which bump the catalog version
+    return f"cart:{cart_id}:{updated_at.timestamp()}:{get_catalog_version()}"
+
+
+def _load(user, with_items):
+    cart = Cart.objects.filter(user=user).values_list("id", "updated_at").first()
+    if cart is None:
+        return EMPTY_SUMMARY, []
+    # updated_at is read before the items: if the cart changes in
+    # between, fresher totals land under the old key, never stale
+    # totals under the new one
+    key = _summary_key(*cart)
+    summary = cache.get(key)
+    items = get_cart_items(user) if with_items or summary is None else []
+    if summary is None:
+        summary = price_cart_items(items)
+        cache.set(key, summary, settings.CART_CACHE_TIMEOUT)
+    return summary, items
+
+
+def get_cart_summary(user):
+    """
+    Cached cart totals. The key is the cart's updated_at (touched by
+    every CartItem change) and the catalog version, so a warm summary
+    costs one small query.
+    """
+    return _load(user, with_items=False)[0]
+
+
+def get_cart(user):
+    """
+    (items, summary) for the cart / checkout pages: the lines in one
+    query, their prices from the cached summary when it is warm.
+    """
+    summary, items = _load(user, with_items=True)
+    for item in items:
+        item.pricing = summary["lines"].get(item.id)
+    return items, summary
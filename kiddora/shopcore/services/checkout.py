@@ -0,0 +1,100 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from products.models import ProductVariant
+from products.services.inventory import reserve_stock_bulk
+from shopcore.models import CartItem, Order, OrderItem
+from shopcore.services.coupons import redeem_coupon, validate_coupon
+from shopcore.services.reservations import reservation_deadline
+from shopcore.services.sales_rollup import record_order_items
+
+
+def place_order(user, address, lines, discount_amount=Decimal("0"), coupon=None):
+    """
+    Create an order for the given (variant, quantity) lines.
+
+    Runs in one transaction with a fixed number of queries:
+    the variants are loaded together, stock for all of them is
+    reserved with one batched UPDATE, items are priced at the product's
+    effective_price (offers already applied), and the order items are
+    bulk-inserted with their totals already computed.
+    bulk_create sends no post_save, so the per-item reserve_inventory
+    and sales rollup signals don't run; both are done here in bulk.
+    The reservation holds until payment or ORDER_RESERVATION_TTL
+    (services.reservations).
+
+    A coupon (instance or code) is validated against the priced
+    lines and its use claimed last, just before commit (see
+    services.coupons); its discount replaces discount_amount.
+
+    Raises InsufficientStock if any variant is short, ValueError if
+    a variant is no longer on sale, CouponError if the coupon can't be
+    used.
+    """
+    quantities = defaultdict(int)
+    for variant, quantity in lines:
+        quantities[getattr(variant, "pk", variant)] += quantity
+    if not quantities:
+        raise ValueError("No items to order")
+
+    variants = (
+        ProductVariant.objects
+        .filter(id__in=quantities, is_active=True, product__is_active=True)
+        .select_related("product__subcategory")
+    )
+    variants = {variant.id: variant for variant in variants}
+    if len(variants) != len(quantities):
+        raise ValueError("Some items are no longer available")
+
+    items = []
+    total_amount = Decimal("0")
+    for variant_id, quantity in quantities.items():
+        unit_price = variants[variant_id].product.effective_price
+        total_amount += unit_price * quantity
+        items.append(OrderItem(
+            variant_id=variant_id,
+            quantity=quantity,
+            unit_price=unit_price,
+            total_price=unit_price * quantity,
+        ))
+
+    if coupon is not None:
+        coupon, discount_amount = validate_coupon(
+            coupon, user, [(variants[item.variant_id].product, item.total_price) for item in items],
+        )
+    discount_amount = min(Decimal(discount_amount), total_amount)
+
+    with transaction.atomic():
+        order = Order.objects.create(
+            user=user,
+            address=address,
+            total_amount=total_amount,
+            discount_amount=discount_amount,
+            final_amount=total_amount - discount_amount,
+            reservation_expires_at=reservation_deadline(),
+        )
+        reserve_stock_bulk(quantities.items(), "ORDER", order.id)
+        for item in items:
+            item.order = order
+        OrderItem.objects.bulk_create(items)
+        record_order_items(order, items)
+        if coupon is not None:
+            redeem_coupon(coupon, user, order, discount_amount)
+
+    return order
+
+
+def place_order_from_cart(user, address, discount_amount=Decimal("0"), coupon=None):
+    """
+    Place an order for everything in the user's cart and empty it.
+    Priced the same way as the cart summary (services.cart).
+    """
+    cart_items = CartItem.objects.filter(cart__user=user)
+    lines = list(cart_items.values_list("variant_id", "quantity"))
+    if not lines:
+        raise ValueError("Cart is empty")
+
+    with transaction.atomic():
+        order = place_order(user, address, lines, discount_amount, coupon)
+        cart_items.delete()
+    return order
@@ -0,0 +1,141 @@
+from collections import Counter
+from decimal import ROUND_HALF_UP, Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from shopcore.models import Coupon, CouponRedemption
+
+PAISE = Decimal("0.01")
+
+
+class CouponError(ValueError):
+    pass
+
+
+def get_coupon(code):
+    coupon = Coupon.objects.filter(code=(code or "").strip(), is_deleted=False).first()
+    if coupon is None:
+        raise CouponError("Invalid coupon code.")
+    return coupon
+
+
+def eligible_amount(coupon, lines):
+    """
+    Part of the order the coupon applies to. `lines` are
+    (product, line_total) pairs; products need .subcategory loaded for
+    category coupons.
+    """
+    if coupon.product_id:
+        return sum((total for product, total in lines if product.id == coupon.product_id), Decimal("0"))
+    if coupon.category_id:
+        return sum(
+            (total for product, total in lines if product.subcategory.category_id == coupon.category_id),
+            Decimal("0"),
+        )
+    return sum((total for _, total in lines), Decimal("0"))
+
+
+def coupon_discount(coupon, amount):
+    if coupon.discount_type == "PERCENT":
+        discount = (amount * Decimal(coupon.discount_percent) / Decimal("100")).quantize(PAISE, ROUND_HALF_UP)
+        if coupon.max_discount is not None:
+            discount = min(discount, coupon.max_discount)
+    else:
+        discount = Decimal(coupon.discount_amount if coupon.discount_amount is not None else coupon.discount_value)
+    return min(discount, amount)
+
+
+def _used_slots(coupon, user):
+    return set(
+        CouponRedemption.objects.filter(coupon=coupon, user=user).values_list("use_number", flat=True)
+    )
+
+
+def validate_coupon(coupon, user, lines):
+    """
+    Check that `user` may use the coupon on an order of `lines` and
+    return the discount. Two small queries at most (the coupon if a
+    code is given, the user's redemptions); raises CouponError.
+    The global usage limit is checked here too, but only
+    redeem_coupon() claims a use.
+    """
+    if not isinstance(coupon, Coupon):
+        coupon = get_coupon(coupon)
+    if not coupon.is_valid():
+        raise CouponError("This coupon has expired or is no longer active.")
+    if coupon.used_count >= coupon.usage_limit:
+        raise CouponError("This coupon has been fully redeemed.")
+
+    subtotal = sum((total for _, total in lines), Decimal("0"))
+    if subtotal < coupon.min_order_amount:
+        raise CouponError(f"This coupon needs a minimum order of ₹{coupon.min_order_amount}.")
+    if len(_used_slots(coupon, user)) >= coupon.per_user_limit:
+        raise CouponError("You have already used this coupon.")
+
+    discount = coupon_discount(coupon, eligible_amount(coupon, lines))
+    if discount <= 0:
+        raise CouponError("This coupon doesn't apply to the items in your order.")
+    return coupon, discount
+
+
+def redeem_coupon(coupon, user, order, discount_amount):
+    """
+    Record the user's use and claim one of the coupon's uses with a
+    conditional UPDATE (used_count < usage_limit), so concurrent
+    checkouts can never exceed the limit and nothing reads and writes
+    back the counter. Call it inside the checkout transaction, as late
+    as possible: the claim holds the coupon row's lock until commit.
+    Raises CouponError, leaving nothing changed.
+    """
+    free = sorted(set(range(1, coupon.per_user_limit + 1)) - _used_slots(coupon, user))
+    if not free:
+        raise CouponError("You have already used this coupon.")
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                redemption = CouponRedemption.objects.create(
+                    coupon=coupon, user=user, order=order, use_number=free[0], discount_amount=discount_amount,
+                )
+        except IntegrityError:
+            # the same slot was taken by a concurrent checkout of this user
+            raise CouponError("You have already used this coupon.")
+
+        claimed = Coupon.objects.filter(
+            pk=coupon.pk,
+            is_active=True,
+            is_deleted=False,
+            expiry_date__gte=timezone.now(),
+            used_count__lt=F("usage_limit"),
+        ).update(used_count=F("used_count") + 1)
+        if not claimed:
+            raise CouponError("This coupon has been fully redeemed.")
+    return redemption
+
+
+def release_coupon(order):
+    """
+    Give the order's coupon use back (cancelled order). Safe to call
+    more than once.
+    """
+    redemption = CouponRedemption.objects.filter(order=order).values_list("id", "coupon_id").first()
+    if redemption is None:
+        return
+    # the delete decides who gives the use back when called concurrently
+    if CouponRedemption.objects.filter(pk=redemption[0]).delete()[0]:
+        Coupon.objects.filter(pk=redemption[1], used_count__gt=0).update(used_count=F("used_count") - 1)
+
+
+def release_coupons(order_ids):
+    """
+    release_coupon() for many orders at once (expired reservations).
+    The caller holds the orders' rows locked.
+    """
+    redemptions = CouponRedemption.objects.filter(order_id__in=order_ids)
+    uses = Counter(redemptions.values_list("coupon_id", flat=True))
+    if not uses:
+        return
+    redemptions.delete()
+    for coupon_id, count in uses.items():
+        Coupon.objects.filter(pk=coupon_id).update(used_count=Greatest(F("used_count") - count, Value(0)))
@@ -0,0 +1,106 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from products.services.inventory import move_reserved
+from shopcore.models import Order, OrderItem
+from shopcore.services.coupons import release_coupons
+
+logger = logging.getLogger(__name__)
+
+RELEASE_BATCH_SIZE = 500
+
+
+class ReservationExpired(Exception):
+    """
+    The order was cancelled, or its reservation ran out, before the
+    payment for it was recorded.
+    """
+
+    def __init__(self, order):
+        self.order = order
+        super().__init__(f"Reservation for order {order.pk} has expired")
+
+
+def reservation_deadline():
+    """
+    Expiry for stock reserved by a new, unpaid order.
+    """
+    return timezone.now() + timedelta(seconds=settings.ORDER_RESERVATION_TTL)
+
+
+def expired_reservations(now=None):
+    return Order.objects.filter(
+        reservation_expires_at__lt=now or timezone.now(),
+        order_status="PENDING",
+    ).exclude(payment_status="PAID")
+
+
+def lock_payable_order(order_id, **filters):
+    """
+    Lock the order row for a payment and check its reservation still
+    holds. Call inside the transaction that records the payment: until
+    it commits the sweeper skips the order, so the stock can't be
+    released under a payment. Raises ReservationExpired if the order is
+    cancelled or its reservation has run out (the sweeper would cancel
+    it on its next run).
+    """
+    order = Order.objects.select_for_update().get(pk=order_id, **filters)
+    expires_at = order.reservation_expires_at
+    if order.order_status == "CANCELLED" or (expires_at is not None and expires_at <= timezone.now()):
+        raise ReservationExpired(order)
+    return order
+
+
+def _release_batch(now, batch_size):
+    with transaction.atomic():
+        # SKIP LOCKED: orders locked by a payment in progress
+        # (lock_payable_order) or claimed by another sweeper are left alone
+        order_ids = list(
+            expired_reservations(now)
+            .select_for_update(skip_locked=True)
+            .order_by("reservation_expires_at", "id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not order_ids:
+            return 0, 0
+
+        Order.objects.filter(id__in=order_ids).update(
+            order_status="CANCELLED", cancelled_at=now, reservation_expires_at=None,
+        )
+        released = move_reserved("RELEASE", [
+            (variant_id, quantity, "ORDER", order_id)
+            for order_id, variant_id, quantity in OrderItem.objects
+            .filter(order_id__in=order_ids)
+            .values_list("order_id", "variant_id", "quantity")
+        ])
+        release_coupons(order_ids)
+    return len(order_ids), sum(released.values())
+
+
+def release_expired_reservations(batch_size=RELEASE_BATCH_SIZE):
+    """
+    Cancel unpaid orders whose reservation has expired and give their
+    stock back, batch by batch: per batch one UPDATE claims the orders,
+    one query reads their lines and one conditional UPDATE + ledger
+    INSERT releases the stock (move_reserved: lines already released
+    for the order are skipped). Each batch commits on its own.
+
+    Returns {"orders": cancelled orders, "units": units released,
+    "batches": batches run}.
+    """
+    now = timezone.now()
+    stats = {"orders": 0, "units": 0, "batches": 0}
+    while True:
+        orders, units = _release_batch(now, batch_size)
+        if not orders:
+            break
+        stats["orders"] += orders
+        stats["units"] += units
+        stats["batches"] += 1
+        if orders < batch_size:
+            break
+    if stats["orders"]:
+        logger.info("Released %(units)s reserved units from %(orders)s expired orders", stats)
+    return stats
@@ -0,0 +1,142 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from products.models import ProductVariant
+from shopcore.models import DailyOrderRollup, DailySalesRollup, Order, OrderItem
+
+
+def order_day(order):
+    return timezone.localdate(order.created_at)
+
+
+def record_order_items(order, items):
+    """
+    Add the given order items to the day's per-product rollup rows.
+    Constant number of queries however many items there are.
+    """
+    variants = {
+        row[0]: row[1:]
+        for row in (
+            ProductVariant.objects
+            .filter(id__in={item.variant_id for item in items})
+            .values_list("id", "product_id", "product__subcategory__category_id", "product__brand")
+        )
+    }
+    products = {}
+    quantities = defaultdict(int)
+    gross = defaultdict(Decimal)
+    for item in items:
+        product_id, category_id, brand = variants[item.variant_id]
+        products[product_id] = (category_id, brand)
+        quantities[product_id] += item.quantity
+        gross[product_id] += item.total_price
+    if not products:
+        return
+
+    day = order_day(order)
+    with transaction.atomic():
+        # make sure every row exists, then add to all of them in one UPDATE
+        DailySalesRollup.objects.bulk_create(
+            [
+                DailySalesRollup(day=day, product_id=product_id, category_id=category_id, brand=brand)
+                for product_id, (category_id, brand) in products.items()
+            ],
+            ignore_conflicts=True,
+        )
+        DailySalesRollup.objects.filter(day=day, product_id__in=products).update(
+            quantity=F("quantity") + Case(
+                *[When(product_id=pid, then=Value(qty)) for pid, qty in quantities.items()],
+                default=Value(0),
+            ),
+            gross=F("gross") + Case(
+                *[When(product_id=pid, then=Value(amount)) for pid, amount in gross.items()],
+                default=Value(Decimal("0")),
+            ),
+        )
+
+
+def record_order_change(order, orders=0, delivered=0, revenue=Decimal("0")):
+    """
+    Add order-level deltas (new order, delivered, paid) to the day row.
+    """
+    day = order_day(order)
+    with transaction.atomic():
+        DailyOrderRollup.objects.get_or_create(day=day)
+        DailyOrderRollup.objects.filter(day=day).update(
+            orders=F("orders") + orders,
+            delivered=F("delivered") + delivered,
+            revenue=F("revenue") + revenue,
+        )
+
+
+def rebuild_sales_rollup(since=None):
+    """
+    Recompute both rollups from the order tables, optionally only for
+    days on or after `since`.
+    """
+    items = OrderItem.objects.all()
+    orders = Order.objects.all()
+    sales_rows = DailySalesRollup.objects.all()
+    order_rows = DailyOrderRollup.objects.all()
+    if since:
+        items = items.filter(order__created_at__date__gte=since)
+        orders = orders.filter(created_at__date__gte=since)
+        sales_rows = sales_rows.filter(day__gte=since)
+        order_rows = order_rows.filter(day__gte=since)
+
+    sales = (
+        items
+        .annotate(day=TruncDate("order__created_at"))
+        .values(
+            "day",
+            "variant__product_id",
+            "variant__product__subcategory__category_id",
+            "variant__product__brand",
+        )
+        .annotate(quantity=Sum("quantity"), gross=Sum("total_price"))
+        .order_by()
+    )
+    daily = (
+        orders
+        .annotate(day=TruncDate("created_at"))
+        .values("day")
+        .annotate(
+            order_count=Count("id"),
+            delivered=Count("id", filter=Q(order_status="DELIVERED")),
+            revenue=Sum("final_amount", filter=Q(payment_status="PAID")),
+        )
+        .order_by()
+    )
+
+    with transaction.atomic():
+        sales_rows.delete()
+        order_rows.delete()
+        DailySalesRollup.objects.bulk_create(
+            [
+                DailySalesRollup(
+                    day=row["day"],
+                    product_id=row["variant__product_id"],
+                    category_id=row["variant__product__subcategory__category_id"],
+                    brand=row["variant__product__brand"],
+                    quantity=row["quantity"],
+                    gross=row["gross"],
+                )
+                for row in sales.iterator()
+            ],
+            batch_size=1000,
+        )
+        DailyOrderRollup.objects.bulk_create(
+            [
+                DailyOrderRollup(
+                    day=row["day"],
+                    orders=row["order_count"],
+                    delivered=row["delivered"],
+                    revenue=row["revenue"] or 0,
+                )
+                for row in daily.iterator()
+            ],
+            batch_size=1000,
+        )
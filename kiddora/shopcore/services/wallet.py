@@ -0,0 +1,292 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.core import signing
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case, Count, DecimalField, ExpressionWrapper, F, Max, OuterRef, Q, Subquery, Sum, Value, When, Window,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from products.utils.pagination import KeysetPage
+from shopcore.models import Wallet, WalletBalanceSnapshot, WalletTransaction
+
+# Transactions are only checkpointed once they are this old, so a
+# transaction still open in another connection (holding a lower id than
+# rows already committed) can't be skipped by a snapshot.
+CHECKPOINT_SETTLE_TIME = timedelta(minutes=5)
+
+HISTORY_PAGE_SIZE = 20
+HISTORY_CURSOR_SALT = "wallet-history"
+
+
+class InsufficientBalance(ValueError):
+    pass
+
+
+def _money():
+    return DecimalField(max_digits=12, decimal_places=2)
+
+
+def _signed_amount():
+    return Case(
+        When(txn_type="DEBIT", then=-F("amount")),
+        default=F("amount"),
+        output_field=_money(),
+    )
+
+
+def _apply(wallet, txn_type, amount, reference_type, reference_id):
+    wallet_id = getattr(wallet, "pk", wallet)
+    amount = Decimal(amount)
+    reference_id = str(reference_id) if reference_id is not None else None
+    with transaction.atomic():
+        # the ledger row goes in first: with a reference, the unique
+        # constraint makes a repeated credit / debit a no-op, even when
+        # two requests race
+        try:
+            with transaction.atomic():
+                txn = WalletTransaction.objects.create(
+                    wallet_id=wallet_id, txn_type=txn_type, amount=amount,
+                    reference_type=reference_type, reference_id=reference_id,
+                )
+        except IntegrityError:
+            if reference_id is None:
+                raise
+            return None
+
+        wallets = Wallet.objects.filter(pk=wallet_id)
+        if txn_type == "DEBIT":
+            updated = wallets.filter(balance__gte=amount).update(balance=F("balance") - amount)
+        else:
+            updated = wallets.update(balance=F("balance") + amount)
+        if not updated:
+            raise InsufficientBalance("Insufficient wallet balance.")
+    return txn
+
+
+def credit(wallet, amount, txn_type="CREDIT", reference_type=None, reference_id=None):
+    """
+    Add `amount` to the wallet and record it. txn_type is CREDIT or
+    REFUND. Returns the transaction, or None if this reference was
+    already credited. The wallet instance's balance is not refreshed.
+    """
+    return _apply(wallet, txn_type, amount, reference_type, reference_id)
+
+
+def debit(wallet, amount, reference_type=None, reference_id=None):
+    """
+    Take `amount` from the wallet and record it. Raises
+    InsufficientBalance, leaving nothing changed, if the balance is too
+    low at the time of the UPDATE. Returns None if this reference was
+    already debited.
+    """
+    return _apply(wallet, "DEBIT", amount, reference_type, reference_id)
+
+
+def _latest_snapshot(field):
+    return Subquery(
+        WalletBalanceSnapshot.objects
+        .filter(wallet=OuterRef("wallet"))
+        .order_by("-last_transaction_id")
+        .values(field)[:1]
+    )
+
+
+def _ledger_rows(transactions):
+    """
+    Per wallet: balance of the latest snapshot, and the sum / last id
+    of the given transactions made after it.
+    """
+    return (
+        transactions
+        .annotate(
+            snapshot_id=Coalesce(_latest_snapshot("last_transaction_id"), Value(0)),
+            snapshot_balance=Coalesce(
+                _latest_snapshot("balance"), Value(Decimal("0")), output_field=_money(),
+            ),
+        )
+        .filter(id__gt=F("snapshot_id"))
+        .values("wallet", "snapshot_balance")
+        .annotate(delta=Sum(_signed_amount()), last_id=Max("id"))
+    )
+
+
+def checkpoint_wallets(batch_size=5000):
+    """
+    Snapshot the balance of every wallet that had transactions since
+    its last snapshot. Returns the number of snapshots written.
+    """
+    settled = (
+        WalletTransaction.objects
+        .filter(created_at__lt=timezone.now() - CHECKPOINT_SETTLE_TIME)
+        .aggregate(upto=Max("id"))["upto"]
+    )
+    if settled is None:
+        return 0
+
+    rows = _ledger_rows(WalletTransaction.objects.filter(id__lte=settled))
+    snapshots = [
+        WalletBalanceSnapshot(
+            wallet_id=row["wallet"],
+            balance=row["snapshot_balance"] + row["delta"],
+            last_transaction_id=row["last_id"],
+        )
+        for row in rows.iterator()
+    ]
+    WalletBalanceSnapshot.objects.bulk_create(snapshots, batch_size=batch_size)
+    return len(snapshots)
+
+
+def ledger_balances(wallet_ids=None):
+    """
+    {wallet id: balance} according to the ledger, for the given wallets
+    or all of them.
+    """
+    wallets = Wallet.objects.all()
+    if wallet_ids is not None:
+        wallets = wallets.filter(pk__in=wallet_ids)
+    balances = dict(
+        wallets
+        .annotate(snapshot_balance=Coalesce(
+            Subquery(
+                WalletBalanceSnapshot.objects
+                .filter(wallet=OuterRef("pk"))
+                .order_by("-last_transaction_id")
+                .values("balance")[:1]
+            ),
+            Value(Decimal("0")),
+            output_field=_money(),
+        ))
+        .values_list("pk", "snapshot_balance")
+    )
+    transactions = WalletTransaction.objects.all()
+    if wallet_ids is not None:
+        transactions = transactions.filter(wallet_id__in=wallet_ids)
+    for row in _ledger_rows(transactions).iterator():
+        balances[row["wallet"]] = row["snapshot_balance"] + row["delta"]
+    return balances
+
+
+def find_balance_drift(wallet_ids=None):
+    """
+    [(wallet id, stored balance, ledger balance)] for wallets whose
+    balance doesn't match their transactions.
+    """
+    ledger = ledger_balances(wallet_ids)
+    stored = Wallet.objects.all()
+    if wallet_ids is not None:
+        stored = stored.filter(pk__in=wallet_ids)
+    return [
+        (wallet_id, balance, ledger[wallet_id])
+        for wallet_id, balance in stored.values_list("pk", "balance").iterator()
+        if balance != ledger[wallet_id]
+    ]
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def transaction_history(wallet, cursor=None, limit=HISTORY_PAGE_SIZE, txn_type=None, reference_type=None,
+                        date_from=None, date_to=None):
+    """
+    Newest-first page of the wallet's transactions, keyset-paginated on
+    (created_at, id), as a KeysetPage. Each row carries `running_total`:
+    the sum of the listed transactions up to and including it, which is
+    the wallet balance after it when no filters are given.
+
+    The window function only covers the page; the total at the cursor
+    position travels in the (signed) cursor, so later pages never
+    re-read the rows before them.
+    """
+    filters = {
+        "txn_type": txn_type,
+        "reference_type": reference_type,
+        "date_from": date_from.isoformat() if date_from else None,
+        "date_to": date_to.isoformat() if date_to else None,
+    }
+    wallet_id = getattr(wallet, "pk", wallet)
+    transactions = WalletTransaction.objects.filter(wallet_id=wallet_id)
+    if txn_type:
+        transactions = transactions.filter(txn_type=txn_type)
+    if reference_type:
+        transactions = transactions.filter(reference_type=reference_type)
+    if date_from:
+        transactions = transactions.filter(created_at__gte=_day_start(date_from))
+    if date_to:
+        transactions = transactions.filter(created_at__lt=_day_start(date_to + timedelta(days=1)))
+
+    position = None
+    if cursor:
+        try:
+            created_at, txn_id, carried, cursor_filters = signing.loads(cursor, salt=HISTORY_CURSOR_SALT)
+            if cursor_filters == filters:
+                position = (parse_datetime(created_at), txn_id, Decimal(carried))
+        except (signing.BadSignature, TypeError, ValueError, ArithmeticError):
+            position = None
+
+    if position is None:
+        if not any(filters.values()):
+            carried = ledger_balances([wallet_id]).get(wallet_id, Decimal("0"))
+        else:
+            carried = transactions.aggregate(total=Coalesce(Sum(_signed_amount()), Value(Decimal("0"))))["total"]
+    else:
+        created_at, txn_id, carried = position
+        transactions = transactions.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=txn_id))
+
+    newest_first = [F("created_at").desc(), F("id").desc()]
+    rows = list(
+        transactions
+        .annotate(
+            signed_amount=_signed_amount(),
+            running_total=ExpressionWrapper(
+                Value(carried) - Window(Sum(_signed_amount()), order_by=newest_first) + _signed_amount(),
+                output_field=_money(),
+            ),
+        )
+        .order_by(*newest_first)[:limit + 1]
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = signing.dumps(
+            [last.created_at.isoformat(), last.id, str(last.running_total - last.signed_amount), filters],
+            salt=HISTORY_CURSOR_SALT,
+        )
+    return KeysetPage(rows, next_cursor)
+
+
+def wallet_activity(wallets):
+    """
+    Annotate a Wallet queryset with its transaction count, credit / debit
+    totals and last activity, each as a correlated subquery on the
+    (wallet, created_at, id) index rather than a join + GROUP BY over
+    all transactions.
+    """
+    def per_wallet(aggregate, output_field):
+        return Subquery(
+            WalletTransaction.objects
+            .filter(wallet=OuterRef("pk"))
+            .values("wallet")
+            .annotate(value=aggregate)
+            .values("value"),
+            output_field=output_field,
+        )
+
+    return wallets.annotate(
+        txn_count=Coalesce(per_wallet(Count("id"), None), Value(0)),
+        credited=Coalesce(
+            per_wallet(Sum("amount", filter=~Q(txn_type="DEBIT")), _money()), Value(Decimal("0")), output_field=_money(),
+        ),
+        debited=Coalesce(
+            per_wallet(Sum("amount", filter=Q(txn_type="DEBIT")), _money()), Value(Decimal("0")), output_field=_money(),
+        ),
+        last_activity=Subquery(
+            WalletTransaction.objects
+            .filter(wallet=OuterRef("pk"))
+            .order_by("-created_at", "-id")
+            .values("created_at")[:1]
+        ),
+    )
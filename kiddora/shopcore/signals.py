@@ -1,36 +1,70 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from shopcore.models import OrderItem
-from products.models import Inventory
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from products.services.inventory import release_stock, deduct_stock_on_delivery
-
 from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 from django.core.exceptions import ValidationError
 from django.utils.timezone import now
 from datetime import timedelta
 from shopcore.models import *
-from products.models import Inventory
+from products.services.inventory import move_reserved, reserve_stock, restock_return
 from django.db import transaction
+from shopcore.services.sales_rollup import record_order_items, record_order_change
+from shopcore.services import wallet as wallet_service
+from django.db.models.signals import post_delete
+from products.services.ratings import record_rating
+from shopcore.services.cart import touch_cart
+from shopcore.services.coupons import release_coupon
+from products.services.pricing import refresh_effective_prices
+from utils.cache import bump_catalog_version
 
 #ORDER
 @receiver(post_save, sender=OrderItem)
 def reserve_inventory(sender, instance, created, **kwargs):
     if created:
-        inventory = Inventory.objects.get(variant=instance.variant)
-        inventory.quantity_available -= instance.quantity
-        inventory.quantity_reserved += instance.quantity
-        inventory.save()
+        reserve_stock(instance.variant_id, instance.quantity, "ORDER", instance.order_id)
 
 @receiver(post_save, sender=OrderItem)
-def handle_order_item_status(sender, instance, **kwargs):
-    if instance.status == "CANCELLED":
-        release_stock(instance.variant, instance.quantity)
+def add_order_item_to_sales_rollup(sender, instance, created, **kwargs):
+    if created:
+        record_order_items(instance.order, [instance])
+
+@receiver(post_save, sender=Order)
+def update_order_rollup(sender, instance, created, update_fields=None, **kwargs):
+    delivered = paid = 0
+    if update_fields is None or "order_status" in update_fields:
+        was_delivered = not created and getattr(instance, "_loaded_order_status", instance.order_status) == "DELIVERED"
+        delivered = (instance.order_status == "DELIVERED") - was_delivered
+        instance._loaded_order_status = instance.order_status
+    if update_fields is None or "payment_status" in update_fields:
+        was_paid = not created and getattr(instance, "_loaded_payment_status", instance.payment_status) == "PAID"
+        paid = (instance.payment_status == "PAID") - was_paid
+        instance._loaded_payment_status = instance.payment_status
+
+    if created or delivered or paid:
+        record_order_change(
+            instance,
+            orders=1 if created else 0,
+            delivered=delivered,
+            revenue=paid * instance.final_amount,
+        )
 
-    if instance.status == "DELIVERED":
-        deduct_stock_on_delivery(instance.variant, instance.quantity)
+@receiver(post_save, sender=Order)
+def release_coupon_on_cancel(sender, instance, created, update_fields=None, **kwargs):
+    if created or instance.order_status != "CANCELLED":
+        return
+    if update_fields is None or "order_status" in update_fields:
+        release_coupon(instance)
+
+@receiver(post_save, sender=Order)
+def settle_reserved_stock(sender, instance, created, update_fields=None, **kwargs):
+    # a cancelled order gives its stock back, a delivered one sells it;
+    # the ledger applies each line once, however often this runs
+    reason = {"CANCELLED": "RELEASE", "DELIVERED": "SALE"}.get(instance.order_status)
+    if created or reason is None:
+        return
+    if update_fields is None or "order_status" in update_fields:
+        move_reserved(reason, [
+            (variant_id, quantity, "ORDER", instance.pk)
+            for variant_id, quantity in instance.order_items.values_list("variant_id", "quantity")
+        ])
 
 #RETURN
 
@@ -38,17 +72,11 @@ def handle_order_item_status(sender, instance, **kwargs):
 @receiver(post_save, sender=Return)
 def refund_to_wallet(sender, instance, **kwargs):
     if instance.status == "REFUNDED" and not instance.locked:
-        wallet = instance.order.user.wallet
         refund_amount = instance.order.final_amount
         #amount = instance.refund_amount
-        wallet.balance += refund_amount
-        #wallet.balance += amount
-        wallet.save()
-
-        WalletTransaction.objects.create(
-            wallet=wallet,
-            txn_type="REFUND",
-            amount=refund_amount
+        wallet_service.credit(
+            instance.order.user.wallet, refund_amount,
+            txn_type="REFUND", reference_type="RETURN", reference_id=instance.id,
         )
         instance.locked = True
         instance.save(update_fields=["locked"])
@@ -56,9 +84,7 @@ def refund_to_wallet(sender, instance, **kwargs):
 @receiver(post_save, sender=Return)
 def restock_inventory_on_approved_return(sender, instance, **kwargs):
     if instance.status == "APPROVED" and not instance.locked:
-        inventory = instance.order_item.variant.inventory
-        inventory.quantity_available += instance.order_item.quantity
-        inventory.save(update_fields=["quantity_available"])
+        restock_return(instance.order_item.variant_id, instance.order_item.quantity, instance.id)
 
 
 
@@ -67,21 +93,57 @@ def refund_to_wallet_on_return(sender, instance, **kwargs):
     if instance.status == "REFUNDED" and not instance.locked:
         with transaction.atomic():
             # Wallet refund
-            wallet = instance.order.user.wallet
             amount = instance.refund_amount or instance.order_item.total_price
-            wallet.balance += amount
-            wallet.save()
-
-            WalletTransaction.objects.create(
-                wallet=wallet,
-                txn_type="REFUND",
-                amount=amount
+            wallet_service.credit(
+                instance.order.user.wallet, amount,
+                txn_type="REFUND", reference_type="RETURN", reference_id=instance.id,
             )
 
             # Restock inventory if not already done
-            inventory = instance.order_item.variant.inventory
-            inventory.quantity_available += instance.order_item.quantity
-            inventory.save(update_fields=["quantity_available"])
+            restock_return(instance.order_item.variant_id, instance.order_item.quantity, instance.id)
 
             instance.locked = True
             instance.save(update_fields=["locked"])
+
+#REVIEW
+@receiver(post_save, sender=Review)
+def update_product_rating(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        record_rating(instance.product_id, added=instance.rating)
+    elif update_fields is None or {"rating", "product"} & set(update_fields):
+        old_rating = getattr(instance, "_loaded_rating", instance.rating)
+        old_product_id = getattr(instance, "_loaded_product_id", instance.product_id)
+        if old_product_id == instance.product_id:
+            record_rating(instance.product_id, added=instance.rating, removed=old_rating)
+        else:
+            record_rating(old_product_id, removed=old_rating)
+            record_rating(instance.product_id, added=instance.rating)
+    instance._loaded_rating = instance.rating
+    instance._loaded_product_id = instance.product_id
+
+@receiver(post_delete, sender=Review)
+def remove_product_rating(sender, instance, **kwargs):
+    record_rating(
+        getattr(instance, "_loaded_product_id", instance.product_id),
+        removed=getattr(instance, "_loaded_rating", instance.rating),
+    )
+
+#CART
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def touch_cart_on_item_change(sender, instance, **kwargs):
+    # retires the cached cart summary, see services.cart
+    touch_cart(instance.cart_id)
+
+#OFFER
+@receiver(post_save, sender=Offer)
+@receiver(post_delete, sender=Offer)
+def refresh_prices_on_offer_change(sender, instance, **kwargs):
+    product_ids = {instance.product_id, getattr(instance, "_loaded_product_id", None)} - {None}
+    category_ids = {instance.category_id, getattr(instance, "_loaded_category_id", None)} - {None}
+    if product_ids or category_ids:
+        refresh_effective_prices(product_ids=product_ids, category_ids=category_ids)
+    instance._loaded_product_id = instance.product_id
+    instance._loaded_category_id = instance.category_id
+    # listings and cached cart summaries show the effective price
+    transaction.on_commit(bump_catalog_version)
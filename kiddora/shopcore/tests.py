@@ -1,3 +1,342 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from accounts.models import CustomUser, UserAddress
+from products.models import Category, Inventory, Product, ProductVariant, StockMovement, SubCategory
+from products.tests import make_product
+from shopcore.models import (
+    Coupon, CouponRedemption, Order, OrderItem, Wallet, WalletBalanceSnapshot, WalletTransaction,
+)
+from shopcore.services.checkout import place_order
+from shopcore.services.coupons import CouponError, redeem_coupon, release_coupon, release_coupons
+from shopcore.services.reservations import release_expired_reservations
+from shopcore.services import wallet as wallet_service
+from shopcore.services.benchmark_data import delete_benchmark_data, seed_benchmark_data
+from shopcore.services.benchmarks import _measure, compare_reports
 
-# Create your tests here.
+
+class BenchmarkMeasureTests(TestCase):
+    def test_error_status_fails_the_case_without_timings(self):
+        statuses = iter([200, 500])
+        result = _measure(lambda: next(statuses), repeat=3, warmup=1)
+        self.assertEqual(result, {"failed": True, "status": 500})
+
+    def test_redirect_is_a_failure_too(self):
+        self.assertTrue(_measure(lambda: 302, repeat=1, warmup=0)["failed"])
+
+    def test_successful_case_is_timed(self):
+        result = _measure(lambda: "ok", repeat=3, warmup=1)
+        self.assertEqual((result["runs"], result["status"]), (3, "ok"))
+        self.assertNotIn("failed", result)
+
+    def test_failed_cases_are_not_compared(self):
+        baseline = {"results": {"a": {"median_ms": 10}, "b": {"median_ms": 10}}}
+        current = {"results": {"a": {"median_ms": 5}, "b": {"failed": True, "status": 500}}}
+        self.assertEqual(compare_reports(baseline, current), [("a", 10, 5, -50.0)])
+
+
+class BenchmarkDataTests(TestCase):
+    def test_delete_removes_everything_seeded(self):
+        seed_benchmark_data(products=4, variants_per_product=2, users=3, orders=5, items_per_order=2,
+                            batch_size=10, log=lambda message: None)
+        self.assertEqual(ProductVariant.objects.count(), 8)
+        self.assertTrue(OrderItem.objects.exists())
+
+        delete_benchmark_data(log=lambda message: None)
+
+        for model in (Category, Product, ProductVariant, Inventory, StockMovement, Order, OrderItem, CustomUser):
+            self.assertFalse(model.objects.exists(), model.__name__)
+
+
+def make_customer(email="shopper@example.com"):
+    return CustomUser.objects.create_user(username=email.split("@")[0], email=email, password="x")
+
+
+class WalletTests(TestCase):
+    def setUp(self):
+        self.wallet = Wallet.objects.get_or_create(user=make_customer())[0]
+
+    def balance(self):
+        self.wallet.refresh_from_db()
+        return self.wallet.balance
+
+    def test_repeated_credit_with_the_same_reference_is_a_no_op(self):
+        first = wallet_service.credit(self.wallet, "150.00", "REFUND", reference_type="ORDER", reference_id=7)
+        again = wallet_service.credit(self.wallet, "150.00", "REFUND", reference_type="ORDER", reference_id=7)
+        self.assertIsNotNone(first)
+        self.assertIsNone(again)
+        self.assertEqual(self.balance(), Decimal("150.00"))
+        self.assertEqual(WalletTransaction.objects.count(), 1)
+
+    def test_credits_without_a_reference_all_count(self):
+        wallet_service.credit(self.wallet, 10)
+        wallet_service.credit(self.wallet, 10)
+        self.assertEqual(self.balance(), Decimal("20.00"))
+
+    def test_debit_above_the_balance_leaves_nothing_behind(self):
+        wallet_service.credit(self.wallet, 50)
+        with self.assertRaises(wallet_service.InsufficientBalance):
+            wallet_service.debit(self.wallet, "50.01", reference_type="ORDER", reference_id=8)
+        self.assertEqual(self.balance(), Decimal("50.00"))
+        self.assertFalse(WalletTransaction.objects.filter(txn_type="DEBIT").exists())
+        # the failed attempt didn't claim the reference either
+        self.assertIsNotNone(wallet_service.debit(self.wallet, 20, reference_type="ORDER", reference_id=8))
+        self.assertEqual(self.balance(), Decimal("30.00"))
+
+    def test_checkpoint_then_drift(self):
+        wallet_service.credit(self.wallet, 100)
+        wallet_service.debit(self.wallet, 30)
+        # only settled transactions are checkpointed
+        self.assertEqual(wallet_service.checkpoint_wallets(), 0)
+        WalletTransaction.objects.update(created_at=timezone.now() - wallet_service.CHECKPOINT_SETTLE_TIME - timedelta(seconds=1))
+        self.assertEqual(wallet_service.checkpoint_wallets(), 1)
+        snapshot = WalletBalanceSnapshot.objects.get()
+        self.assertEqual(snapshot.balance, Decimal("70.00"))
+
+        wallet_service.credit(self.wallet, 5)
+        self.assertEqual(wallet_service.ledger_balances([self.wallet.pk]), {self.wallet.pk: Decimal("75.00")})
+        self.assertEqual(wallet_service.find_balance_drift(), [])
+
+        Wallet.objects.filter(pk=self.wallet.pk).update(balance=Decimal("80.00"))
+        self.assertEqual(
+            wallet_service.find_balance_drift([self.wallet.pk]),
+            [(self.wallet.pk, Decimal("80.00"), Decimal("75.00"))],
+        )
+
+
+class TransactionHistoryTests(TestCase):
+    def setUp(self):
+        self.wallet = Wallet.objects.get_or_create(user=make_customer())[0]
+        wallet_service.credit(self.wallet, 100)
+        wallet_service.credit(self.wallet, 50)
+        wallet_service.debit(self.wallet, 30)
+        wallet_service.credit(self.wallet, 20, "REFUND", reference_type="ORDER", reference_id=1)
+        wallet_service.credit(self.wallet, 10)
+        wallet_service.debit(self.wallet, 5)
+
+    def pages(self, **filters):
+        totals, cursor = [], None
+        while True:
+            page = wallet_service.transaction_history(self.wallet, cursor=cursor, limit=2, **filters)
+            totals.append([row.running_total for row in page.object_list])
+            cursor = page.next_cursor
+            if not cursor:
+                return totals
+
+    def test_running_total_continues_across_pages(self):
+        # newest first: the balance after each transaction
+        self.assertEqual(self.pages(), [[145, 150], [140, 120], [150, 100]])
+
+    def test_filtered_running_total_only_sums_the_listed_rows(self):
+        self.assertEqual(self.pages(txn_type="CREDIT"), [[160, 150], [100]])
+        self.assertEqual(self.pages(txn_type="DEBIT"), [[-35, -30]])
+
+    def test_cursor_from_other_filters_restarts_at_the_first_page(self):
+        cursor = wallet_service.transaction_history(self.wallet, limit=2).next_cursor
+        page = wallet_service.transaction_history(self.wallet, cursor=cursor, limit=2, txn_type="CREDIT")
+        self.assertEqual([row.running_total for row in page.object_list], [160, 150])
+        self.assertEqual(
+            [row.running_total for row in wallet_service.transaction_history(self.wallet, cursor="junk", limit=2)],
+            [145, 150],
+        )
+
+
+def make_address(user):
+    return UserAddress.objects.create(
+        user=user, address_line1="1 Main Road", city="Kochi", state="Kerala", country="India",
+        pincode="682001", address_type=UserAddress.ADDRESS_HOME,
+    )
+
+
+def make_coupon(code="SAVE10", **fields):
+    fields = {
+        "discount_type": "FLAT", "offer_type": "CATEGORY", "discount_percent": 10, "discount_value": 10,
+        "min_order_amount": 0, "expiry_date": timezone.now() + timedelta(days=1), **fields,
+    }
+    return Coupon.objects.create(code=code, **fields)
+
+
+class CouponTests(TestCase):
+    def setUp(self):
+        subcategory = SubCategory.objects.create(
+            category=Category.objects.create(category_name="Boys"), subcategory_name="Shirts",
+        )
+        self.variant = make_product(subcategory).variants.get()
+        self.user = make_customer()
+        self.address = make_address(self.user)
+
+    def order(self, user=None, coupon=None):
+        user = user or self.user
+        address = self.address if user == self.user else make_address(user)
+        return place_order(user, address, [(self.variant, 1)], coupon=coupon)
+
+    def used_count(self, coupon):
+        coupon.refresh_from_db()
+        return coupon.used_count
+
+    def test_checkout_claims_a_slot(self):
+        coupon = make_coupon()
+        order = self.order(coupon=coupon)
+        self.assertEqual(self.used_count(coupon), 1)
+        redemption = CouponRedemption.objects.get()
+        self.assertEqual((redemption.order, redemption.use_number, redemption.discount_amount),
+                         (order, 1, Decimal("10.00")))
+
+    def test_per_user_slots(self):
+        coupon = make_coupon(usage_limit=5, per_user_limit=2)
+        self.order(coupon=coupon)
+        self.order(coupon=coupon)
+        with self.assertRaises(CouponError):
+            self.order(coupon=coupon)
+        self.assertEqual(list(CouponRedemption.objects.order_by("use_number").values_list("use_number", flat=True)),
+                         [1, 2])
+
+    def test_redeem_past_usage_limit_raises_and_rolls_back(self):
+        coupon = make_coupon(usage_limit=1)
+        self.order(coupon=coupon)
+        other = make_customer("other@example.com")
+        order = self.order(user=other)
+
+        with self.assertRaisesMessage(CouponError, "fully redeemed"):
+            redeem_coupon(coupon, other, order, Decimal("10"))
+        self.assertEqual(self.used_count(coupon), 1)
+        self.assertFalse(CouponRedemption.objects.filter(user=other).exists())
+
+    def test_failed_checkout_keeps_nothing(self):
+        coupon = make_coupon(usage_limit=1)
+        self.order(coupon=coupon)
+        other = make_customer("other@example.com")
+        with self.assertRaises(CouponError):
+            self.order(user=other, coupon=coupon)
+        self.assertFalse(Order.objects.filter(user=other).exists())
+        inventory = Inventory.objects.get(variant=self.variant)
+        self.assertEqual((inventory.quantity_available, inventory.quantity_reserved), (9, 1))
+
+    def test_release_gives_the_use_back_once(self):
+        coupon = make_coupon()
+        order = self.order(coupon=coupon)
+        release_coupon(order)
+        release_coupon(order)
+        self.assertEqual(self.used_count(coupon), 0)
+        self.assertFalse(CouponRedemption.objects.exists())
+        # the slot is free again
+        self.order(coupon=coupon)
+        self.assertEqual(self.used_count(coupon), 1)
+
+    def test_release_coupons_in_bulk(self):
+        coupon = make_coupon(usage_limit=3, per_user_limit=3)
+        orders = [self.order(coupon=coupon) for _ in range(3)]
+        other = make_coupon("OTHER10")
+        orders.append(self.order(coupon=other))
+
+        release_coupons([order.id for order in orders[1:]])
+        self.assertEqual((self.used_count(coupon), self.used_count(other)), (1, 0))
+        self.assertEqual(list(CouponRedemption.objects.values_list("order", flat=True)), [orders[0].id])
+
+
+class ExpiredReservationTests(TestCase):
+    def setUp(self):
+        subcategory = SubCategory.objects.create(
+            category=Category.objects.create(category_name="Boys"), subcategory_name="Shirts",
+        )
+        self.shirt = make_product(subcategory).variants.get()
+        self.shorts = make_product(subcategory, name="Shorts").variants.get()
+        self.user = make_customer()
+        self.address = make_address(self.user)
+
+    def order(self, expired=True, coupon=None):
+        order = place_order(self.user, self.address, [(self.shirt, 2), (self.shorts, 1)], coupon=coupon)
+        if expired:
+            Order.objects.filter(pk=order.pk).update(reservation_expires_at=timezone.now() - timedelta(seconds=1))
+        return order
+
+    def counters(self, variant):
+        return Inventory.objects.values_list("quantity_available", "quantity_reserved").get(variant=variant)
+
+    def test_cancelled_once_and_stock_returned_once(self):
+        order = self.order()
+        self.assertEqual(self.counters(self.shirt), (8, 2))
+
+        self.assertEqual(release_expired_reservations(), {"orders": 1, "units": 3, "batches": 1})
+        self.assertEqual(release_expired_reservations(), {"orders": 0, "units": 0, "batches": 0})
+
+        order.refresh_from_db()
+        self.assertEqual(order.order_status, "CANCELLED")
+        self.assertIsNone(order.reservation_expires_at)
+        self.assertEqual((self.counters(self.shirt), self.counters(self.shorts)), ((10, 0), (10, 0)))
+        self.assertEqual(StockMovement.objects.filter(reason="RELEASE").count(), 2)
+
+    def test_unexpired_and_paid_orders_are_kept(self):
+        pending = self.order(expired=False)
+        paid = self.order()
+        Order.objects.filter(pk=paid.pk).update(payment_status="PAID")
+
+        self.assertEqual(release_expired_reservations()["orders"], 0)
+        self.assertEqual(
+            set(Order.objects.values_list("order_status", flat=True)), {"PENDING"},
+        )
+        self.assertEqual(self.counters(self.shirt), (6, 4))
+        pending.refresh_from_db()
+        self.assertIsNotNone(pending.reservation_expires_at)
+
+    def test_coupon_use_is_given_back(self):
+        coupon = make_coupon(usage_limit=1)
+        self.order(coupon=coupon)
+        release_expired_reservations()
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.used_count, 0)
+        self.assertFalse(CouponRedemption.objects.exists())
+
+    def test_batches(self):
+        for _ in range(5):
+            self.order()
+        stats = release_expired_reservations(batch_size=2)
+        self.assertEqual(stats, {"orders": 5, "units": 15, "batches": 3})
+        self.assertEqual(self.counters(self.shirt), (10, 0))
+        self.assertEqual(Order.objects.filter(order_status="CANCELLED").count(), 5)
+
+    def test_queries_per_batch_dont_grow_with_its_size(self):
+        def sweep(orders):
+            for _ in range(orders):
+                self.order()
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(release_expired_reservations(batch_size=10)["batches"], 1)
+            return len(queries)
+
+        self.assertEqual(sweep(1), sweep(4))
+
+
+class OrderStockSettlementTests(TestCase):
+    def setUp(self):
+        subcategory = SubCategory.objects.create(
+            category=Category.objects.create(category_name="Boys"), subcategory_name="Shirts",
+        )
+        self.variant = make_product(subcategory).variants.get()
+        user = make_customer()
+        self.order = place_order(user, make_address(user), [(self.variant, 2)])
+
+    def counters(self):
+        return Inventory.objects.values_list(
+            "quantity_available", "quantity_reserved", "quantity_sold",
+        ).get(variant=self.variant)
+
+    def test_saving_an_order_item_leaves_stock_alone(self):
+        self.order.order_items.get().save()
+        self.assertEqual(self.counters(), (8, 2, 0))
+
+    def test_delivered_order_is_sold_once(self):
+        self.order.order_status = "DELIVERED"
+        self.order.save()
+        self.order.save()
+        self.assertEqual(self.counters(), (8, 0, 2))
+        self.assertEqual(StockMovement.objects.filter(reason="SALE").count(), 1)
+
+    def test_cancelled_order_gives_the_stock_back(self):
+        self.order.order_status = "CANCELLED"
+        self.order.save(update_fields=["order_status"])
+        self.assertEqual(self.counters(), (10, 0, 0))
+        # the sweeper finds nothing left to release for it
+        self.assertEqual(release_expired_reservations()["units"], 0)
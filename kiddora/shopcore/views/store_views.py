@@ -3,13 +3,17 @@ from django.shortcuts import render
 from django.contrib.auth import get_user_model
 from django.views.decorators.cache import never_cache
 from accounts.decorators import user_login_required
-from products.models import Category, Product
+from products.models import Product
+from products.services.reference_data import get_categories
+from products.utils.queryset_utils import primary_image_prefetch
+from utils.cache import anonymous_page_cache
 
 User = get_user_model()
 
+@anonymous_page_cache()
 def anonymous_home(request):
-    categories = Category.objects.filter(is_active=True)
-    products = Product.objects.filter(is_active=True).order_by('-id')[:8]
+    categories = get_categories()
+    products = Product.objects.filter(is_active=True).prefetch_related(primary_image_prefetch()).order_by('-id')[:8]
     return render(request, 'store/anonymous_home.html', {
         'categories': categories,
         'products': products
@@ -17,32 +21,39 @@ def anonymous_home(request):
 @never_cache
 @user_login_required
 def home(request):
-    categories = Category.objects.filter(is_active=True)
+    categories = get_categories()
     products = Product.objects.filter(
         is_active=True,
-        subcategory__category__is_active=True,).order_by('-id')[:12]
+        subcategory__category__is_active=True,).prefetch_related(primary_image_prefetch()).order_by('-id')[:12]
     return render(request, 'store/home.html', {
         'categories': categories,
         'products': products
     })
 
+@anonymous_page_cache()
 def aboutus_view(request):
     return render(request, 'store/about_us.html')
 
+@anonymous_page_cache()
 def contactus_view(request):
     return render(request, 'store/contact_us.html')
 
+@anonymous_page_cache()
 def privacy_policy_view(request):
     return render(request, 'store/privacy_policy.html')
 
+@anonymous_page_cache()
 def terms_conditions_view(request):
     return render(request, 'store/terms_conditions.html')
 
+@anonymous_page_cache()
 def return_policy_view(request):
     return render(request, 'store/return_policy.html')
 
+@anonymous_page_cache()
 def cookie_policy_view(request):
     return render(request, 'store/cookie_policy.html')
 
+@anonymous_page_cache()
 def blog_view(request):
     return render(request, 'store/blog.html')
\ No newline at end of file
@@ -0,0 +1,104 @@
+import hashlib
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+CATALOG_VERSION = "catalog"
+
+# Versions live in the database (CacheVersion), so a bump in one worker
+# reaches all of them whatever the cache backend. Each process re-reads
+# them, all in one query, at most once per interval.
+VERSION_CHECK_INTERVAL = 1.0
+
+_versions = {}
+_versions_read_at = None
+
+
+def get_version(name):
+    """
+    Shared version number `name`, read from the database at most once
+    per VERSION_CHECK_INTERVAL in each process.
+    """
+    global _versions_read_at
+    from products.models import CacheVersion
+
+    now = time.monotonic()
+    if _versions_read_at is None or now - _versions_read_at >= VERSION_CHECK_INTERVAL:
+        _versions.clear()
+        _versions.update(CacheVersion.objects.values_list("name", "version"))
+        _versions_read_at = now
+    if name not in _versions:
+        CacheVersion.objects.bulk_create([CacheVersion(name=name)], ignore_conflicts=True)
+        _versions[name] = 1
+    return _versions[name]
+
+
+def bump_version(name):
+    """
+    Move a shared version on. Entries keyed on the old number are
+    never read again and simply expire.
+    """
+    global _versions_read_at
+    from products.models import CacheVersion
+
+    if not CacheVersion.objects.filter(name=name).update(version=F("version") + 1):
+        CacheVersion.objects.get_or_create(name=name, defaults={"version": 2})
+    _versions_read_at = None
+
+
+def get_catalog_version():
+    """
+    Current catalog version. Every cached page / fragment that depends
+    on catalog data has this number in its key.
+    """
+    return get_version(CATALOG_VERSION)
+
+
+def bump_catalog_version():
+    """
+    Invalidate all catalog-dependent cache entries at once.
+    Call it after commit (transaction.on_commit), so no other process
+    caches the old rows under the new version.
+    """
+    bump_version(CATALOG_VERSION)
+
+
+def anonymous_page_cache(timeout=None):
+    """
+    Full-page cache for anonymous GET requests, keyed on the URL and
+    the catalog version.
+    Responses that set cookies or use a CSRF token are not cached,
+    since they can't be shared between visitors.
+
+    usage:
+    @anonymous_page_cache()
+    def aboutus_view(request): ...
+    """
+    if timeout is None:
+        timeout = settings.CATALOG_CACHE_TIMEOUT
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD") or request.user.is_authenticated:
+                return view_func(request, *args, **kwargs)
+
+            path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = f"page:{get_catalog_version()}:{path_hash}"
+            response = cache.get(key)
+            if response is not None:
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            if (
+                response.status_code == 200
+                and not response.streaming
+                and not response.cookies
+                and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+            ):
+                cache.set(key, response, timeout)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+from utils.cache import get_catalog_version
+
+
+def catalog_cache(request):
+    """
+    Exposes the catalog version and timeout for {% cache %} fragments.
+    """
+    return {
+        "catalog_version": get_catalog_version(),
+        "catalog_cache_timeout": settings.CATALOG_CACHE_TIMEOUT,
+    }
+
+
+def cart_badge(request):
+    """
+    Item count for the header cart badge, from the cached cart summary.
+    Lazy, so pages that don't show the badge don't pay for it.
+    """
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return {"cart_count": 0}
+
+    def count():
+        from shopcore.services.cart import get_cart_summary
+        return get_cart_summary(user)["count"]
+
+    return {"cart_count": SimpleLazyObject(count)}
@@ -1,23 +1,107 @@
-from PIL import Image
+from PIL import Image, ImageOps
 from io import BytesIO
+import hashlib
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import InMemoryUploadedFile
-import sys
+
+# label -> bounding box, largest first so each rendition can be
+# downscaled from the previous one
+RENDITION_SIZES = {
+    "detail": (800, 800),
+    "card": (400, 400),
+    "thumb": (150, 150),
+}
+RENDITION_FORMATS = {
+    "jpeg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+}
+RENDITION_DIR = "product_images/renditions"
+# formats that can't store transparency get it composited onto this
+JPEG_BACKGROUND = (255, 255, 255)
 
 # -----------------------------
 # IMAGE PROCESSING
 # -----------------------------
-def process_image(file, size=(800, 800)):
+def open_image(file, size):
+    """
+    Open an image for downscaling to fit `size`.
+    For JPEGs, draft() lets the decoder skip straight to a 1/2, 1/4 or
+    1/8 scale, so large photos are never fully decoded.
+    Images with transparency come back as RGBA, everything else as RGB.
+    """
     img = Image.open(file)
-    img = img.convert("RGB")
+    img.draft("RGB", size)
+    img = ImageOps.exif_transpose(img)
+    if img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info:
+        return img.convert("RGBA")
+    return img.convert("RGB")
+
+def flatten(img, background=JPEG_BACKGROUND):
+    """
+    RGB copy of `img` for JPEG output, transparent areas filled with
+    `background` instead of whatever colour the hidden pixels had.
+    """
+    if img.mode != "RGBA":
+        return img
+    flat = Image.new("RGB", img.size, background)
+    flat.paste(img, mask=img.getchannel("A"))
+    return flat
+
+def validate_image(file):
+    """
+    Cheap check that an upload is a readable image (header only).
+    """
+    try:
+        Image.open(file).verify()
+        return True
+    except Exception:
+        return False
+    finally:
+        file.seek(0)
+
+def process_image(file, size=(800, 800)):
+    img = open_image(file, size)
+    # reducing_gap makes thumbnail() use reduce() before resampling
+    img.thumbnail(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
     output = BytesIO()
-    img.save(output, format="JPEG", quality=85)
+    flatten(img).save(output, format="JPEG", quality=85, optimize=True)
     output.seek(0)
-    
+
     return InMemoryUploadedFile(
         output,
         "ImageField",
-        file.name,
+        file.name.rsplit(".", 1)[0] + ".jpg",
         "image/jpeg",
-        sys.getsizeof(output),
+        output.getbuffer().nbytes,
         None,
     )
+
+def _store(data, label, ext):
+    """
+    Save under a content-hashed name; identical output is stored once.
+    """
+    digest = hashlib.sha256(data).hexdigest()[:20]
+    name = f"{RENDITION_DIR}/{label}_{digest}.{ext}"
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(data))
+    return name
+
+def generate_renditions(file):
+    """
+    Build every size in RENDITION_SIZES as JPEG and WebP. WebP keeps
+    transparency, JPEG gets it flattened onto JPEG_BACKGROUND.
+    Returns {"card": {"jpeg": name, "webp": name, "width": w, "height": h}, ...}
+    with storage names (not URLs).
+    """
+    img = open_image(file, RENDITION_SIZES["detail"])
+    renditions = {}
+    for label, size in RENDITION_SIZES.items():
+        img.thumbnail(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        entry = {"width": img.width, "height": img.height}
+        for ext, options in RENDITION_FORMATS.items():
+            output = BytesIO()
+            (flatten(img) if options["format"] == "JPEG" else img).save(output, **options)
+            entry[ext] = _store(output.getvalue(), label, ext)
+        renditions[label] = entry
+    return renditions
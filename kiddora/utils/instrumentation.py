@@ -0,0 +1,162 @@
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger("kiddora.performance")
+
+_local = threading.local()
+_original_template_render = None
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class Metrics:
+    """
+    Counters filled while a track_queries() block is active.
+    Times are in seconds.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+def _active_metrics():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+@contextmanager
+def track_queries():
+    """
+    Count queries / DB time / template time for the enclosed block.
+
+    usage:
+    with track_queries() as metrics:
+        ...
+    print(metrics.queries)
+    """
+    metrics = Metrics()
+    stack = _active_metrics()
+    stack.append(metrics)
+    try:
+        with ExitStack() as wrappers:
+            for connection in connections.all():
+                wrappers.enter_context(connection.execute_wrapper(metrics))
+            yield metrics
+    finally:
+        stack.remove(metrics)
+
+
+def _timed_template_render(self, context):
+    stack = _active_metrics()
+    depth = getattr(_local, "template_depth", 0)
+    if not stack or depth:
+        # included / extended templates are part of the outer render
+        return _original_template_render(self, context)
+
+    _local.template_depth = depth + 1
+    start = time.perf_counter()
+    try:
+        return _original_template_render(self, context)
+    finally:
+        _local.template_depth = depth
+        elapsed = time.perf_counter() - start
+        for metrics in stack:
+            metrics.template_time += elapsed
+
+
+def install_template_timing():
+    global _original_template_render
+    if _original_template_render is None:
+        _original_template_render = Template._render
+        Template._render = _timed_template_render
+
+
+def query_budget(max_queries):
+    """
+    Declare how many queries a view may run. Going over is logged, and
+    raises QueryBudgetExceeded when settings.QUERY_BUDGET_STRICT is on
+    (the default under `manage.py test`).
+
+    usage:
+    @query_budget(10)
+    def product_list(request): ...
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            with track_queries() as metrics:
+                response = view_func(request, *args, **kwargs)
+            if metrics.queries > max_queries:
+                message = (
+                    f"{view_func.__module__}.{view_func.__name__} ran "
+                    f"{metrics.queries} queries (budget {max_queries})"
+                )
+                if getattr(settings, "QUERY_BUDGET_STRICT", False):
+                    raise QueryBudgetExceeded(message)
+                logger.warning(message)
+            return response
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
+
+
+class PerformanceMiddleware:
+    """
+    Records query count, DB time, template time and total time for
+    each request. Logged as one JSON line per request on the
+    "kiddora.performance" logger, and sent back as a Server-Timing
+    header to staff users or when DEBUG is on.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_template_timing()
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with track_queries() as metrics:
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = match.view_name if match else None
+        if settings.DEBUG or getattr(getattr(request, "user", None), "is_staff", False):
+            # timings help an attacker (e.g. telling cache hits from misses),
+            # only staff and development see them
+            response["Server-Timing"] = ", ".join([
+                f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+                f"tpl;dur={metrics.template_time * 1000:.1f}",
+                f"total;dur={total * 1000:.1f}",
+            ])
+        logger.info(json.dumps({
+            "view": view,
+            "path": request.path,
+            "method": request.method,
+            "status": response.status_code,
+            "queries": metrics.queries,
+            "db_ms": round(metrics.db_time * 1000, 1),
+            "template_ms": round(metrics.template_time * 1000, 1),
+            "total_ms": round(total * 1000, 1),
+        }))
+        return response
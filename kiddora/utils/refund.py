@@ -1,24 +1,13 @@
-from shopcore.models import WalletTransaction
+from shopcore.services import wallet as wallet_service
+
 def partial_refund(return_obj, amount):
     wallet = return_obj.order.user.wallet
 
-    if WalletTransaction.objects.filter(
-        reference_type="RETURN",
-        reference_id=str(return_obj.id)
-    ).exists():
+    if wallet_service.credit(
+        wallet, amount, txn_type="REFUND", reference_type="RETURN", reference_id=return_obj.id
+    ) is None:
         return
 
-    wallet.balance += amount
-    wallet.save(update_fields=["balance"])
-
-    WalletTransaction.objects.create(
-        wallet=wallet,
-        txn_type="REFUND",
-        amount=amount,
-        reference_type="RETURN",
-        reference_id=str(return_obj.id)
-    )
-
     return_obj.refund_amount = amount
     return_obj.status = "REFUNDED"
     return_obj.locked = True
@@ -27,23 +16,11 @@ def full_refund(return_obj):
     wallet = return_obj.order.user.wallet
     refund_amount = return_obj.order.final_amount
 
-    if WalletTransaction.objects.filter(
-        reference_type="RETURN",
-        reference_id=str(return_obj.id)
-    ).exists():
+    if wallet_service.credit(
+        wallet, refund_amount, txn_type="REFUND", reference_type="RETURN", reference_id=return_obj.id
+    ) is None:
         return
 
-    wallet.balance += refund_amount
-    wallet.save(update_fields=["balance"])
-
-    WalletTransaction.objects.create(
-        wallet=wallet,
-        txn_type="REFUND",
-        amount=refund_amount,
-        reference_type="RETURN",
-        reference_id=str(return_obj.id)
-    )
-
     return_obj.refund_amount = refund_amount
     return_obj.status = "REFUNDED"
     return_obj.locked = True
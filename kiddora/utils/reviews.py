@@ -1,12 +1,10 @@
-from django.db.models import Avg, Count
-from shopcore.models import Review
-
 def get_product_review_stats(product):
-    data = Review.objects.filter(product=product).aggregate(
-        avg_rating=Avg("rating"),
-        total_reviews=Count("id")
-    )
+    """
+    Rating summary from the denormalized columns on Product,
+    no query (see products.services.ratings).
+    """
     return {
-        "avg_rating": round(data["avg_rating"] or 0, 1),
-        "total_reviews": data["total_reviews"]
+        "avg_rating": round(product.rating_avg, 1),
+        "total_reviews": product.rating_count,
+        "histogram": product.rating_histogram,
     }